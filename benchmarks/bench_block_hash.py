@@ -0,0 +1,62 @@
+"""Hashing and comparing a 100k-block chain, json hashing versus the canonical cached encoding
+
+	python -m benchmarks.bench_block_hash
+"""
+import hashlib
+import json
+
+from modules.blockchain.block import Block
+from modules.blockchain.mining import NonceSearch
+from modules.blockchain.transaction import Transaction
+
+from benchmarks.common import make_transactions, print_table, timed
+
+CHAIN_LENGTH = 100000
+
+
+def json_hash(block):
+	"""The hash of a block before the canonical encoding"""
+	return hashlib.sha256(json.dumps(block.to_json(hash=True)).encode()).hexdigest()
+
+
+def make_chain(length, transactions, mine=False):
+	"""A chain of `length` blocks with the same transactions, their nonces solve the proof of work if `mine`"""
+	chain = [Block(None, transactions, index=0)]
+	for i in range(1, length):
+		block = Block(chain[-1].hash, transactions, index=i)
+		if mine:
+			block.nonce = NonceSearch.from_transactions(transactions[:-1], block.previous_hash).search()
+			block.hash = block.compute_hash()
+		chain.append(block)
+	return chain
+
+
+def copy_chain(chain):
+	"""Rebuild the blocks from their json, as done when a chain is received"""
+	return [Block.json_to_block(block.to_json()) for block in chain]
+
+
+def main(length=CHAIN_LENGTH):
+	transactions = make_transactions(2) + [Transaction(sender=None, recipient='zeddo', book=None, transaction_type=2)]
+	chain = make_chain(length, transactions)
+	other = copy_chain(chain)
+
+	rows = []
+
+	before, _ = timed(lambda: [json_hash(block) for block in chain])
+	# Cold: the hashes of the received blocks are not computed yet
+	cold, _ = timed(lambda: [block.hash_block() for block in other])
+	warm, _ = timed(lambda: [block.hash_block() for block in other])
+	rows.append(('hash chain', f'{before:.3f}', f'{cold:.3f} (cold) / {warm:.3f} (cached)'))
+
+	before, _ = timed(lambda: all(a.to_json() == b.to_json() for a, b in zip(chain, other)))
+	after, equal = timed(lambda: chain == other)
+	assert equal
+	rows.append(('compare chains', f'{before:.3f}', f'{after:.3f}'))
+
+	print(f'{length} blocks, {len(transactions)} transactions per block')
+	print_table(('', 'before (s)', 'after (s)'), rows)
+
+
+if __name__ == '__main__':
+	main()
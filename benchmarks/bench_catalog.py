@@ -0,0 +1,51 @@
+"""Looking up books in the chain, scanning the blocks versus the catalog index
+
+	python -m benchmarks.bench_catalog
+"""
+from modules.blockchain.block import Block
+from modules.blockchain.catalog import BookCatalog
+from modules.blockchain.transaction import Transaction
+
+from benchmarks.common import load_keys, print_table, rate, timed
+
+SIZES = (1000, 100000, 1000000)
+BOOKS_PER_BLOCK = 100
+
+
+def make_blocks(books):
+	"""Blocks of already signed book transactions *(the signatures are not checked by the catalog)*"""
+	_, public_key = load_keys()
+	blocks = []
+	for first in range(0, books, BOOKS_PER_BLOCK):
+		transactions = [Transaction(public_key, None, {'title': f'Title {i}', 'author': f'Author {i % 997}',
+												 'date': str(1900 + i % 120), 'genre': 'Non-fiction'},
+									book_type='json', signature='0x1,0x2')
+						for i in range(first, min(first + BOOKS_PER_BLOCK, books))]
+		blocks.append(Block(None, transactions, override=True))
+	return blocks
+
+
+def scan(blocks, author):
+	"""Lookup without the catalog"""
+	return [t.to_json()['book'] for block in blocks for t in block.transactions
+			if t.to_json()['book']['author'].casefold() == author]
+
+
+def main():
+	rows = []
+	for size in SIZES:
+		blocks = make_blocks(size)
+		build, catalog = timed(BookCatalog, blocks)
+		catalog.prefix('title', 'title')
+
+		scanned = rate(lambda i: scan(blocks, 'author 42'), duration=0.5)
+		find = rate(lambda i: catalog.find('author', f'Author {i % 997}', limit=10))
+		prefix = rate(lambda i: catalog.prefix('title', f'Title {i % size}', limit=10))
+		search = rate(lambda i: catalog.search(f'title {i % size}', limit=10))
+		rows.append((size, f'{build:.2f}', f'{scanned:,.1f}', f'{find:,.0f}', f'{prefix:,.0f}', f'{search:,.0f}'))
+
+	print_table(('books', 'index (s)', 'scan (q/s)', 'find (q/s)', 'prefix (q/s)', 'search (q/s)'), rows)
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,37 @@
+"""Transfer of a 10k-block chain, json messages versus the binary codec
+
+	python -m benchmarks.bench_codec
+"""
+from modules.blockchain.blockchain import BlockChain
+from modules.blockchain.transaction import Transaction
+from modules.protocols.codec import decode_message, encode_message
+
+from benchmarks.bench_block_hash import make_chain
+from benchmarks.common import make_transactions, print_table, timed
+
+CHAIN_LENGTH = 10000
+CHUNK = 64
+
+
+def main(length=CHAIN_LENGTH):
+	transactions = make_transactions(2) + [Transaction(sender=None, recipient='zeddo', book=None, transaction_type=2)]
+	chain = BlockChain(debug=False)
+	chain.block_chain = make_chain(length, transactions)
+	# The chunks of blocks sent by the chain producer
+	messages = [{'information_type': 'blockchain_blocks', 'blocks': [block.to_json() for block in chain.block_chain[i:i + CHUNK]]}
+				for i in range(0, length, CHUNK)]
+
+	rows = []
+	for codec in ('json', 'binary'):
+		encoding, payloads = timed(lambda: [encode_message(message, codec) for message in messages])
+		decoding, decoded = timed(lambda: [decode_message(payload) for payload in payloads])
+		assert decoded == messages
+		size = sum(map(len, payloads))
+		rows.append((codec, f'{size / 2 ** 20:.2f}', f'{encoding:.3f}', f'{decoding:.3f}'))
+
+	print(f'{length} blocks, {len(transactions)} transactions per block')
+	print_table(('codec', 'size (MB)', 'encode (s)', 'decode (s)'), rows)
+
+
+if __name__ == '__main__':
+	main()
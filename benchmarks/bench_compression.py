@@ -0,0 +1,45 @@
+"""Bytes sent to synchronize a 10k-block chain, with and without compression
+
+	python -m benchmarks.bench_compression
+"""
+from modules.blockchain.blockchain import BlockChain
+from modules.blockchain.transaction import Transaction
+from modules.protocols.codec import encode_message
+from modules.protocols.compression import Compressor, decompress
+
+from benchmarks.bench_block_hash import make_chain
+from benchmarks.common import make_transactions, print_table, timed
+
+CHAIN_LENGTH = 10000
+CHUNK = 64
+
+
+def main(length=CHAIN_LENGTH):
+	transactions = make_transactions(2) + [Transaction(sender=None, recipient='zeddo', book=None, transaction_type=2)]
+	chain = BlockChain(debug=False)
+	chain.block_chain = make_chain(length, transactions)
+	# The chunks of blocks sent by the chain producer
+	messages = [{'information_type': 'blockchain_blocks', 'blocks': [block.to_json() for block in chain.block_chain[i:i + CHUNK]]}
+				for i in range(0, length, CHUNK)]
+
+	rows = []
+	for codec in ('json', 'binary'):
+		payloads = [encode_message(message, codec) for message in messages]
+		size = sum(map(len, payloads))
+		rows.append((codec, '-', f'{size / 2 ** 20:.2f}', '1.00', '-', '-'))
+
+		for level in (1, 6, 9):
+			compressor = Compressor('zlib', level)
+			compressing, compressed = timed(lambda: [compressor.compress(payload) for payload in payloads])
+			decompressing, decompressed = timed(lambda: [decompress(payload) for payload in compressed])
+			assert decompressed == payloads
+			sent = sum(map(len, compressed))
+			rows.append((codec, f'zlib {level}', f'{sent / 2 ** 20:.2f}', f'{size / sent:.2f}',
+						 f'{compressing:.3f}', f'{decompressing:.3f}'))
+
+	print(f'{length} blocks, {len(transactions)} transactions per block')
+	print_table(('codec', 'compression', 'sent (MB)', 'ratio', 'compress (s)', 'decompress (s)'), rows)
+
+
+if __name__ == '__main__':
+	main()
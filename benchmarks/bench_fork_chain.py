@@ -0,0 +1,80 @@
+"""Forking chains of 1k to 100k blocks, deep copy versus blocks shared with the chain
+
+The time and the memory allocated to create a fork, then the time to create a fork, append a block
+to it and switch its last 10 blocks *(a reorg)*, the changes do not copy the shared blocks.
+
+	python -m benchmarks.bench_fork_chain
+	python -m benchmarks.bench_fork_chain --lengths 1000 10000
+"""
+import argparse
+import copy
+import timeit
+import tracemalloc
+
+from modules.blockchain.blockchain import BlockChain
+from modules.blockchain.transaction import Transaction
+
+from benchmarks.bench_block_hash import make_chain
+from benchmarks.common import make_transactions, print_table, timed
+
+LENGTHS = (1000, 10000, 100000)
+FORKS = 100
+
+
+def deepcopy_fork(blockchain):
+	"""The fork before the blocks were shared"""
+	fork = copy.deepcopy(blockchain)
+	fork.block_chain = fork.block_chain[:]
+	return fork
+
+
+def allocated(function):
+	"""Time of one call of `function` and memory it allocates *(kept by its result)*"""
+	tracemalloc.start()
+	try:
+		elapsed, result = timed(function)
+		size, _ = tracemalloc.get_traced_memory()
+	finally:
+		tracemalloc.stop()
+	return elapsed, size, result
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description='Cost of forking a chain')
+	parser.add_argument('--lengths', metavar='N', type=int, nargs='+', default=list(LENGTHS), help='chain lengths')
+	arg = parser.parse_args(argv)
+
+	transactions = make_transactions(2) + [Transaction(sender=None, recipient='zeddo', book=None, transaction_type=2)]
+	blocks = make_chain(max(arg.lengths), transactions)
+
+	rows = []
+	for length in arg.lengths:
+		blockchain = BlockChain(debug=False)
+		blockchain.block_chain = blocks[:length]
+
+		before, before_bytes, _ = allocated(lambda: deepcopy_fork(blockchain))
+		# The first fork wraps the list of the chain, the next ones only share it
+		blockchain.fork_chain()
+		# Like the suite, the garbage collector is disabled *(its collections walk all the blocks)*
+		elapsed = min(timeit.repeat(blockchain.fork_chain, number=FORKS, repeat=5))
+		_, after_bytes, fork = allocated(blockchain.fork_chain)
+
+		# Copy on write: a fork appending a block, then replacing its last 10 blocks
+		def fork_and_change():
+			fork = blockchain.fork_chain()
+			fork.block_chain.append(blocks[length - 1])
+			fork.block_chain[length - 10:] = blocks[length - 10:length]
+			return fork
+
+		changed = min(timeit.repeat(fork_and_change, number=FORKS, repeat=5))
+		assert fork_and_change().block_chain == blocks[:length] and fork.block_chain == blocks[:length]
+
+		rows.append((length, f'{before * 1000:.1f}', f'{before_bytes / 1024:.0f}', f'{elapsed / FORKS * 1e6:.1f}',
+					 f'{after_bytes / 1024:.1f}', f'{changed / FORKS * 1e6:.1f}'))
+
+	print(f'{len(transactions)} transactions per block, the fork times are the best mean of {FORKS} forks')
+	print_table(('blocks', 'deepcopy (ms)', 'deepcopy (KB)', 'fork (us)', 'fork (KB)', 'fork + append + reorg 10 (us)'), rows)
+
+
+if __name__ == '__main__':
+	main()
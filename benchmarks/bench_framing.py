@@ -0,0 +1,38 @@
+"""Receiving messages of 1 KB and 10 MB, the former decode + splitlines versus the frame decoder
+
+The stream is received in 64 KB segments. Splitting the lines of each segment only works when a
+segment holds whole messages, it is measured on a stream sent in one segment.
+
+	python -m benchmarks.bench_framing
+"""
+from modules.protocols.framing import FrameDecoder, encode_frame
+
+from benchmarks.common import print_table, timed
+
+SEGMENT = 64 * 1024
+SIZES = ((1024, 20000), (10 * 1024 * 1024, 5))
+
+
+def main():
+	rows = []
+	for size, count in SIZES:
+		message = b'{"information_type": "ping", "data": "' + b'x' * (size - 40) + b'"}'
+		lines = (message + b'\n') * count
+		frames = encode_frame(message) * count
+
+		before, received = timed(lambda: [line.strip() for line in lines.decode('utf-8').splitlines()])
+		assert len(received) == count
+
+		decoder = FrameDecoder()
+		after, received = timed(lambda: [frame for i in range(0, len(frames), SEGMENT)
+										 for frame in decoder.feed(frames[i:i + SEGMENT])])
+		assert received == [message] * count
+
+		total = len(message) * count / 2 ** 20
+		rows.append((f'{size // 1024} KB x {count}', f'{total / before:,.0f}', f'{total / after:,.0f}'))
+
+	print_table(('messages', 'splitlines, one segment (MB/s)', 'frames, 64 KB segments (MB/s)'), rows)
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,52 @@
+"""Cost of logging the received messages on the reactor thread
+
+The previous debug output *(termcolor line + pprint of the message)* is compared with the
+records queued for the background writer, at the DEBUG level, sampled and disabled (INFO).
+
+	python -m benchmarks.bench_logging
+"""
+import io
+from contextlib import redirect_stdout
+from pprint import pprint as pp
+
+from termcolor import colored
+
+from modules.logs import setup_logging, stop_logging
+from modules.protocols.protocol_client import ClientProtocol
+
+from benchmarks.common import make_transactions, print_table, timed
+
+MESSAGES = 20000
+
+
+def main(number=MESSAGES):
+	transaction = make_transactions(1)[0].to_json()
+	messages = [{'information_type': 'post_transaction', 'data': transaction}] * number
+	protocol = ClientProtocol()
+
+	def pprinted():
+		# The debug output of the received messages before the logging
+		with redirect_stdout(io.StringIO()):
+			for message in messages:
+				print(colored('---------------Received Data---------------', 'red'))
+				pp(message, indent=4, width=4)
+				protocol.router.dispatch(protocol, message, 1000)
+
+	def logged():
+		for message in messages:
+			protocol.messageReceived(message, 1000)
+
+	elapsed, _ = timed(pprinted)
+	rows = [('pprint (before)', f'{elapsed:.3f}', f'{elapsed / number * 1e6:.1f}')]
+	for label, level, sampling in (('DEBUG', 'DEBUG', {}), ('DEBUG sampled 1/100', 'DEBUG', None), ('INFO', 'INFO', None)):
+		setup_logging(level, sampling, stream=io.StringIO())
+		elapsed, _ = timed(logged)
+		stop_logging()
+		rows.append((label, f'{elapsed:.3f}', f'{elapsed / number * 1e6:.1f}'))
+
+	print(f'{number} post_transaction messages')
+	print_table(('output', 'reactor time (s)', 'per message (us)'), rows)
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,34 @@
+"""Hash-rate of the proof of work, before and after the prefix-cached nonce search
+
+	python -m benchmarks.bench_mining
+"""
+from modules.blockchain.blockchain import BlockChain
+from modules.blockchain.mining import NonceSearch
+
+from benchmarks.common import make_transactions, print_table, rate
+
+SIZES = (10, 1000, 10000)
+
+
+def main(duration=1.0):
+	rows = []
+	transactions = make_transactions(max(SIZES))
+	for size in SIZES:
+		blockchain = BlockChain(debug=False)
+		blockchain.open_transactions.extend(transactions[:size])
+		last_hash = blockchain.block_chain[-1].hash
+
+		# Before: valid_proof serializes and hashes every transaction for each guess
+		before = rate(lambda nonce: blockchain.valid_proof(last_hash, nonce), duration)
+
+		# After: the prefix is hashed once per round
+		search = NonceSearch.from_transactions(blockchain.open_transactions, last_hash)
+		after = rate(search.valid, duration)
+
+		rows.append((size, f'{before:,.0f}', f'{after:,.0f}', f'x{after / before:,.1f}'))
+
+	print_table(('open transactions', 'before (guess/s)', 'after (guess/s)', 'speed-up'), rows)
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,50 @@
+"""Propagation of a mined block and of a transaction in simulated networks of 10 to 1,000 nodes
+
+The nodes run in one process on a simulated network *(see `modules.simulation`)*, the latencies
+are simulated seconds from the injection, the messages and bytes are those of the whole network.
+
+	python -m benchmarks.bench_propagation
+	python -m benchmarks.bench_propagation --sizes 10 100 --latency 0.1
+"""
+import argparse
+
+from modules.logs import setup_logging
+from modules.simulation import BANDWIDTH, LATENCY, Simulation
+
+from benchmarks.common import make_transactions, print_table, timed
+
+SIZES = (10, 100, 1000)
+
+
+def _row(size, item, report):
+	milliseconds = lambda seconds: f'{seconds * 1000:.0f}' if seconds is not None else '-'
+	return (size, item, f'{report["reached"]}/{report["nodes"]}', milliseconds(report['p50']),
+			milliseconds(report['p90']), milliseconds(report['p99']), sum(report['messages'].values()), report['dropped'],
+			f'{report["bytes"] / 1024:.1f}', f'{report["wall_seconds"]:.2f}')
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description='Propagation in simulated networks')
+	parser.add_argument('--sizes', metavar='N', type=int, nargs='+', default=list(SIZES), help='number of nodes')
+	parser.add_argument('--latency', metavar='S', type=float, default=LATENCY, help='one way latency of the links')
+	parser.add_argument('--bandwidth', metavar='B', type=int, default=BANDWIDTH, help='bytes per second of the links')
+	arg = parser.parse_args(argv)
+
+	# The slow handler warnings of the synchronous verifications are not relevant here
+	setup_logging('ERROR')
+	transaction = make_transactions(1)[0]
+
+	rows = []
+	for size in arg.sizes:
+		simulation = Simulation(size, arg.latency, arg.bandwidth)
+		starting, _ = timed(simulation.start)
+		print(f'{size} nodes started in {starting:.2f} s')
+		rows.append(_row(size, 'block', simulation.propagate_block()))
+		rows.append(_row(size, 'transaction', simulation.send_transaction(transaction, node=size // 2)))
+
+	print(f'latency {arg.latency * 1000:.0f} ms, bandwidth {arg.bandwidth / 1000:.0f} kB/s per link')
+	print_table(('nodes', 'item', 'reached', 'p50 (ms)', 'p90 (ms)', 'p99 (ms)', 'messages', 'dropped', 'sent (KB)', 'wall (s)'), rows)
+
+
+if __name__ == '__main__':
+	main()
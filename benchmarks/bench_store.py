@@ -0,0 +1,66 @@
+"""Restart of a node with a 100k-block chain and serving it to a peer, from the block store
+
+	python -m benchmarks.bench_store
+"""
+import gc
+import json
+import tempfile
+
+from twisted.internet import defer
+
+from modules.blockchain.blockchain import BlockChain
+from modules.blockchain.store import BlockStore
+from modules.blockchain.transaction import Transaction
+from modules.factories.factory_node import P2PFactory
+
+from benchmarks.bench_block_hash import make_chain
+from benchmarks.common import make_transactions, print_table, timed
+
+CHAIN_LENGTH = 100000
+
+
+def main(length=CHAIN_LENGTH):
+	transactions = make_transactions(2) + [Transaction(sender=None, recipient='zeddo', book=None, transaction_type=2)]
+	chain = BlockChain(debug=False)
+	chain.block_chain = make_chain(length, transactions, mine=True)
+
+	rows = []
+	with tempfile.TemporaryDirectory() as path:
+		store = BlockStore(path)
+		write, _ = timed(store.extend, chain.block_chain)
+		store.close()
+		rows.append(('write the chain', f'{write:.3f}'))
+
+		opened, store = timed(BlockStore, path)
+		rows.append(('open the store (index)', f'{opened:.3f}'))
+
+		loaded, blocks = timed(store.load_blocks)
+		assert len(blocks) == length
+		rows.append(('restore the blocks', f'{loaded:.3f}'))
+
+		read, _ = timed(lambda: [store.read(height) for height in range(0, length, 97)])
+		rows.append((f'{len(range(0, length, 97))} random reads', f'{read:.3f}'))
+
+		before, _ = timed(lambda: json.dumps(chain.to_json()).encode())
+		after, _ = timed(store.chain_json)
+		rows.append(('serialize the chain (Block objects)', f'{before:.3f}'))
+		rows.append(('serialize the chain (stored bytes)', f'{after:.3f}'))
+		store.close()
+
+		# A node started on the store, without checkpoint then on the one recorded by the first restore
+		for name in ('every block checked', 'checkpoint'):
+			factory = P2PFactory(5001, debug=False, connector=lambda ip, port, protocol: defer.Deferred())
+			factory.store = BlockStore(path)
+			restore, restored = timed(factory.restore_chain)
+			assert restored == length
+			rows.append((f'restore_chain ({name})', f'{restore:.3f}'))
+			factory.stopFactory()
+			del factory
+			gc.collect()
+
+	print(f'{length} blocks, {len(transactions)} transactions per block')
+	print_table(('', 'time (s)'), rows)
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,67 @@
+"""Sending a 20k-block chain to a peer, one json message versus the streaming producer
+
+Measures the peak of memory allocated while serializing and the longest time the
+reactor is blocked by one write.
+
+	python -m benchmarks.bench_stream
+"""
+import json
+import tracemalloc
+from time import perf_counter
+
+from twisted.internet.testing import StringTransport
+
+from modules.blockchain.blockchain import BlockChain
+from modules.blockchain.transaction import Transaction
+from modules.protocols.streaming import ChainProducer
+
+from benchmarks.bench_block_hash import make_chain
+from benchmarks.common import make_transactions, print_table
+
+CHAIN_LENGTH = 20000
+
+
+def peak(function):
+	"""Peak of memory allocated by `function` (MB) and its longest step (s)"""
+	tracemalloc.start()
+	longest = function()
+	_, allocated = tracemalloc.get_traced_memory()
+	tracemalloc.stop()
+	return allocated / 2 ** 20, longest
+
+
+def main(length=CHAIN_LENGTH):
+	transactions = make_transactions(2) + [Transaction(sender=None, recipient='zeddo', book=None, transaction_type=2)]
+	chain = BlockChain(debug=False)
+	chain.block_chain = make_chain(length, transactions)
+
+	def one_message():
+		start = perf_counter()
+		message = json.dumps({'information_type': 'post_blockchain', 'blockchain': chain.to_json()})
+		(message + '\n').encode()
+		return perf_counter() - start
+
+	def streamed():
+		# The peer reads every message before the next one is produced
+		transport = StringTransport()
+		producer = ChainProducer(transport, chain.block_chain)
+		producer.start()
+		longest = 0
+		while not producer.deferred.called:
+			start = perf_counter()
+			producer.resumeProducing()
+			longest = max(longest, perf_counter() - start)
+			transport.clear()
+		return longest
+
+	rows = []
+	for name, function in (('one message', one_message), ('streamed', streamed)):
+		memory, longest = peak(function)
+		rows.append((name, f'{memory:.1f}', f'{longest * 1000:.1f}'))
+
+	print(f'{length} blocks, {len(transactions)} transactions per block')
+	print_table(('', 'peak memory (MB)', 'longest write (ms)'), rows)
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,35 @@
+"""Signature verification of book transactions, one by one versus in batch on a pool of processes
+
+	python -m benchmarks.bench_verification
+"""
+from modules.blockchain.cryp import Cryp
+from modules.blockchain.verification import SignatureVerifier
+
+from benchmarks.common import make_transactions, print_table, timed
+
+SIZES = (1000, 10000)
+
+
+def main():
+	transactions = make_transactions(max(SIZES))
+	verifier = SignatureVerifier()
+	rows = []
+	try:
+		# Start the pool before measuring
+		verifier.verify([transactions[0].signature_item()] * verifier.inline_threshold)
+
+		for size in SIZES:
+			items = [transaction.signature_item() for transaction in transactions[:size]]
+			before, _ = timed(lambda: [Cryp.verify_signature(Cryp.load_pub(Cryp.dump_pub(key)), sig, data)
+									   for key, sig, data in items])
+			after, results = timed(verifier.verify, items)
+			assert all(results)
+			rows.append((size, f'{size / before:,.0f}', f'{size / after:,.0f}'))
+	finally:
+		verifier.close()
+
+	print_table(('signatures', 'one by one (sig/s)', 'batch (sig/s)'), rows)
+
+
+if __name__ == '__main__':
+	main()
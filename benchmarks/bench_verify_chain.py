@@ -0,0 +1,40 @@
+"""Verification of a received chain, block by block versus ranges of blocks checked on a pool of processes
+
+	python -m benchmarks.bench_verify_chain
+"""
+from modules.blockchain.blockchain import BlockChain
+from modules.blockchain.transaction import Transaction
+from modules.blockchain.verification import SignatureVerifier
+
+from benchmarks.bench_block_hash import copy_chain, make_chain
+from benchmarks.common import make_transactions, print_table, timed
+
+SIZES = (1000, 10000, 50000)
+
+
+def main():
+	transactions = make_transactions(2) + [Transaction(sender=None, recipient='zeddo', book=None, transaction_type=2)]
+	chain = make_chain(max(SIZES), transactions, mine=True)
+	verifier = SignatureVerifier()
+	rows = []
+	try:
+		# Start the pool and fill the signature cache, only the block checks are compared
+		verifier.map(abs, [0])
+		BlockChain.check_blocks(chain[:2], verifier=verifier)
+
+		for size in SIZES:
+			# Received blocks, their hashes are not computed yet
+			serial_chain, parallel_chain = copy_chain(chain[:size]), copy_chain(chain[:size])
+			before, flags = timed(BlockChain.check_blocks, serial_chain, verifier=verifier)
+			after, parallel_flags = timed(BlockChain.check_blocks, parallel_chain, verifier=verifier, parallel=True)
+			assert flags == parallel_flags == []
+			rows.append((size, f'{before:.3f}', f'{after:.3f}', f'{before / after:.2f}x'))
+	finally:
+		verifier.close()
+
+	print(f'{verifier.pool_size()} worker processes')
+	print_table(('blocks', 'serial (s)', 'parallel (s)', 'speed-up'), rows)
+
+
+if __name__ == '__main__':
+	main()
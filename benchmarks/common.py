@@ -0,0 +1,79 @@
+"""Helpers shared by the benchmark scripts
+
+The benchmarks are ran from the root of the repository, e.g. ``python -m benchmarks.bench_mining``
+"""
+from time import perf_counter
+
+from fastecdsa.keys import import_key
+from fastecdsa.curve import secp256k1
+
+from modules.blockchain.book import Book
+from modules.blockchain.transaction import Transaction
+
+KEY_PATH = 'tests/blockchain/test_files/default_keyprv.pem'
+
+
+def load_keys():
+	"""Load the key pair used by the tests
+
+	:returns: the private and public key
+	:rtype: tuple
+	"""
+	return import_key(KEY_PATH, curve=secp256k1)
+
+
+def make_transactions(number, keys=None):
+	"""Create signed book transactions
+
+	:param number: number of transactions to create
+	:type number: int
+
+	:param keys: the (private, public) key pair to sign with, defaults to the test keys
+	:type keys: tuple, optional
+
+	:returns: the transactions
+	:rtype: list
+	"""
+	private_key, public_key = keys or load_keys()
+	transactions = []
+	for i in range(number):
+		book = Book(f'Title {i}', f'Author {i % 97}', str(1900 + i % 120), 'Non-fiction')
+		transactions.append(Transaction(public_key, public_key, book, private_key))
+	return transactions
+
+
+def rate(function, duration=1.0):
+	"""Call `function` repeatedly for about `duration` seconds
+
+	:param function: the function to measure, it takes the iteration number
+	:type function: callable
+
+	:returns: number of calls per second
+	:rtype: float
+	"""
+	calls = 0
+	start = perf_counter()
+	elapsed = 0
+	while elapsed < duration:
+		function(calls)
+		calls += 1
+		elapsed = perf_counter() - start
+	return calls / elapsed
+
+
+def timed(function, *args, **kwargs):
+	"""Time a single call of `function`
+
+	:returns: the elapsed time in seconds and the result of the call
+	:rtype: tuple
+	"""
+	start = perf_counter()
+	result = function(*args, **kwargs)
+	return perf_counter() - start, result
+
+
+def print_table(header, rows):
+	"""Print the results as an aligned table"""
+	widths = [max(len(str(row[i])) for row in [header] + rows) for i in range(len(header))]
+	for row in [header] + rows:
+		print('  '.join(str(cell).rjust(width) for cell, width in zip(row, widths)))
@@ -0,0 +1,236 @@
+"""Regression suite of the blockchain core, compared against a stored baseline
+
+Every case is timed `--repeat` times on real blocks *(nothing is patched)*, the best time is kept.
+Like `timeit`, the fast cases are called enough times to last `MIN_TIME` and the garbage collector
+is disabled while timing. The whole suite is ran `--rounds` times, the result of a case is the median
+of its rounds and its noise the spread of the rounds around it.
+The results are written as json and compared with the baseline, the suite fails *(exit status 1)*
+when a case is slower than the baseline by more than the threshold plus the noise of the case in the
+baseline *(a noisy case needs a larger change to be reported)*.
+
+	python -m benchmarks.suite
+	python -m benchmarks.suite --output results.json --threshold 0.25
+	python -m benchmarks.suite --save-baseline --rounds 7
+
+The stored baseline was measured on one machine, save a new one before comparing on another.
+"""
+import argparse
+import gc
+import json
+import platform
+import sys
+from statistics import median
+from time import perf_counter
+
+from modules.blockchain.blockchain import BlockChain
+from modules.blockchain.cryp import Cryp
+from modules.blockchain.transaction import Transaction
+from modules.blockchain.verification import SignatureVerifier
+
+from benchmarks.bench_block_hash import copy_chain, make_chain
+from benchmarks.common import load_keys, make_transactions, print_table
+
+BASELINE = 'benchmarks/baseline.json'
+SIZES = (100, 1000, 2000)
+REPEAT = 3
+ROUNDS = 3
+THRESHOLD = 0.25
+MIN_TIME = 0.2
+
+# Signatures computed and verified by the signature cases, blocks mined by the proof of work case
+SIGNATURES = 200
+MINED = 500
+
+
+def make_blockchain(block_chain):
+	blockchain = BlockChain(debug=False)
+	blockchain.block_chain = block_chain
+	return blockchain
+
+
+def cases(sizes):
+	"""The cases of the suite
+
+	:returns: (name, prepare) pairs, `prepare` returns the function to time *(the preparation is not timed)*
+	:rtype: list of tuple
+	"""
+	transactions = make_transactions(2) + [Transaction(sender=None, recipient='zeddo', book=None, transaction_type=2)]
+	chain = make_chain(max(sizes + [MINED]), transactions)
+	private_key, public_key = load_keys()
+	data = [f'Title {i}' for i in range(SIGNATURES)]
+	signatures = [Cryp.get_signature(text, private_key) for text in data]
+
+	def proof_of_work():
+		# The same last blocks and template every run, the searches do the same work
+		miners = [make_blockchain(chain[i:i + 1]) for i in range(MINED)]
+		return lambda: [miner.proof_of_work(transactions) for miner in miners]
+
+	def sign():
+		return lambda: [Cryp.get_signature(text, private_key) for text in data]
+
+	def verify_signature():
+		return lambda: all(Cryp.verify_signature(public_key, signature, text) for signature, text in zip(signatures, data))
+
+	def hash_block(size):
+		# Received blocks, their hashes are not computed yet
+		blocks = copy_chain(chain[:size])
+		return lambda: [block.hash_block() for block in blocks]
+
+	def verify_blockchain(size):
+		# A verifier without cache, every signature is verified
+		blockchain = make_blockchain(copy_chain(chain[:size]))
+		verifier = SignatureVerifier(processes=1, cache_size=0)
+		return lambda: BlockChain.verify_blockchain(blockchain, verifier=verifier)
+
+	def json_round_trip(size):
+		blockchain = make_blockchain(chain[:size])
+		return lambda: BlockChain.json_to_blockchain(json.loads(json.dumps(blockchain.to_json())))
+
+	def fork_chain(size):
+		blockchain = make_blockchain(chain[:size])
+		return lambda: blockchain.fork_chain()
+
+	suite = [
+		(f'proof_of_work[{MINED}]', proof_of_work),
+		(f'Cryp.sign[{SIGNATURES}]', sign),
+		(f'Cryp.verify_signature[{SIGNATURES}]', verify_signature),
+	]
+	for size in sizes:
+		for name, prepare in (('hash_block', hash_block), ('verify_blockchain', verify_blockchain),
+							  ('json_round_trip', json_round_trip), ('fork_chain', fork_chain)):
+			suite.append((f'{name}[{size}]', lambda prepare=prepare, size=size: prepare(size)))
+	return suite
+
+
+def _time(functions):
+	enabled = gc.isenabled()
+	gc.disable()
+	try:
+		start = perf_counter()
+		for function in functions:
+			function()
+		return perf_counter() - start
+	finally:
+		if enabled:
+			gc.enable()
+
+
+def measure(prepare, repeat=REPEAT, min_time=MIN_TIME):
+	"""Best time of a case
+
+	Every call gets its own prepared function *(the blocks cache their hash)*, the number of calls
+	per run is raised until a run lasts `min_time`.
+
+	:returns: the time of one call in each run
+	:rtype: list of float
+	"""
+	number = 1
+	while True:
+		elapsed = _time([prepare() for _ in range(number)])
+		if elapsed >= min_time:
+			break
+		number = min(number * 10, max(number + 1, int(number * min_time / max(elapsed, 1e-9) * 1.2)))
+
+	runs = [elapsed / number]
+	for _ in range(repeat - 1):
+		runs.append(_time([prepare() for _ in range(number)]) / number)
+	return runs
+
+
+def run(sizes=SIZES, repeat=REPEAT, only=None, rounds=ROUNDS):
+	"""Time the cases
+
+	The rounds run every case in turn, a slow period of the machine affects one round of several cases
+	instead of all the rounds of one case
+
+	:param only: run the cases whose name contains this string, defaults to None *(all)*
+	:type only: str, optional
+	:param rounds: number of times the suite is ran, defaults to `ROUNDS`
+	:type rounds: int, optional
+
+	:returns: the median of the best time of each round, the relative spread of the rounds *(noise)*
+		and the best time of every round, per case
+	:rtype: dict
+	"""
+	selected = [(name, prepare) for name, prepare in cases(list(sizes)) if only is None or only in name]
+	times = {name: [] for name, _ in selected}
+	for _ in range(rounds):
+		for name, prepare in selected:
+			times[name].append(min(measure(prepare, repeat)))
+
+	results = {}
+	for name, rounds_times in times.items():
+		seconds = median(rounds_times)
+		results[name] = {'seconds': seconds, 'noise': (max(rounds_times) - min(rounds_times)) / seconds,
+						 'rounds': rounds_times}
+	return results
+
+
+def compare(results, baseline, threshold=THRESHOLD):
+	"""Compare the results with the baseline
+
+	A case is slower than allowed when its change is above `threshold` plus its noise in the baseline
+
+	:returns: the rows of the comparison table and the names of the cases slower than allowed
+	:rtype: tuple (list, list)
+	"""
+	rows, regressions = [], []
+	for name, result in results.items():
+		reference = baseline.get(name, {}).get('seconds')
+		if reference is None:
+			rows.append((name, '-', f'{result["seconds"]:.4f}', '-', 'new'))
+			continue
+		allowed = threshold + baseline[name].get('noise', 0)
+		change = result['seconds'] / reference - 1
+		slower = change > allowed
+		if slower:
+			regressions.append(name)
+		rows.append((name, f'{reference:.4f}', f'{result["seconds"]:.4f}', f'{allowed:.0%}',
+					 f'{change:+.1%}' + (' REGRESSION' if slower else '')))
+	return rows, regressions
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description='Regression suite of the blockchain core')
+	parser.add_argument('--sizes', metavar='N', type=int, nargs='+', default=list(SIZES), help='chain sizes')
+	parser.add_argument('--repeat', metavar='N', type=int, default=REPEAT, help='runs per case, the best one is kept')
+	parser.add_argument('--rounds', metavar='N', type=int, default=ROUNDS,
+						help='runs of the whole suite, the median of the rounds is kept')
+	parser.add_argument('--only', metavar='NAME', default=None, help='run the cases whose name contains NAME')
+	parser.add_argument('--output', metavar='FILE', default=None, help='write the results as json')
+	parser.add_argument('--baseline', metavar='FILE', default=BASELINE, help='the results to compare with')
+	parser.add_argument('--threshold', metavar='RATIO', type=float, default=THRESHOLD,
+						help='fail when a case is slower than the baseline by more than RATIO (0.25 = 25%%) plus its noise')
+	parser.add_argument('--save-baseline', action='store_true', help='write the results as the new baseline')
+	arg = parser.parse_args(argv)
+
+	results = run(arg.sizes, arg.repeat, arg.only, arg.rounds)
+	report = {'python': platform.python_version(), 'machine': platform.machine(), 'results': results}
+
+	if arg.output:
+		with open(arg.output, 'w') as f:
+			json.dump(report, f, indent=2)
+	if arg.save_baseline:
+		with open(arg.baseline, 'w') as f:
+			json.dump(report, f, indent=2)
+		print_table(('case', 'seconds', 'noise'), [(name, f'{result["seconds"]:.4f}', f'{result["noise"]:.1%}')
+												   for name, result in results.items()])
+		return 0
+
+	try:
+		with open(arg.baseline) as f:
+			baseline = json.load(f)['results']
+	except FileNotFoundError:
+		baseline = {}
+	rows, regressions = compare(results, baseline, arg.threshold)
+	print_table(('case', 'baseline (s)', 'current (s)', 'allowed', 'change'), rows)
+
+	if regressions:
+		print(f'{len(regressions)} case(s) slower than the baseline by more than {arg.threshold:.0%} plus their noise: '
+			  f'{", ".join(regressions)}')
+		return 1
+	return 0
+
+
+if __name__ == '__main__':
+	sys.exit(main())
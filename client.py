@@ -4,10 +4,12 @@ and broadcast a transaction into the network
 from twisted.internet.endpoints import TCP4ClientEndpoint, connectProtocol
 from twisted.internet import reactor
 from modules.protocols.protocol_client import *
+from modules.logs import setup_logging
 
 
 if __name__ == '__main__':
 	print('--Start')
+	setup_logging('INFO')
 	host, port = "localhost", 5000
 
 	seed_point = TCP4ClientEndpoint(reactor, host, port)
@@ -1,6 +1,8 @@
 import datetime
 import json
 
+from modules.blockchain.encoding import ENCODING_VERSION, encode_hash, encode_str, encode_varint
+from modules.blockchain.merkle import merkle_proof, merkle_root, verify_proof
 from modules.blockchain.transaction import *
 
 
@@ -12,8 +14,11 @@ class Block:
         :attr previous_hash: The previous hash of the block
         :type previous_hash: str
 
-        :attr transactions: All the transactions in the block
-        :type transactions: list
+        :attr transactions: All the transactions in the block, None for a header-only block
+        :type transactions: tuple
+
+        :attr merkle_root: The merkle root of the transaction hashes *(hex)*
+        :type merkle_root: str
 
         :attr index: The number of the block in the chain
         :type index: int
@@ -28,11 +33,21 @@ class Block:
 
         :meth __init__: Constructor of the class
         :meth to_json: Create a json file of the block
-        :meth hash_block: Calculate the hash of the block
+        :meth header_json: Create a json file of the header of the block *(no transactions)*
+        :meth header_bytes: Canonical encoding of the block header
+        :meth merkle_proof: Build the inclusion proof of a transaction
+        :meth verify_inclusion: (staticmethod) Verify the inclusion proof of a transaction
+        :meth hash_block: Calculate the hash of the block *(cached until a field changes)*
+        :meth compute_hash: Calculate the hash of the block without the cached values *(verification)*
         :meth __str__: magic method, prints the block
 
     """
 
+    # Fields covered by the hash, assigning one of them drops the cached hash.
+    # The transactions are kept in a tuple, an edited transaction is only seen by `compute_hash`
+    _HASHED_FIELDS = frozenset(('previous_hash', 'index', 'transactions', 'nonce', 'timestamp',
+                                '_header_merkle_root'))
+
     def __init__(self, previous_hash=None, transactions=[], index=0, nonce=208393, override=False):
         """Block class constructor
         :param previous_hash: The previous hash of the block
@@ -49,7 +64,7 @@ class Block:
         """
         self.previous_hash = previous_hash
         self.index = index
-        self.transactions = list(transactions)
+        self.transactions = transactions
         self.nonce = nonce
         self.timestamp = self.date_time_now() if not override else None
         self.hash = self.hash_block() if not override else None
@@ -78,7 +93,7 @@ class Block:
         json_dict = {
             'previous_hash': self.previous_hash,
             'index': self.index,
-            'transactions': list(map(Transaction.to_json, self.transactions)),
+            'transactions': list(map(Transaction.to_json, self.transactions)) if self.transactions is not None else None,
             'nonce': self.nonce,
             'Timestamp': self.timestamp
         }
@@ -88,15 +103,132 @@ class Block:
 
         return json_dict
 
+    def header_json(self) -> dict:
+        """
+        header_json converts the header of the block into a json object
+
+        The header is all a light client needs to follow the chain, the transactions
+        are represented by the merkle root
+        :returns: a dict (json) of the block without its transactions
+        :rtype: dict
+        """
+        return {
+            'previous_hash': self.previous_hash,
+            'index': self.index,
+            'merkle_root': self.merkle_root,
+            'nonce': self.nonce,
+            'Timestamp': self.timestamp,
+            'hash': self.hash
+        }
+
+    def __setattr__(self, name, value):
+        if name in self._HASHED_FIELDS:
+            self.__dict__.pop('_block_hash', None)
+            if name == 'transactions':
+                self.__dict__.pop('_merkle_root', None)
+                if value is not None:
+                    value = tuple(value)
+        object.__setattr__(self, name, value)
+
+    @property
+    def merkle_root(self) -> str:
+        """The merkle root of the transaction hashes *(hex)*
+
+        Computed once from the transactions, a header-only block keeps the received one
+        """
+        if self.transactions is None:
+            return self._header_merkle_root
+        try:
+            return self._merkle_root
+        except AttributeError:
+            self._merkle_root = merkle_root([t.hash_transaction() for t in self.transactions]).hex()
+            return self._merkle_root
+
+    @merkle_root.setter
+    def merkle_root(self, value):
+        # Only used by header-only blocks, a full block computes its root from the transactions
+        self._header_merkle_root = value
+
+    def merkle_proof(self, index) -> list:
+        """merkle_proof builds the inclusion proof of the transaction at `index`
+
+        :param index: position of the transaction in the block
+        :type index: int
+
+        :returns: the siblings from the leaf to the root *see `modules.blockchain.merkle`*
+        :rtype: list
+        """
+        return merkle_proof([t.hash_transaction() for t in self.transactions], index)
+
+    @staticmethod
+    def verify_inclusion(transaction, proof, root) -> bool:
+        """verify_inclusion checks that a transaction is part of the block of merkle root `root`
+
+        Only the header of the block is needed
+        :param transaction: the transaction
+        :type transaction: Transaction
+
+        :param proof: the proof returned by `merkle_proof`
+        :type proof: list
+
+        :param root: the merkle root of the block
+        :type root: str
+
+        :rtype: bool
+        """
+        return verify_proof(transaction.hash_transaction(), proof, root)
+
+    def header_bytes(self, merkle_root=None) -> bytes:
+        """header_bytes returns the canonical encoding of the block *see `modules.blockchain.encoding`*
+
+        The transactions are represented by their merkle root, so the size of the header
+        doesn't depend on the number of transactions
+        :param merkle_root: the merkle root to encode *(hex)*, defaults to None *(the one of the block)*
+        :type merkle_root: str, optional
+
+        :returns: version, index, previous hash, nonce, time-stamp and merkle root
+        :rtype: bytes
+        """
+        return b''.join((
+            encode_varint(ENCODING_VERSION),
+            encode_varint(self.index),
+            encode_hash(self.previous_hash),
+            encode_varint(self.nonce),
+            encode_str(self.timestamp),
+            bytes.fromhex(merkle_root if merkle_root is not None else self.merkle_root)
+        ))
+
     def hash_block(self) -> str:
         """hash_block calculate the hash of the block
+
+        The hash is computed once and kept until a hashed field is assigned
+        :returns: hash of the block
+        :rtype: str
+        """
+        try:
+            return self._block_hash
+        except AttributeError:
+            self._block_hash = hashlib.sha256(self.header_bytes()).hexdigest()
+            return self._block_hash
+
+    def compute_hash(self) -> str:
+        """compute_hash calculates the hash of the block from its fields, the cached hashes are not used
+
+        The transactions are encoded again, so a transaction edited in place after the block
+        was hashed gives a different hash. Used to verify the blocks
         :returns: hash of the block
         :rtype: str
         """
-        return hashlib.sha256(json.dumps(self.to_json(hash=True)).encode()).hexdigest()
+        if self.transactions is None:
+            root = self._header_merkle_root
+        else:
+            root = merkle_root([hashlib.sha256(t.to_bytes()).digest() for t in self.transactions]).hex()
+        return hashlib.sha256(self.header_bytes(root)).hexdigest()
 
     def __eq__(self, other):
-        return self.to_json() == other.to_json()
+        if not isinstance(other, Block):
+            return NotImplemented
+        return self.hash == other.hash and self.hash_block() == other.hash_block()
 
     def __repr__(self):
         return str(self.to_json())
@@ -111,12 +243,15 @@ class Block:
     @staticmethod
     def json_to_block(b_json):
         bk = Block(transactions=[], override=True)
+        # A header json *(see header_json)* gives a header-only block
+        if 'transactions' not in b_json:
+            bk.transactions = None
+
         for key, val in b_json.items():
             if key == 'transactions':
                 # When converting the json object to a bk
                 # Converting all the transaction to Transaction object is necessary
-                for i in val:
-                    bk.transactions.append(Transaction.json_to_transaction(i))
+                bk.transactions = [Transaction.json_to_transaction(i) for i in val]
             else:
                 setattr(bk, key.lower(), val)
 
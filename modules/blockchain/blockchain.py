@@ -1,11 +1,56 @@
 import copy as cp
-from pprint import pprint as pp
-
-from termcolor import colored
+from time import perf_counter
 
 from modules.blockchain.block import *
+from modules.blockchain.blocklist import BlockList
+from modules.blockchain.blocktree import BlockTree
 from modules.blockchain.book import *
+from modules.blockchain.mempool import Mempool
+from modules.blockchain.mining import DIFFICULTY, NonceSearch
 from modules.blockchain.transaction import *
+from modules.blockchain.verification import default_verifier
+from modules.logs import get_logger
+from modules.metrics import REGISTRY
+
+log = get_logger('blockchain')
+
+BLOCKS_MINED = REGISTRY.counter('openbook_blocks_mined_total', 'Blocks mined by the node')
+# The nonce of a block approximates the number of hashes tried to find it
+MINING_HASHES = REGISTRY.counter('openbook_mining_hashes_total', 'Hashes computed to mine the blocks (approximation)')
+MINING_SECONDS = REGISTRY.counter('openbook_mining_seconds_total', 'Time spent mining')
+VERIFICATION_SECONDS = REGISTRY.histogram('openbook_chain_verification_seconds', 'Time spent verifying a chain')
+
+# Below this number of blocks a parallel check costs more than it saves
+PARALLEL_MIN_BLOCKS = 1024
+
+
+def _check_links(block_chain, start, stop, offset=0):
+	"""Recalculate the hashes of `block_chain[start:stop]` and compare each block with the previous one
+
+	The proof of work is checked on the blocks carrying their transactions *(not on the header-only ones)*
+	:returns: the flags, the blocks are numbered from `offset`
+	:rtype: list of str
+	"""
+	flags = []
+	for i in range(start, stop):
+		block = block_chain[i]
+		block1 = block_chain[i - 1]
+
+		if block.hash != block.compute_hash():
+			flags.append(f"[!] Found difference between the hash and the calculated one in the block {i + offset}")
+		elif block1.hash != block.previous_hash:
+			flags.append(f"[!] Found difference between the hash of a block and the one previous in the block {i + offset}")
+		elif block1.timestamp >= block.timestamp:
+			flags.append(f"[!] Found irregularity between the time-stamps in the block {i + offset}")
+		elif block.transactions is not None and not BlockChain.valid_block_proof(block):
+			flags.append(f"[!] Found an invalid proof of work in the block {i + offset}")
+	return flags
+
+
+def _check_links_range(blocks_offset):
+	"""Check a range of blocks *(ran in the worker processes)*, the first block of the range is its predecessor"""
+	blocks, offset = blocks_offset
+	return _check_links(blocks, 1, len(blocks), offset)
 
 
 class BlockChain:
@@ -17,7 +62,10 @@ class BlockChain:
 		:type block_chain: list
 		
 		:attr open_transaction: All the transactions to be added
-		:type open_transaction: list
+		:type open_transaction: Mempool *-mempool.py*
+
+		:attr tree: The verified blocks of the chain and of its forks, by hash
+		:type tree: BlockTree *-blocktree.py*
 
 	:Methods:
 	
@@ -27,10 +75,34 @@ class BlockChain:
 		
 		:meth valid_proof: Verify the hash guess
 		
+		:meth valid_block_proof: Verify the proof of work of a mined block
+
 		:meth proof_of_work: Calculate the hash of the block and return nonce
 		
 		:meth create_append_transaction: Create and append a transaction to the open transaction list
 		
+		:meth check_blocks: Check a range of blocks
+
+		:meth verify_blockchain: Verify the whole chain
+
+		:meth valid_prefix: Number of blocks whose hash, link and proof are valid *(restored chain)*
+
+		:meth verify_branch: Verify received blocks that extend the chain or one of its forks
+
+		:meth branch_segment: The received blocks preceded by their parent in the tree
+
+		:meth check_branch: Check a segment of received blocks *(out of the reactor thread)*
+
+		:meth reorganize: Add verified blocks to the tree and switch the chain to the best tip
+
+		:meth block_locator: Positions of the chain sent to find the common ancestor with a peer
+
+		:meth find_fork: Number of blocks shared with a peer given its block locator
+
+		:meth headers: The headers of a range of blocks
+
+		:meth mine_candidate: mine a block extending the tip without adding it *(out of the reactor thread)*
+
 		:meth mine_block: mine the new block + add the reward transaction
 		
 		:meth number_blocks: gives number of block in the chain
@@ -39,8 +111,12 @@ class BlockChain:
 
 	"""
 
-	def __init__(self, override=False, debug=True):
-		"""Constructor of the class"""
+	def __init__(self, override=False, debug=True, mempool=None):
+		"""Constructor of the class
+
+		:param mempool: the open transactions, defaults to an empty mempool with the default limits
+		:type mempool: Mempool *-mempool.py*, optional
+		"""
 
 		# Create the genesis block (the first block in the chain)
 		if not override:
@@ -51,11 +127,12 @@ class BlockChain:
 			genesis_block = None
 			self.block_chain = []
 
-		# a list containing all the forks of a chain at the same level
-		self.chains_same_level = [self.block_chain]
-		self.open_transactions = []
+		self.open_transactions = mempool if mempool is not None else Mempool()
 		self.debug = debug
 
+		# Built from the chain when it is first used
+		self._tree = None
+
 	def valid_proof(self, last_hash, nonce):
 		"""Verify the hash guess
 		
@@ -70,16 +147,36 @@ class BlockChain:
 		
 		"""
 
-		guess = (str(list(map(str, self.open_transactions))) + str(last_hash) + str(nonce)).encode()
+		guess = NonceSearch.serialize_prefix(self.open_transactions, last_hash) + str(nonce).encode()
 
 		guess_hash = hashlib.sha256(guess).hexdigest()
 
-		# print(guess_hash)
+		return guess_hash.startswith(DIFFICULTY)
+
+	@staticmethod
+	def valid_block_proof(block):
+		"""Verify the proof of work of a mined block
 
-		return guess_hash[0:2] == '42'  # 42 is the difficulty to find the hash
+		The nonce is searched over the transactions of the block without its reward *(the last one)*
+		:param block: the block
+		:type block: Block
 
-	def proof_of_work(self):
+		:rtype: bool
+		"""
+		guess = NonceSearch.serialize_prefix(block.transactions[:-1], block.previous_hash) + str(block.nonce).encode()
+		return hashlib.sha256(guess).hexdigest().startswith(DIFFICULTY)
+
+	def proof_of_work(self, transactions=None, last_hash=None):
 		"""Search for the right hash by adjusting the `nonce` value
+
+		The open transactions and the last hash are serialized once for the whole search,
+		see *`modules.blockchain.mining.NonceSearch`*
+
+		:param transactions: the transactions of the block, defaults to the block template of the mempool
+		:type transactions: list, optional
+
+		:param last_hash: the hash of the block to extend, defaults to None *(the last block)*
+		:type last_hash: str, optional
 		
 		:var nonce: field whose value is adjusted by miners so that the hash of
 			the block will be the current target (for now it's 42 as the first two chars) of the network
@@ -89,37 +186,128 @@ class BlockChain:
 		:rtype: int
 		"""
 
-		last_block = self.block_chain[-1]
-		last_hash = last_block.hash
+		if last_hash is None:
+			last_hash = self.block_chain[-1].hash
 
-		nonce = 0
-		while not self.valid_proof(last_hash, nonce):
-			nonce += 1
+		if transactions is None:
+			transactions = self.open_transactions.block_template()
 
-		return nonce
+		return NonceSearch.from_transactions(transactions, last_hash).search()
 
 	# TODO: change the name of this method
-	def create_append_transaction(self, new_transaction):
+	def create_append_transaction(self, new_transaction, verified=False):
 		"""This method create a transaction and append it to the Open transaction attr
 		
 		:param new_transaction: new transaction
 		:type new_transaction: Transaction object -> *`modules.blockchain.transaction`*
+
+		:param verified: the signature has already been verified, defaults to False
+		:type verified: bool, optional
 		
-		:returns: None
+		:returns: True if the transaction was added *(verified and not already in the mempool)*
+		:rtype: bool
+		"""
+		if new_transaction in self.open_transactions:
+			return False
+		if verified or self.verify_transaction(new_transaction):
+			return self.open_transactions.add(new_transaction)
+		return False
+
+	def verify_transaction(self, new_transaction):
+		"""Verify the signature of a transaction
+
+		Reward transactions are only created by `mine_block`, they are refused
+		:param new_transaction: the transaction to verify
+		:type new_transaction: Transaction object -> *`modules.blockchain.transaction`*
+
+		:returns: the transaction can be added to the open transactions
+		:rtype: bool
+		"""
+		return default_verifier.verify_transactions([new_transaction])[0]
+
+	@staticmethod
+	def check_blocks(block_chain, start=1, stop=None, verifier=None, parallel=False, trusted=False):
+		"""Check the blocks of `block_chain[start:stop]` against their predecessor
+
+		The hash of each block is recalculated, its link and time-stamp are compared with
+		the previous block and the signatures of its transactions are verified in one batch
+		:param block_chain: the blocks
+		:type block_chain: list
+		:param start: the first block to check *(block_chain[start - 1] is trusted)*, defaults to 1
+		:type start: int, optional
+		:param stop: the check stops before this block, defaults to None *(the end of the chain)*
+		:type stop: int, optional
+		:param verifier: verifies the signatures, defaults to the shared verifier
+		:type verifier: SignatureVerifier *-verification.py*, optional
+		:param parallel: check ranges of blocks on the pool of the verifier, defaults to False
+		:type parallel: bool, optional
+		:param trusted: the first block is a local block, its signatures are not verified when `start` is 1
+			*(they are for a whole received chain)*, defaults to False
+		:type trusted: bool, optional
+		:returns: one flag per irregularity found
+		:rtype: list of str
 		"""
-		if self.verify_transaction(new_transaction):
-			self.open_transactions.append(new_transaction)
+		verifier = verifier or default_verifier
+		stop = len(block_chain) if stop is None else stop
+		start = max(start, 1)
+
+		if parallel and stop - start >= PARALLEL_MIN_BLOCKS:
+			# Each range is sent with the block before it, the links between two ranges are checked too
+			size = max(PARALLEL_MIN_BLOCKS // 4, -(-(stop - start) // (4 * verifier.pool_size())))
+			ranges = [(block_chain[first - 1:min(first + size, stop)], first - 1) for first in range(start, stop, size)]
+			flags = [flag for range_flags in verifier.map(_check_links_range, ranges) for flag in range_flags]
+		else:
+			flags = _check_links(block_chain, start, stop)
+
+		# Verify all the signatures in one batch, the ones already verified are cached
+		transactions, positions = [], []
+		for i in range(0 if start == 1 and not trusted else start, stop):
+			for transaction in block_chain[i].transactions or ():
+				if transaction.type == 1:
+					transactions.append(transaction)
+					positions.append(i)
+
+		results = verifier.verify_transactions(transactions)
+		invalid = sorted({i for i, valid in zip(positions, results) if not valid})
+		for i in invalid:
+			flags.append(f"[!] Found a transaction with an invalid signature in the block {i}")
 
-	def verify_transaction(self, new_transaction):  # TODO: complete this method
-		pass
+		return flags
 
 	@staticmethod
-	def verify_blockchain(blockchain, flag_list=False):
+	def valid_prefix(block_chain, start=0):
+		"""Number of blocks at the start of `block_chain` whose hash, link to the previous block and proof are valid
+
+		The signatures are not verified *(a chain restored from the disk was verified before being written)*
+		:param block_chain: the blocks, from the genesis block
+		:type block_chain: list of Block
+
+		:param start: the blocks before it are trusted *(checked before)*, defaults to 0
+		:type start: int, optional
+
+		:returns: the height of the first invalid block, the length of the chain if they are all valid
+		:rtype: int
+		"""
+		if not start and (not block_chain or block_chain[0].hash != block_chain[0].compute_hash()):
+			return 0
+		for i in range(max(start, 1), len(block_chain)):
+			if _check_links(block_chain, i, i + 1):
+				return i
+		return len(block_chain)
+
+	@staticmethod
+	def verify_blockchain(blockchain, flag_list=False, verifier=None, parallel=False):
 		"""Verify if a block-chain hasn't been tampered with
 		
-		loop through the block and verify the difference between the hashes
+		loop through the block and verify the difference between the hashes,
+		the blocks can be header-only *(the hash only covers the merkle root of the transactions)*.
+		The signatures of all the transactions are verified in one batch
 		:param blockchain: the block-chain to be verified
 		:type blockchain: BlockChain *-blockchain.py*
+		:param verifier: verifies the signatures, defaults to the shared verifier
+		:type verifier: SignatureVerifier *-verification.py*, optional
+		:param parallel: check ranges of blocks on the pool of the verifier *(long chains)*, defaults to False
+		:type parallel: bool, optional
 		:returns: the chain is valid or not
 		:rtype: {bool}
 		"""
@@ -127,58 +315,245 @@ class BlockChain:
 			block_chain = blockchain.block_chain
 		else:
 			block_chain = blockchain
-		flags = []
-
-		for i in range(1, len(block_chain)):
-			block = block_chain[i]
-			block1 = block_chain[i - 1]
 
-			if block.hash != block.hash_block():
-				flags.append("[!] Found difference between the hash and the calculated one")
-			elif block1.hash != block.previous_hash:
-				flags.append("[!] Found difference between the hash of a block and the one previous")
-			elif block1.timestamp >= block.timestamp:
-				flags.append("[!] Found irregularity between the time-stamps")
+		start = perf_counter()
+		flags = BlockChain.check_blocks(block_chain, verifier=verifier, parallel=parallel)
+		VERIFICATION_SECONDS.observe(perf_counter() - start)
 
 		if not flag_list:
-			blockchain._debug(flags)
+			blockchain._debug('verification flags %s', flags)
 
 		return True if len(flags) == 0 else False
 
-	def mine_block(self, recipient):
-		"""This method mine the new block with the opentransaction list
+	def block_locator(self):
+		"""Positions of the local chain sent to a peer to find the last block both chains share
 
-		:param recipient: Miner's ID - who is being rewarded for mining the block 
+		The last ten blocks are listed, then the step doubles back to the genesis block,
+		so the locator stays small however long the chain is
+		:returns: the heights and hashes of the blocks, from the tip
+		:rtype: list of [int, str]
+		"""
+		locator, height, step = [], len(self.block_chain) - 1, 1
+		while height > 0:
+			locator.append([height, self.block_chain[height].hash])
+			if len(locator) >= 10:
+				step *= 2
+			height -= step
+		if self.block_chain:
+			locator.append([0, self.block_chain[0].hash])
+		return locator
+
+	def find_fork(self, locator):
+		"""Number of blocks the local chain shares with the chain of a peer
+
+		:param locator: the block locator of the peer *see `block_locator`*
+		:type locator: list of [int, str]
+		:returns: the height of the first block that is not shared
+		:rtype: int
+		"""
+		for height, block_hash in locator:
+			if 0 <= height < len(self.block_chain) and self.block_chain[height].hash == block_hash:
+				return height + 1
+		return 0
+
+	def headers(self, start, stop=None):
+		"""The headers of the blocks `block_chain[start:stop]` *see `Block.header_json`*
+
+		:rtype: list of dict
+		"""
+		return [block.header_json() for block in self.block_chain[start:stop]]
+
+	@property
+	def tree(self):
+		"""The verified blocks of the chain and of its forks *(see `BlockTree`)*
+
+		The tree is built from the blocks of the chain, it is built again if the chain was replaced
+		*(its last block is not in the tree)*
+		"""
+		if self._tree is None or (self.block_chain and self.block_chain[-1].hash not in self._tree):
+			self._tree = BlockTree(self.block_chain)
+		return self._tree
+
+	def verify_branch(self, blocks, verifier=None):
+		"""Verify received blocks that extend the chain or one of its forks
+
+		The first block is checked against its parent in the tree *(trusted)*, a genesis block
+		only has its hash and its signatures checked
+		:param blocks: the blocks, each one following the previous one
+		:type blocks: list of Block
+		:param verifier: verifies the signatures, defaults to the shared verifier
+		:type verifier: SignatureVerifier *-verification.py*, optional
+		:returns: one flag per irregularity found
+		:rtype: list of str
+		"""
+		segment = self.branch_segment(blocks)
+		if segment is None:
+			return ["[!] The first block does not follow a known block"]
+
+		start = perf_counter()
+		flags = BlockChain.check_branch(segment, bool(blocks) and blocks[0].previous_hash is not None, verifier)
+		VERIFICATION_SECONDS.observe(perf_counter() - start)
+		return flags
+
+	def branch_segment(self, blocks):
+		"""The received blocks preceded by their parent in the tree
+
+		Ran on the reactor thread, the segment is then checked by `check_branch` on any thread
+		:param blocks: the blocks, each one following the previous one
+		:type blocks: list of Block
+		:returns: the parent block and the blocks, the blocks alone if they start with a genesis block,
+			None if their parent is not known
+		:rtype: list of Block
+		"""
+		if not blocks or blocks[0].previous_hash is None:
+			return list(blocks)
+		parent = self.tree.get(blocks[0].previous_hash)
+		if parent is None:
+			return None
+		return [parent.block] + list(blocks)
+
+	@staticmethod
+	def check_branch(segment, trusted, verifier=None):
+		"""Check a segment built by `branch_segment` *(does not use the tree, safe out of the reactor thread)*
+
+		:param segment: the blocks, numbered from the first one
+		:type segment: list of Block
+		:param trusted: the first block is the parent in the tree, otherwise it is a received genesis block
+			whose hash is checked too
+		:type trusted: bool
+		:param verifier: verifies the signatures, defaults to the shared verifier
+		:type verifier: SignatureVerifier *-verification.py*, optional
+		:returns: one flag per irregularity found
+		:rtype: list of str
+		"""
+		flags = BlockChain.check_blocks(segment, verifier=verifier, parallel=True, trusted=trusted)
+		if not trusted and segment and segment[0].hash != segment[0].compute_hash():
+			flags.insert(0, "[!] Found difference between the hash and the calculated one in the block 0")
+		return flags
+
+	def reorganize(self, blocks):
+		"""Add verified blocks to the tree and switch the chain to the best tip
+
+		The blocks extend the chain or one of its forks, when the best tip changes only the
+		blocks after the fork point are replaced in `block_chain`. The transactions of the new blocks
+		leave the mempool, the ones of the disconnected blocks that are not in the new blocks go back
+		to it. The side branches ending far below the tip are pruned *(see `BlockTree.prune`)*
+		:param blocks: the verified blocks, each one following the previous one or a block of the tree
+		:type blocks: list of Block
+
+		:returns: the height of the first block of the chain that changed, None if the chain is the same
+		:rtype: int or None
+		"""
+		tree = self.tree
+		for block in blocks:
+			tree.add(block)
+
+		if self.block_chain and tree.tip.block.hash == self.block_chain[-1].hash:
+			tree.prune()
+			return None
+
+		current = tree.get(self.block_chain[-1].hash) if self.block_chain else None
+		ancestor = BlockTree.fork_point(current, tree.tip)
+		disconnected = self.block_chain[ancestor.height + 1 if ancestor is not None else 0:]
+		fork = tree.switch(self.block_chain)
+		tree.prune()
+
+		connected = [transaction for block in self.block_chain[fork:] for transaction in block.transactions or ()]
+		self.open_transactions.remove_many(connected)
+		keys = {transaction.hash_transaction() for transaction in connected}
+		for block in disconnected:
+			for transaction in block.transactions or ():
+				# The rewards of the disconnected blocks are lost
+				if transaction.type == 1 and transaction.hash_transaction() not in keys:
+					self.open_transactions.add(transaction)
+		return fork
+
+	def mine_candidate(self, recipient, miner=None, max_transactions=None):
+		"""Mine a block extending the tip with the block template of the mempool, the chain is not changed
+
+		Safe to run out of the reactor thread, the block is added by `reorganize`
+		*(it is dropped if the tip changed during the search)*
+
+		:param recipient: Miner's ID - who is being rewarded for mining the block
 		:type recipient: str
 
-		:returns: None
+		:param miner: search the nonce on a pool of processes instead of the current one, defaults to None
+		:type miner: ParallelMiner *-`modules.blockchain.mining`*, optional
+
+		:param max_transactions: maximum number of transactions in the block, defaults to None *(no limit)*
+		:type max_transactions: int, optional
+
+		:returns: the new block or None if the mining round was cancelled
+		:rtype: Block or None
 		"""
-		last_block = self.block_chain[-1]  # Get the Last block
-		last_hash = last_block.hash  # Get the hash of the last block
+		block_chain = self.block_chain
+		index = len(block_chain)
+		last_hash = block_chain[index - 1].hash  # Get the hash of the last block
 
-		nonce = self.proof_of_work()  # Determine the nonce value
+		transactions = self.open_transactions.block_template(max_transactions)
 
-		# Create the reward and append it to the open transactions
+		# Determine the nonce value
+		start = perf_counter()
+		if miner is None:
+			nonce = self.proof_of_work(transactions, last_hash)
+		else:
+			nonce = miner.proof_of_work(transactions, last_hash)
+		MINING_SECONDS.inc(perf_counter() - start)
+		if nonce is None:
+			return None
+		BLOCKS_MINED.inc()
+		MINING_HASHES.inc(nonce + 1)
+
+		# Create the reward and append it to the transactions of the block
 		reward_transaction = Transaction(sender=None, recipient=recipient, book=None, transaction_type=2)
-		self.open_transactions.append(reward_transaction)
+		return Block(last_hash, transactions + [reward_transaction], index=index, nonce=nonce)
+
+	def mine_block(self, recipient, miner=None, max_transactions=None):
+		"""This method mine the new block with the block template of the mempool and appends it
 
-		# Create the new Block
-		new_block = Block(last_hash, self.open_transactions, index=len(self.block_chain), nonce=nonce)
+		The chain must not be changed by another thread during the search, a node mines with
+		`mine_candidate` and adds the block on the reactor thread *(see `P2PFactory.mine`)*
+
+		:param recipient: Miner's ID - who is being rewarded for mining the block 
+		:type recipient: str
+
+		:param miner: search the nonce on a pool of processes instead of the current one, defaults to None
+		:type miner: ParallelMiner *-`modules.blockchain.mining`*, optional
+
+		:param max_transactions: maximum number of transactions in the block, defaults to None *(no limit)*
+		:type max_transactions: int, optional
+
+		:returns: the new block or None if the mining round was cancelled
+		:rtype: Block or None
+		"""
+		new_block = self.mine_candidate(recipient, miner, max_transactions)
+		if new_block is None:
+			return None
 
 		self.block_chain.append(new_block)
+		if self._tree is not None:
+			self._tree.add(new_block)
+
+		# Transactions received while mining stay in the mempool
+		self.open_transactions.remove_many(new_block.transactions)
 
-		self.open_transactions = []
+		return new_block
 
 	def fork_chain(self, index=None):
 		"""Create a fork *-copy* of the block-chain with index*- beginning* preferred
 		
-		The copy is made by a deep-copy
+		The fork shares the blocks with the chain *(see `BlockList`)*, the lists of blocks are copied
+		when one of them changes a shared block, so creating the fork does not depend on the length of
+		the chain. The blocks are not copied, they are never modified once in a chain. The mempool is copied.
 		:param index: the start of the *forking*, defaults to None
 		:type index: int, optional
 		"""
+		if not isinstance(self.block_chain, BlockList):
+			self.block_chain = BlockList.wrap(self.block_chain)
 
-		copy = cp.deepcopy(self)
-		copy.block_chain = copy.block_chain[index:]
+		copy = cp.copy(self)
+		copy.block_chain = self.block_chain.share(index)
+		copy.open_transactions = self.open_transactions.copy()
 		return copy
 
 	def to_json(self):
@@ -203,7 +578,14 @@ class BlockChain:
 	number_blocks = lambda self: len(self.block_chain)
 
 	def __eq__(self, other):
-		return self.to_json() == other.to_json()
+		# Blocks are compared by hash
+		return self.block_chain == other.block_chain
+
+	def __getstate__(self):
+		# The tree is built again by the copies *(it is not needed by most of them)*
+		state = self.__dict__.copy()
+		state['_tree'] = None
+		return state
 
 	def __repr__(self):
 		return str(self.to_json())
@@ -223,20 +605,15 @@ class BlockChain:
 
 		return bc
 
-	def _debug(self, msg, pprint=False):
-		"""Prints helpful information in debug mode
-		
-		_debug print with different color depending on the node_type 
-		:param msg: the message to display
+	def _debug(self, msg, *args):
+		"""Logs helpful information in debug mode
+
+		:param msg: the message to log, with %-style placeholders *(formatted only if the record is written)*
 		:type msg: string
-		:param pprint: prints a msg with a pprint *with indentation*, defaults to False
-		:type pprint: bool, optional
+		:param args: the values of the placeholders
 		"""
 		if self.debug:
-			if not pprint:
-				print(colored(msg, 'magenta'))
-			else:
-				pp(msg, indent=4, width=4)
+			log.debug(msg, *args)
 
 
 if __name__ == '__main__':
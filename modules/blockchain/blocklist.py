@@ -0,0 +1,195 @@
+"""List of blocks sharing its blocks with its copies
+
+A fork of a chain starts with the same blocks as the chain. Instead of copying them, the fork and
+the chain share frozen lists of blocks and each one appends its own blocks to a private tail.
+The blocks are not copied either, a block is never modified once it is in a chain.
+"""
+from bisect import bisect_right
+from collections.abc import MutableSequence
+from itertools import chain as iter_chain, islice
+
+
+class BlockList(MutableSequence):
+	"""A list of blocks whose copies are made in constant time
+
+	The blocks are stored in frozen segments *(lists never modified again, shared with the copies)*
+	followed by a private tail. Appending, or replacing the blocks after a height *(a reorg)*, only
+	changes the tail and the number of frozen blocks used. Any other change of a frozen block copies
+	the whole list first *(copy on write)*.
+	When the tail is frozen the last segments are merged while they are not smaller than half the one
+	before them, so their number stays logarithmic in the number of blocks.
+
+	:Methods:
+
+		:meth share: A copy sharing the blocks, from a height
+
+		:meth wrap: A list of blocks using a list without copying it
+	"""
+
+	def __init__(self, blocks=()):
+		# (blocks, start, stop) segments, the list of each one is never modified
+		self._segments = []
+		# Index of the first block of each segment, and number of frozen blocks
+		self._offsets = []
+		self._frozen = 0
+		self._tail = list(blocks)
+
+	@classmethod
+	def wrap(cls, blocks):
+		"""A list of blocks made of the list `blocks`, the list is not copied
+
+		:param blocks: the blocks, the list must not be modified afterwards
+		:type blocks: list of Block
+
+		:rtype: BlockList
+		"""
+		wrapped = cls()
+		wrapped._tail = blocks
+		return wrapped
+
+	def share(self, start=None):
+		"""A copy of the blocks from `start`, the blocks are shared until one of the lists changes them
+
+		The cost does not depend on the number of blocks
+
+		:param start: the first block of the copy, defaults to None *(from the first block)*
+		:type start: int, optional
+
+		:rtype: BlockList
+		"""
+		self._freeze()
+		start = range(len(self))[slice(start, None)].start
+		copy = BlockList()
+		first = bisect_right(self._offsets, start) - 1 if start < self._frozen else len(self._segments)
+		if first < len(self._segments):
+			blocks, begin, stop = self._segments[first]
+			copy._segments = [(blocks, begin + start - self._offsets[first], stop)] + self._segments[first + 1:]
+			copy._offsets = [0] + [offset - start for offset in self._offsets[first + 1:]]
+			copy._frozen = self._frozen - start
+		return copy
+
+	def _freeze(self):
+		if not self._tail:
+			return
+		self._segments.append((self._tail, 0, len(self._tail)))
+		self._offsets.append(self._frozen)
+		self._frozen += len(self._tail)
+		self._tail = []
+
+		# The merged segments are new lists, the lists shared with the copies are not modified
+		while len(self._segments) > 1 and self._size(-2) <= 2 * self._size(-1):
+			(first, begin, stop), (second, second_begin, second_stop) = self._segments[-2:]
+			self._segments[-2:] = [(first[begin:stop] + second[second_begin:second_stop], 0, stop - begin + second_stop - second_begin)]
+			self._offsets.pop()
+
+	def _size(self, segment):
+		_, begin, stop = self._segments[segment]
+		return stop - begin
+
+	def _truncate(self, height):
+		# Keep the frozen blocks before `height`
+		if height >= self._frozen:
+			return
+		last = bisect_right(self._offsets, height) - 1 if height > 0 else -1
+		if last < 0:
+			self._segments, self._offsets = [], []
+		else:
+			blocks, begin, _ = self._segments[last]
+			self._segments = self._segments[:last] + [(blocks, begin, begin + height - self._offsets[last])]
+			self._offsets = self._offsets[:last + 1]
+			if height == self._offsets[last]:
+				self._segments.pop()
+				self._offsets.pop()
+		self._frozen = height
+
+	def _thaw(self):
+		# Copy on write, the list becomes private
+		self._tail = list(self)
+		self._segments, self._offsets, self._frozen = [], [], 0
+
+	def __len__(self):
+		return self._frozen + len(self._tail)
+
+	def __iter__(self):
+		segments = (islice(blocks, begin, stop) for blocks, begin, stop in self._segments)
+		return iter_chain(*segments, self._tail)
+
+	def __getitem__(self, index):
+		if isinstance(index, slice):
+			start, stop, step = index.indices(len(self))
+			if step != 1:
+				return [self[i] for i in range(start, stop, step)]
+			blocks = []
+			segment = bisect_right(self._offsets, start) - 1
+			while start < min(stop, self._frozen):
+				segment_blocks, begin, end = self._segments[segment]
+				offset = self._offsets[segment]
+				blocks += segment_blocks[begin + start - offset:begin + min(stop, offset + end - begin) - offset]
+				start, segment = offset + end - begin, segment + 1
+			return blocks + self._tail[max(start - self._frozen, 0):max(stop - self._frozen, 0)]
+
+		if index < 0:
+			index += len(self)
+		if index >= self._frozen:
+			if index - self._frozen >= len(self._tail):
+				raise IndexError('block index out of range')
+			return self._tail[index - self._frozen]
+		if index < 0:
+			raise IndexError('block index out of range')
+		segment = bisect_right(self._offsets, index) - 1
+		blocks, begin, _ = self._segments[segment]
+		return blocks[begin + index - self._offsets[segment]]
+
+	def __setitem__(self, index, value):
+		if isinstance(index, slice):
+			start, stop, step = index.indices(len(self))
+			if step == 1 and stop >= len(self):
+				# The blocks from `start` are replaced *(a reorg)*, the frozen blocks before are kept
+				value = list(value)
+				if start < self._frozen:
+					self._tail = []
+					self._truncate(start)
+				self._tail[start - self._frozen:] = value
+				return
+			if step == 1 and start >= self._frozen:
+				self._tail[start - self._frozen:max(start, stop) - self._frozen] = value
+				return
+		elif (index if index >= 0 else index + len(self)) >= self._frozen:
+			self._tail[(index if index >= 0 else index + len(self)) - self._frozen] = value
+			return
+		self._thaw()
+		self._tail[index] = value
+
+	def __delitem__(self, index):
+		if isinstance(index, slice) and index.step in (None, 1):
+			self[index] = []
+			return
+		if not isinstance(index, slice) and (index if index >= 0 else index + len(self)) >= self._frozen:
+			del self._tail[(index if index >= 0 else index + len(self)) - self._frozen]
+			return
+		self._thaw()
+		del self._tail[index]
+
+	def insert(self, index, value):
+		if index >= self._frozen or (index < 0 and index + len(self) >= self._frozen):
+			self._tail.insert(index - self._frozen if index >= 0 else index, value)
+			return
+		self._thaw()
+		self._tail.insert(index, value)
+
+	def append(self, value):
+		self._tail.append(value)
+
+	def __eq__(self, other):
+		if not isinstance(other, (list, BlockList)):
+			return NotImplemented
+		return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+	def __add__(self, other):
+		return list(self) + list(other)
+
+	def __radd__(self, other):
+		return list(other) + list(self)
+
+	def __repr__(self):
+		return repr(list(self))
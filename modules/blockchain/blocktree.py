@@ -0,0 +1,199 @@
+"""Tree of the verified blocks known by a node, the main chain and its forks
+
+Every block is indexed by hash and points to its parent, it carries the work of the chain
+ending with it. The best tip *(the most work)* is updated when a block is added, and switching
+the main chain to another tip only touches the blocks between the fork point and the new tip.
+"""
+from modules.blockchain.mining import DIFFICULTY
+
+# The side branches ending more than this number of blocks below the best tip are pruned
+PRUNE_DEPTH = 100
+
+
+def block_work(block):
+	"""Expected number of hashes needed to mine a block *(the target is the same for every block)*
+
+	:rtype: int
+	"""
+	return 16 ** len(DIFFICULTY)
+
+
+class TreeNode:
+	"""A block of the tree
+
+	:Attributes:
+
+		:attr block: the block
+		:type block: Block *-block.py*
+
+		:attr parent: the node of the previous block, None for a genesis block
+		:type parent: TreeNode
+
+		:attr height: index of the block in its chain
+		:type height: int
+
+		:attr work: work of the chain from the genesis block to this one
+		:type work: int
+
+		:attr children: number of nodes whose parent is this one
+		:type children: int
+	"""
+	__slots__ = ('block', 'parent', 'height', 'work', 'children')
+
+	def __init__(self, block, parent=None):
+		self.block = block
+		self.parent = parent
+		self.children = 0
+		self.height = parent.height + 1 if parent is not None else 0
+		self.work = (parent.work if parent is not None else 0) + block_work(block)
+
+
+class BlockTree:
+	"""The verified blocks indexed by hash, with the best tip
+
+	A block is added once its parent is in the tree, genesis blocks *(without previous hash)*
+	start a new tree. The best tip is the block with the most work, the first one received
+	wins a tie.
+
+	:Attributes:
+
+		:attr tip: the node of the best tip, None while the tree is empty
+		:type tip: TreeNode
+
+	:Methods:
+
+		:meth add: Add a block, updates the best tip
+
+		:meth get: The node of a block hash
+
+		:meth fork_point: The last block shared by two branches
+
+		:meth branch: The blocks after a node up to another one
+
+		:meth switch: Make a chain *(list of blocks)* end with a tip
+
+		:meth prune: Remove the side branches ending far below the best tip
+	"""
+
+	def __init__(self, blocks=()):
+		self.tip = None
+		self._nodes = {}
+		# The nodes without children, the side branches end with one of them
+		self._leaves = set()
+		for block in blocks:
+			self.add(block)
+
+	def __contains__(self, block_hash):
+		return block_hash in self._nodes
+
+	def __len__(self):
+		return len(self._nodes)
+
+	def get(self, block_hash):
+		"""The node of the block `block_hash`, None if it is not in the tree"""
+		return self._nodes.get(block_hash)
+
+	def add(self, block):
+		"""Add a verified block
+
+		:param block: the block, its parent must be in the tree unless it is a genesis block
+		:type block: Block *-block.py*
+
+		:returns: the node of the block, None if its parent is unknown
+		:rtype: TreeNode
+		"""
+		node = self._nodes.get(block.hash)
+		if node is not None:
+			return node
+
+		if block.previous_hash is None:
+			parent = None
+		else:
+			parent = self._nodes.get(block.previous_hash)
+			if parent is None:
+				return None
+
+		node = self._nodes[block.hash] = TreeNode(block, parent)
+		if parent is not None:
+			parent.children += 1
+			self._leaves.discard(parent)
+		self._leaves.add(node)
+		if self.tip is None or node.work > self.tip.work:
+			self.tip = node
+		return node
+
+	@staticmethod
+	def fork_point(first, second):
+		"""The last node shared by two branches
+
+		:returns: the node, None if the branches start from different genesis blocks
+		:rtype: TreeNode
+		"""
+		while first is not None and second is not None and first is not second:
+			if first.height >= second.height:
+				first = first.parent
+			else:
+				second = second.parent
+		return first if first is second else None
+
+	@staticmethod
+	def branch(ancestor, node):
+		"""The blocks following `ancestor` up to `node` *(included)*
+
+		:param ancestor: a node before `node`, None for all the blocks from the genesis block
+		:type ancestor: TreeNode
+
+		:rtype: list of Block
+		"""
+		blocks = []
+		while node is not ancestor:
+			blocks.append(node.block)
+			node = node.parent
+		blocks.reverse()
+		return blocks
+
+	def switch(self, block_chain, tip=None):
+		"""Make a chain end with `tip`, only the blocks after the fork point are changed
+
+		:param block_chain: the blocks of the chain, from its genesis block *(changed in place)*
+		:type block_chain: list of Block
+		:param tip: the new last node, defaults to the best tip
+		:type tip: TreeNode, optional
+
+		:returns: the height of the first block changed
+		:rtype: int
+		"""
+		tip = tip or self.tip
+		current = self._nodes.get(block_chain[-1].hash) if block_chain else None
+		ancestor = self.fork_point(current, tip)
+		fork = ancestor.height + 1 if ancestor is not None else 0
+		block_chain[fork:] = self.branch(ancestor, tip)
+		return fork
+
+	def prune(self, depth=PRUNE_DEPTH):
+		"""Remove the side branches whose last block is more than `depth` blocks below the best tip
+
+		The blocks of the branch of the best tip are kept, the blocks shared by a pruned branch
+		with another branch too
+
+		:param depth: number of blocks below the best tip a side branch can end, defaults to PRUNE_DEPTH
+		:type depth: int, optional
+
+		:returns: number of blocks removed
+		:rtype: int
+		"""
+		if self.tip is None:
+			return 0
+		limit = self.tip.height - depth
+		removed = 0
+		for leaf in [leaf for leaf in self._leaves if leaf.height < limit and leaf is not self.tip]:
+			self._leaves.discard(leaf)
+			node = leaf
+			# Up to the block shared with another branch *(the blocks of the tip's branch all have a child)*
+			while node is not None and node.children == 0:
+				del self._nodes[node.block.hash]
+				removed += 1
+				node = node.parent
+				if node is not None:
+					node.children -= 1
+		return removed
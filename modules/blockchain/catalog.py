@@ -0,0 +1,254 @@
+"""In-memory index of the books stored in the chain
+
+Every book transaction of the indexed blocks gets an entry. The values of the book fields
+are compared case-insensitively:
+
+	* exact lookup: a dict from the value of a field to the entries
+	* prefix lookup: a sorted list of the values of a field, searched with bisect *(the values
+	  of the new blocks are kept in a small list, sorted on the next prefix lookup and merged
+	  into the large one once it grows)*
+	* full-text search: a dict from each word of the fields to the entries
+
+The entries are numbered in the order of the chain, so dropping the blocks of a
+reorganization removes entries from the end of the lists of the exact and full-text
+lookups. The values of the dropped entries are found by bisection in the sorted values of
+the prefix lookup, only the small list of the new values is filtered.
+"""
+import re
+from bisect import bisect_left
+from collections import defaultdict, namedtuple
+from heapq import merge
+from itertools import islice
+
+FIELDS = ('title', 'author', 'date', 'genre')
+
+# The values of the new blocks are merged into the sorted values of a field when they are more
+# than this, or than a sixteenth of them *(each merge goes through the whole list)*
+MIN_RECENT = 1024
+
+_WORD_RE = re.compile(r'\w+')
+
+# A book of the chain: the block it is in, the hash of its transaction (hex) and the book json
+CatalogEntry = namedtuple('CatalogEntry', ('height', 'transaction_hash', 'book'))
+
+
+def normalize(value):
+	"""Case-insensitive form of the value of a field"""
+	return str(value).casefold().strip()
+
+
+def tokenize(value):
+	"""The words of a value, case-insensitive"""
+	return _WORD_RE.findall(str(value).casefold())
+
+
+def _contains(numbers, number):
+	i = bisect_left(numbers, number)
+	return i < len(numbers) and numbers[i] == number
+
+
+class BookCatalog:
+	"""Index of the books of the chain, updated block by block
+
+	:Attributes:
+
+		:attr height: number of blocks indexed
+		:type height: int
+
+	:Methods:
+
+		:meth add_block: Index the books of the next block
+
+		:meth add_blocks: Index the books of several blocks
+
+		:meth truncate: Drop the books of the blocks from a height *(reorganization)*
+
+		:meth replace: Replace the books after a fork point by the ones of a new chain
+
+		:meth find: The books whose field is equal to a value
+
+		:meth prefix: The books whose field starts with a value
+
+		:meth search: The books containing all the words of a text
+	"""
+
+	def __init__(self, blocks=()):
+		self._entries = []
+		# Number of entries before each block
+		self._starts = []
+		self._exact = {field: defaultdict(list) for field in FIELDS}
+		self._sorted = {field: [] for field in FIELDS}
+		self._recent = {field: [] for field in FIELDS}
+		# The fields whose recent values are not sorted
+		self._unsorted = set()
+		self._words = defaultdict(list)
+
+		self.add_blocks(blocks)
+
+	@property
+	def height(self):
+		return len(self._starts)
+
+	def __len__(self):
+		return len(self._entries)
+
+	def add_block(self, block):
+		"""Index the books of the block following the last indexed one
+
+		:param block: the block *(reward transactions are skipped)*
+		:type block: Block
+		"""
+		height = len(self._starts)
+		self._starts.append(len(self._entries))
+
+		for transaction in block.transactions or ():
+			book = transaction.book
+			if transaction.type != 1 or not isinstance(book, dict):
+				continue
+
+			number = len(self._entries)
+			self._entries.append(CatalogEntry(height, transaction.hash_transaction().hex(), book))
+
+			words = set()
+			for field in FIELDS:
+				value = book.get(field)
+				if value is None:
+					continue
+				key = normalize(value)
+				self._exact[field][key].append(number)
+				self._add_value(field, (key, number))
+				words.update(tokenize(value))
+			for word in words:
+				self._words[word].append(number)
+
+	def _add_value(self, field, value):
+		recent, values = self._recent[field], self._sorted[field]
+		recent.append(value)
+		self._unsorted.add(field)
+		if len(recent) > max(MIN_RECENT, len(values) // 16):
+			# The sorted list is one run for the sort, the new values are merged in linear time
+			values.extend(recent)
+			values.sort()
+			recent.clear()
+
+	def add_blocks(self, blocks):
+		for block in blocks:
+			self.add_block(block)
+
+	def truncate(self, height):
+		"""Drop the books of the blocks from `height` to the end
+
+		:param height: the first block dropped
+		:type height: int
+		"""
+		if height >= len(self._starts):
+			return
+
+		first = self._starts[height]
+		for number in range(len(self._entries) - 1, first - 1, -1):
+			book = self._entries[number].book
+			for field in FIELDS:
+				value = book.get(field)
+				if value is None:
+					continue
+				key = normalize(value)
+				self._pop(self._exact[field], key, number)
+				self._remove_sorted(self._sorted[field], (key, number))
+			for word in set(word for field in FIELDS if book.get(field) is not None
+							for word in tokenize(book[field])):
+				self._pop(self._words, word, number)
+
+		for recent in self._recent.values():
+			recent[:] = [value for value in recent if value[1] < first]
+
+		del self._entries[first:]
+		del self._starts[height:]
+
+	@staticmethod
+	def _remove_sorted(values, value):
+		# The value is not there when it is still in the recent values
+		i = bisect_left(values, value)
+		if i < len(values) and values[i] == value:
+			del values[i]
+
+	@staticmethod
+	def _pop(index, key, number):
+		# The entries are removed from the last one, it is at the end of the list
+		numbers = index[key]
+		if numbers and numbers[-1] == number:
+			numbers.pop()
+		if not numbers:
+			del index[key]
+
+	def replace(self, blocks, fork=0):
+		"""Replace the books of the blocks from `fork` by the ones of `blocks`
+
+		:param blocks: the blocks of the new chain
+		:type blocks: list of Block
+		:param fork: number of blocks shared with the indexed chain, defaults to 0
+		:type fork: int, optional
+		"""
+		self.truncate(fork)
+		self.add_blocks(blocks[len(self._starts):])
+
+	def _get(self, numbers, limit):
+		return [self._entries[number] for number in numbers[:limit]]
+
+	def find(self, field, value, limit=None):
+		"""The books whose `field` is equal to `value` *(case-insensitive)*, in the order of the chain
+
+		:param field: title, author, date or genre
+		:type field: str
+		:param value: the value looked for
+		:type value: str
+		:param limit: maximum number of books returned, defaults to None
+		:type limit: int, optional
+
+		:rtype: list of CatalogEntry
+		"""
+		if field not in FIELDS:
+			raise ValueError(f"field must be one of {', '.join(FIELDS)}")
+		return self._get(self._exact[field].get(normalize(value), []), limit)
+
+	def prefix(self, field, value, limit=None):
+		"""The books whose `field` starts with `value` *(case-insensitive)*, sorted by field value
+
+		:rtype: list of CatalogEntry
+		"""
+		if field not in FIELDS:
+			raise ValueError(f"field must be one of {', '.join(FIELDS)}")
+
+		if field in self._unsorted:
+			self._recent[field].sort()
+			self._unsorted.discard(field)
+
+		# Both sorted lists are searched, their matches are merged
+		key = normalize(value)
+		matches = merge(*(self._starting_with(values, key) for values in (self._sorted[field], self._recent[field])))
+		return self._get([number for _, number in islice(matches, limit)], None)
+
+	@staticmethod
+	def _starting_with(values, key):
+		# The (value, number) pairs of a sorted list whose value starts with `key`
+		for i in range(bisect_left(values, (key, -1)), len(values)):
+			if not values[i][0].startswith(key):
+				break
+			yield values[i]
+
+	def search(self, text, limit=None):
+		"""The books containing all the words of `text` in any of their fields, in the order of the chain
+
+		:rtype: list of CatalogEntry
+		"""
+		postings = sorted((self._words.get(word, []) for word in set(tokenize(text))), key=len)
+		if not postings:
+			return []
+
+		# Start from the rarest word, the other lists are sorted and searched with bisect
+		numbers = []
+		for number in postings[0]:
+			if all(_contains(other, number) for other in postings[1:]):
+				numbers.append(number)
+				if len(numbers) == limit:
+					break
+		return self._get(numbers, None)
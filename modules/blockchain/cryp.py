@@ -3,6 +3,11 @@ from fastecdsa.curve import secp256k1
 from fastecdsa.point import Point
 from fastecdsa import keys, ecdsa
 
+from modules.metrics import REGISTRY
+
+SIGNATURES_SIGNED = REGISTRY.counter('openbook_signatures_signed_total', 'Signatures computed')
+SIGNATURES_VERIFIED = REGISTRY.counter('openbook_signatures_verified_total', 'Signatures verified')
+
 
 class Cryp():
 	""" 
@@ -182,6 +187,7 @@ class Cryp():
 			r, s = ecdsa.sign(data, self.private_key, curve=secp256k1)
 		else:
 			raise TypeError("no private key to sign with")
+		SIGNATURES_SIGNED.inc()
 
 		signature = hex(r) + "," + hex(s)
 		return signature
@@ -201,6 +207,7 @@ class Cryp():
 		:rtype: tuple
 		"""
 		r, s = ecdsa.sign(data, key, curve=secp256k1)
+		SIGNATURES_SIGNED.inc()
 		signature = hex(r) + "," + hex(s)
 		return signature
 
@@ -223,6 +230,7 @@ class Cryp():
 		:rtype: boolean
 		"""
 		signature = tuple(map(lambda sig: int(sig, 0), signature.split(',')))
+		SIGNATURES_VERIFIED.inc()
 		return ecdsa.verify(signature, data, public_key, curve=secp256k1)
 
 	@staticmethod
@@ -0,0 +1,155 @@
+"""Canonical byte encoding of the block and transaction headers
+
+The encoding is what gets hashed, two objects holding the same values always give
+the same bytes *(unlike json.dumps on a dict)*. Every encoded header starts with
+`ENCODING_VERSION` so the format can evolve without ambiguity.
+
+Optional or polymorphic fields are prefixed by a one byte tag:
+
+	* `TAG_NONE`: no value
+	* `TAG_STR`: varint length + utf-8 string
+	* `TAG_BYTES`: varint length + raw bytes *(lowercase hex digests)*
+	* `TAG_PAIR`: 64 bytes, two 256 bits integers *(public keys and signatures)*
+	* `TAG_MAP`: varint count + key/value strings sorted by key *(books)*
+"""
+import json
+import re
+
+from fastecdsa.point import Point
+
+ENCODING_VERSION = 2
+
+TAG_NONE = 0
+TAG_STR = 1
+TAG_BYTES = 2
+TAG_PAIR = 3
+TAG_MAP = 4
+
+# `Cryp.dump_pub` and `Cryp.get_signature` format: hex(x) + ',' + hex(y)
+_PAIR_RE = re.compile(r'^0x([0-9a-f]{1,64}),0x([0-9a-f]{1,64})$')
+_HEX_RE = re.compile(r'^(?:[0-9a-f]{2})+$')
+
+# Most of the encoded numbers (types, lengths, counts) fit in one byte
+_SMALL_VARINTS = tuple(bytes((i,)) for i in range(0x80))
+_NONE = bytes((TAG_NONE,))
+_STR = bytes((TAG_STR,))
+_PAIR = bytes((TAG_PAIR,))
+_MAP = bytes((TAG_MAP,))
+
+
+def encode_varint(number):
+	"""Encode a positive integer as an unsigned LEB128 varint
+
+	:param number: the integer to encode
+	:type number: int
+
+	:returns: 1 byte for numbers < 128, one more byte for every 7 bits
+	:rtype: bytes
+	"""
+	if 0 <= number < 0x80:
+		return _SMALL_VARINTS[number]
+	if number < 0:
+		raise ValueError("varint can't encode negative numbers")
+
+	out = bytearray()
+	while number > 0x7f:
+		out.append((number & 0x7f) | 0x80)
+		number >>= 7
+	out.append(number)
+	return bytes(out)
+
+
+def decode_varint(data, offset=0):
+	"""Decode an unsigned LEB128 varint
+
+	:param data: the encoded bytes
+	:type data: bytes
+	:param offset: position of the varint in `data`, defaults to 0
+	:type offset: int, optional
+
+	:returns: the integer and the position following it
+	:rtype: tuple (int, int)
+	"""
+	number = shift = 0
+	while True:
+		byte = data[offset]
+		offset += 1
+		number |= (byte & 0x7f) << shift
+		if byte < 0x80:
+			return number, offset
+		shift += 7
+
+
+def encode_str(value):
+	"""Encode an optional string"""
+	if value is None:
+		return _NONE
+	raw = value.encode()
+	return _STR + encode_varint(len(raw)) + raw
+
+
+def encode_pair(x, y):
+	"""Encode two 256 bits integers as fixed width big endian fields"""
+	return _PAIR + x.to_bytes(32, 'big') + y.to_bytes(32, 'big')
+
+
+def split_pair(value):
+	"""Parse a ``0x..,0x..`` string into its two integers
+
+	:returns: the two integers or None if the string is not a pair
+	:rtype: tuple or None
+	"""
+	if not value.startswith('0x'):
+		return None
+	match = _PAIR_RE.match(value)
+	if match is None:
+		return None
+	return int(match.group(1), 16), int(match.group(2), 16)
+
+
+def encode_key(value):
+	"""Encode the sender/recipient of a transaction
+
+	A public key has the same encoding whether it is a `Point` or its `Cryp.dump_pub` string.
+	"""
+	if isinstance(value, Point):
+		return encode_pair(value.x, value.y)
+	if isinstance(value, str):
+		pair = split_pair(value)
+		if pair is not None:
+			return encode_pair(*pair)
+	return encode_str(value)
+
+
+def encode_signature(signature):
+	"""Encode a `Cryp.get_signature` signature *(or None)*"""
+	if signature is None:
+		return _NONE
+	pair = split_pair(signature)
+	if pair is not None:
+		return encode_pair(*pair)
+	return encode_str(signature)
+
+
+def encode_hash(value):
+	"""Encode a hex digest as raw bytes, any other string is kept as it is"""
+	if isinstance(value, str) and _HEX_RE.match(value):
+		raw = bytes.fromhex(value)
+		return bytes((TAG_BYTES,)) + encode_varint(len(raw)) + raw
+	return encode_str(value)
+
+
+def encode_mapping(mapping):
+	"""Encode a dict of strings *(a book)*, other values fall back to their canonical json"""
+	if mapping is None:
+		return _NONE
+	try:
+		return _MAP + encode_varint(len(mapping)) + b''.join(
+			encode_str(key) + encode_str(mapping[key]) for key in sorted(mapping))
+	except (AttributeError, TypeError):
+		return encode_str(canonical_json(mapping))
+
+
+def canonical_json(value):
+	"""Serialize a json value with sorted keys and without whitespace"""
+	return json.dumps(value, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
@@ -0,0 +1,205 @@
+import threading
+from collections import Counter, OrderedDict
+from itertools import islice
+
+from modules.blockchain.encoding import encode_key
+
+
+class Mempool:
+	"""The transactions waiting to be mined, indexed by transaction hash
+
+	The transactions are kept in arrival order, when a limit is reached the oldest
+	ones are evicted first. The mempool is used from the reactor thread and from the
+	mining thread, every operation holds a lock.
+
+	:Attributes:
+
+		:attr max_count: maximum number of transactions
+		:type max_count: int
+
+		:attr max_bytes: maximum total size of the transactions *(canonical encoding)*
+		:type max_bytes: int
+
+		:attr max_per_sender: maximum number of transactions of a single sender
+		:type max_per_sender: int
+
+		:attr bytes: current total size of the transactions
+		:type bytes: int
+
+	:Methods:
+
+		:meth add: Add a transaction, duplicates are refused in O(1)
+
+		:meth remove_many: Remove transactions *(mined in a block)*
+
+		:meth block_template: The transactions to put in the next block
+
+		:meth copy: A mempool with the same transactions *(shared, not copied)*
+
+		:meth stats: The size and counters of the mempool
+	"""
+
+	def __init__(self, max_count=50000, max_bytes=32 * 1024 * 1024, max_per_sender=1000):
+		self.max_count = max_count
+		self.max_bytes = max_bytes
+		self.max_per_sender = max_per_sender
+
+		self.bytes = 0
+		self.evicted = 0
+		self.rejected = 0
+
+		self._transactions = OrderedDict()
+		self._sizes = {}
+		self._senders = Counter()
+		self._lock = threading.RLock()
+
+	@staticmethod
+	def _key(transaction):
+		return transaction if isinstance(transaction, bytes) else transaction.hash_transaction()
+
+	@staticmethod
+	def _sender(transaction):
+		return encode_key(transaction.sender)
+
+	def add(self, transaction):
+		"""Add a transaction
+
+		:param transaction: the transaction *(already verified)*
+		:type transaction: Transaction
+
+		:returns: False if the transaction is a duplicate, is bigger than the mempool
+			or its sender reached its limit
+		:rtype: bool
+		"""
+		key = transaction.hash_transaction()
+		size = len(transaction.to_bytes())
+		sender = self._sender(transaction)
+
+		with self._lock:
+			if key in self._transactions or size > self.max_bytes or self._senders[sender] >= self.max_per_sender:
+				self.rejected += 1
+				return False
+
+			# Make room by evicting the oldest transactions
+			while self._transactions and (len(self._transactions) >= self.max_count or self.bytes + size > self.max_bytes):
+				self._pop(next(iter(self._transactions)))
+				self.evicted += 1
+
+			self._transactions[key] = transaction
+			self._sizes[key] = size
+			self._senders[sender] += 1
+			self.bytes += size
+			return True
+
+	# The mempool can be used where the open transactions list was
+	append = add
+
+	def extend(self, transactions):
+		for transaction in transactions:
+			self.add(transaction)
+
+	def _pop(self, key):
+		transaction = self._transactions.pop(key)
+		self.bytes -= self._sizes.pop(key)
+		sender = self._sender(transaction)
+		self._senders[sender] -= 1
+		if not self._senders[sender]:
+			del self._senders[sender]
+		return transaction
+
+	def remove_many(self, transactions):
+		"""Remove transactions *(or transaction hashes)*, the unknown ones are ignored
+
+		:returns: number of transactions removed
+		:rtype: int
+		"""
+		removed = 0
+		with self._lock:
+			for transaction in transactions:
+				key = self._key(transaction)
+				if key in self._transactions:
+					self._pop(key)
+					removed += 1
+		return removed
+
+	def clear(self):
+		with self._lock:
+			self._transactions.clear()
+			self._sizes.clear()
+			self._senders.clear()
+			self.bytes = 0
+
+	def copy(self):
+		"""A mempool with the same limits and transactions, the transactions are shared
+
+		:rtype: Mempool
+		"""
+		copy = Mempool(self.max_count, self.max_bytes, self.max_per_sender)
+		with self._lock:
+			copy._transactions = self._transactions.copy()
+			copy._sizes = self._sizes.copy()
+			copy._senders = self._senders.copy()
+			copy.bytes = self.bytes
+		return copy
+
+	def get(self, transaction_hash):
+		"""The transaction of hash `transaction_hash` or None"""
+		return self._transactions.get(transaction_hash)
+
+	def block_template(self, max_count=None, max_bytes=None):
+		"""The transactions to put in the next block, oldest first
+
+		:param max_count: maximum number of transactions, defaults to None *(no limit)*
+		:type max_count: int, optional
+
+		:param max_bytes: maximum total size of the transactions, defaults to None *(no limit)*
+		:type max_bytes: int, optional
+
+		:returns: the transactions
+		:rtype: list
+		"""
+		with self._lock:
+			if max_bytes is None:
+				return list(islice(self._transactions.values(), max_count))
+
+			template, size = [], 0
+			for key, transaction in islice(self._transactions.items(), max_count):
+				if size + self._sizes[key] > max_bytes:
+					break
+				size += self._sizes[key]
+				template.append(transaction)
+			return template
+
+	def stats(self):
+		"""The size and counters of the mempool
+
+		:returns: count, bytes, evicted and rejected
+		:rtype: dict
+		"""
+		return {'count': len(self._transactions), 'bytes': self.bytes,
+				'evicted': self.evicted, 'rejected': self.rejected}
+
+	def __contains__(self, transaction):
+		return self._key(transaction) in self._transactions
+
+	def __len__(self):
+		return len(self._transactions)
+
+	def __iter__(self):
+		return iter(self.block_template())
+
+	def __eq__(self, other):
+		return list(self) == list(other)
+
+	def __repr__(self):
+		return str(list(self))
+
+	def __getstate__(self):
+		# The lock can't be copied or pickled
+		state = self.__dict__.copy()
+		del state['_lock']
+		return state
+
+	def __setstate__(self, state):
+		self.__dict__.update(state)
+		self._lock = threading.RLock()
@@ -0,0 +1,108 @@
+"""Merkle tree over the transaction hashes of a block
+
+Leaves and inner nodes are hashed with a different prefix *(like RFC 6962)* so an inner
+node can't be passed off as a transaction. A node without a sibling is promoted
+to the next level as it is.
+
+An inclusion proof is the list of the siblings met on the way from a leaf to the root,
+each one as a ``(hex_hash, is_left)`` pair, which can be sent in a json message.
+"""
+import hashlib
+
+_LEAF = b'\x00'
+_NODE = b'\x01'
+
+# Root of a block without transactions
+EMPTY_ROOT = hashlib.sha256(b'').digest()
+
+
+def hash_leaf(transaction_hash):
+	"""Hash of the leaf of a transaction
+
+	:param transaction_hash: the hash of the transaction *`Transaction.hash_transaction`*
+	:type transaction_hash: bytes
+
+	:rtype: bytes
+	"""
+	return hashlib.sha256(_LEAF + transaction_hash).digest()
+
+
+def hash_node(left, right):
+	"""Hash of an inner node"""
+	return hashlib.sha256(_NODE + left + right).digest()
+
+
+def _next_level(level):
+	parents = [hash_node(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+	if len(level) % 2:
+		parents.append(level[-1])
+	return parents
+
+
+def merkle_root(transaction_hashes):
+	"""Compute the merkle root of a list of transaction hashes
+
+	:param transaction_hashes: the hashes of the transactions in the block order
+	:type transaction_hashes: list of bytes
+
+	:returns: the root of the tree
+	:rtype: bytes
+	"""
+	if not transaction_hashes:
+		return EMPTY_ROOT
+
+	level = [hash_leaf(h) for h in transaction_hashes]
+	while len(level) > 1:
+		level = _next_level(level)
+	return level[0]
+
+
+def merkle_proof(transaction_hashes, index):
+	"""Build the inclusion proof of the transaction at `index`
+
+	:param transaction_hashes: the hashes of the transactions in the block order
+	:type transaction_hashes: list of bytes
+
+	:param index: position of the transaction in the block
+	:type index: int
+
+	:returns: the siblings from the leaf to the root
+	:rtype: list of (str, bool)
+	"""
+	if not 0 <= index < len(transaction_hashes):
+		raise IndexError('transaction index out of range')
+
+	proof = []
+	level = [hash_leaf(h) for h in transaction_hashes]
+	while len(level) > 1:
+		sibling = index ^ 1
+		if sibling < len(level):
+			proof.append((level[sibling].hex(), sibling < index))
+		level = _next_level(level)
+		index //= 2
+	return proof
+
+
+def verify_proof(transaction_hash, proof, root):
+	"""Verify that a transaction is part of the tree of `root`
+
+	:param transaction_hash: the hash of the transaction
+	:type transaction_hash: bytes
+
+	:param proof: the proof returned by `merkle_proof`
+	:type proof: list of (str, bool)
+
+	:param root: the merkle root *(bytes or hex)*
+	:type root: bytes or str
+
+	:returns: True if the proof leads to the root
+	:rtype: bool
+	"""
+	if isinstance(root, str):
+		root = bytes.fromhex(root)
+
+	node = hash_leaf(transaction_hash)
+	for sibling, is_left in proof:
+		sibling = bytes.fromhex(sibling)
+		node = hash_node(sibling, node) if is_left else hash_node(node, sibling)
+	return node == root
@@ -0,0 +1,256 @@
+import hashlib
+import multiprocessing as mp
+import queue
+
+# The target of the network: the hex digest of a valid guess starts with it
+DIFFICULTY = '42'
+
+
+class NonceSearch:
+	"""Prefix-cached nonce search for one mining round
+
+	The guess hashed by the proof of work is ``open_transactions + last_hash + nonce``.
+	Only the nonce changes between two guesses, so the prefix is serialized and fed
+	to SHA-256 once per round; every guess then works on a copy of that midstate.
+
+	:Attributes:
+
+		:attr prefix: the serialized open transactions followed by the last hash
+		:type prefix: bytes
+
+		:attr difficulty: the hex prefix a valid guess hash must start with
+		:type difficulty: str
+
+	:Methods:
+
+		:meth __init__: Constructor of the class
+
+		:meth from_transactions: Build the search from the open transactions and last hash
+
+		:meth valid: Verify one nonce guess
+
+		:meth search: Look for a valid nonce in a range of the nonce space
+	"""
+
+	def __init__(self, prefix, difficulty=DIFFICULTY):
+		"""Constructor of the class
+
+		:param prefix: the serialized open transactions followed by the last hash
+		:type prefix: bytes
+
+		:param difficulty: the hex prefix a valid guess hash must start with
+		:type difficulty: str
+		"""
+		self.prefix = prefix
+		self.difficulty = difficulty
+		self._midstate = hashlib.sha256(prefix)
+
+		# Comparing raw digest bytes avoids building a hex string for every guess,
+		# it is only possible when the difficulty covers whole bytes
+		if len(difficulty) % 2 == 0:
+			self._target = bytes.fromhex(difficulty)
+		else:
+			self._target = None
+
+	@staticmethod
+	def serialize_prefix(open_transactions, last_hash):
+		"""Serialize the part of the guess that does not depend on the nonce
+
+		:param open_transactions: the transactions waiting to be mined
+		:type open_transactions: iterable of Transaction
+
+		:param last_hash: the hash of the previous block in the chain
+		:type last_hash: str
+
+		:returns: the guess prefix
+		:rtype: bytes
+		"""
+		return (str(list(map(str, open_transactions))) + str(last_hash)).encode()
+
+	@classmethod
+	def from_transactions(cls, open_transactions, last_hash, difficulty=DIFFICULTY):
+		"""Build the search from the open transactions and the last hash of the chain
+
+		:param open_transactions: the transactions waiting to be mined
+		:type open_transactions: iterable of Transaction
+
+		:param last_hash: the hash of the previous block in the chain
+		:type last_hash: str
+
+		:returns: the nonce search of the round
+		:rtype: NonceSearch
+		"""
+		return cls(cls.serialize_prefix(open_transactions, last_hash), difficulty)
+
+	def valid(self, nonce):
+		"""Verify one nonce guess
+
+		:param nonce: nonce guess of the hash
+		:type nonce: int
+
+		:returns: True if the guess hash matches the difficulty
+		:rtype: bool
+		"""
+		guess = self._midstate.copy()
+		guess.update(str(nonce).encode())
+
+		if self._target is not None:
+			return guess.digest().startswith(self._target)
+		return guess.hexdigest().startswith(self.difficulty)
+
+	def search(self, start=0, stop=None, step=1):
+		"""Look for a valid nonce in ``range(start, stop, step)``
+
+		:param start: first nonce to try, defaults to 0
+		:type start: int, optional
+
+		:param stop: the search stops before this nonce, defaults to None *(unbounded)*
+		:type stop: int, optional
+
+		:param step: distance between two guesses, defaults to 1
+		:type step: int, optional
+
+		:returns: the first valid nonce or None if the range was exhausted
+		:rtype: int or None
+		"""
+		midstate = self._midstate
+		target = self._target
+		difficulty = self.difficulty
+
+		nonce = start
+		while stop is None or nonce < stop:
+			guess = midstate.copy()
+			guess.update(str(nonce).encode())
+
+			if target is not None:
+				if guess.digest().startswith(target):
+					return nonce
+			elif guess.hexdigest().startswith(difficulty):
+				return nonce
+
+			nonce += step
+
+		return None
+
+
+# Round counter shared with the worker processes of a ParallelMiner,
+# set by the pool initializer
+_generation = None
+
+
+def _init_worker(generation):
+	global _generation
+	_generation = generation
+
+
+def _search_worker(prefix, difficulty, round_id, start, step, batch):
+	"""Search ``start, start + step, ...`` until a nonce is found or the round changes
+
+	The round counter is checked every `batch` guesses, so a cancelled worker
+	stops after at most `batch` more hashes.
+	"""
+	search = NonceSearch(prefix, difficulty)
+	nonce = start
+	while _generation.value == round_id:
+		stop = nonce + batch * step
+		found = search.search(nonce, stop, step)
+		if found is not None:
+			return found
+		nonce = stop
+	return None
+
+
+class ParallelMiner:
+	"""Proof of work spread over a pool of worker processes
+
+	The nonce space is interleaved between the workers: worker `i` tries the nonces
+	``i, i + processes, i + 2 * processes...``. A round ends as soon as one worker
+	finds a valid nonce or when `cancel` is called *(a new tip was received)*,
+	the other workers notice it within `batch` guesses.
+
+	The pool is created on the first round and reused for the next ones.
+
+	:Attributes:
+
+		:attr processes: number of worker processes
+		:type processes: int
+
+		:attr batch: number of guesses between two checks of the round counter
+		:type batch: int
+
+		:attr difficulty: the hex prefix a valid guess hash must start with
+		:type difficulty: str
+
+	:Methods:
+
+		:meth proof_of_work: Search the nonce of a round on all the workers
+
+		:meth cancel: Stop the running round
+
+		:meth close: Stop the worker processes
+	"""
+
+	def __init__(self, processes=None, batch=4096, difficulty=DIFFICULTY):
+		self.processes = processes or mp.cpu_count()
+		self.batch = batch
+		self.difficulty = difficulty
+
+		self._generation = mp.Value('Q', 0)
+		self._pool = None
+
+	def _next_round(self):
+		with self._generation.get_lock():
+			self._generation.value += 1
+			return self._generation.value
+
+	def proof_of_work(self, open_transactions, last_hash):
+		"""Search the nonce of a round on all the workers
+
+		:param open_transactions: the transactions waiting to be mined
+		:type open_transactions: iterable of Transaction
+
+		:param last_hash: the hash of the previous block in the chain
+		:type last_hash: str
+
+		:returns: a valid nonce or None if the round was cancelled
+		:rtype: int or None
+		"""
+		if self._pool is None:
+			self._pool = mp.Pool(self.processes, initializer=_init_worker, initargs=(self._generation,))
+
+		prefix = NonceSearch.serialize_prefix(open_transactions, last_hash)
+		round_id = self._next_round()
+
+		# Results of this round only, late answers of cancelled workers are dropped with it
+		results = queue.Queue()
+		for start in range(self.processes):
+			self._pool.apply_async(_search_worker,
+								   (prefix, self.difficulty, round_id, start, self.processes, self.batch),
+								   callback=results.put, error_callback=results.put)
+
+		for _ in range(self.processes):
+			result = results.get()
+			if isinstance(result, BaseException):
+				self.cancel()
+				raise result
+			if result is not None:
+				if self._generation.value != round_id:
+					# Found after the round was cancelled, the nonce is of no use anymore
+					return None
+				# Stop the other workers
+				self.cancel()
+				return result
+
+		return None
+
+	def cancel(self):
+		"""Stop the running round, `proof_of_work` will return None"""
+		self._next_round()
+
+	def close(self):
+		"""Stop the worker processes"""
+		if self._pool is not None:
+			self.cancel()
+			self._pool.terminate()
+			self._pool.join()
+			self._pool = None
@@ -0,0 +1,332 @@
+"""Append-only on-disk store of the blocks of the chain
+
+The blocks are written one after the other as json in segment files
+``blocks_00000.dat, blocks_00001.dat...``, each one prefixed by its length. The file
+``index.dat`` holds one fixed size record per height: segment, offset, length and hash
+of the block. The index is read back in memory when the store is opened, the blocks
+are read through a memory map of their segment.
+
+A crash can leave a torn record at the end of the files, the records that are not
+complete are dropped when the store is opened.
+
+The file ``checkpoint.dat`` records a number of blocks already checked by the node and
+the CRC32 of their index records and segment bytes. When the files still match it, only
+the blocks after it are checked again when the chain is restored.
+"""
+import json
+import mmap
+import os
+import struct
+import zlib
+
+from modules.blockchain.block import Block
+
+# segment, offset, length, hash
+_INDEX_RECORD = struct.Struct('>IQI32s')
+_LENGTH = struct.Struct('>I')
+# height, crc32
+_CHECKPOINT = struct.Struct('>QI')
+_CHUNK = 1024 * 1024
+
+
+class BlockStore:
+	"""Persistent append-only store of the blocks, indexed by height and by hash
+
+	:Attributes:
+
+		:attr path: directory of the store
+		:type path: str
+
+		:attr segment_size: a new segment file is started when the current one reaches this size
+		:type segment_size: int
+
+		:attr sync_every: the files are fsync-ed every `sync_every` appended blocks
+		:type sync_every: int
+
+	:Methods:
+
+		:meth append: Append a block at the end of the store
+
+		:meth extend: Append several blocks, the files are fsync-ed once
+
+		:meth read: The json bytes of a block *(served to peers as they are)*
+
+		:meth get_block: The block at a height
+
+		:meth height_of: The height of a block hash
+
+		:meth load_blocks: All the stored blocks
+
+		:meth truncate: Drop the blocks from a height *(reorganization)*
+
+		:meth replace: Replace the blocks after a fork point by the ones of a new chain
+
+		:meth checksum: The CRC32 of the records of the first blocks
+
+		:meth checkpoint: Record the stored blocks as checked
+
+		:meth checked_height: The number of blocks covered by the checkpoint
+
+		:meth flush: Write and fsync the pending appends
+
+		:meth close: Flush and close the files
+	"""
+
+	def __init__(self, path, segment_size=64 * 1024 * 1024, sync_every=64):
+		self.path = path
+		self.segment_size = segment_size
+		self.sync_every = sync_every
+
+		self._entries = []
+		self._heights = {}
+		self._maps = {}
+		self._pending = 0
+
+		os.makedirs(path, exist_ok=True)
+		self._load_index()
+
+		self._index = open(self._index_path(), 'ab')
+		segment, end = self._tail()
+		self._segment = segment
+		self._file = open(self._segment_path(segment), 'ab')
+		self._file.truncate(end)
+
+	def _index_path(self):
+		return os.path.join(self.path, 'index.dat')
+
+	def _segment_path(self, segment):
+		return os.path.join(self.path, f'blocks_{segment:05d}.dat')
+
+	def _checkpoint_path(self):
+		return os.path.join(self.path, 'checkpoint.dat')
+
+	def _tail(self):
+		"""The segment and offset where the next block is written"""
+		if not self._entries:
+			return 0, 0
+		segment, offset, length, _ = self._entries[-1]
+		return segment, offset + _LENGTH.size + length
+
+	def _load_index(self):
+		if not os.path.exists(self._index_path()):
+			return
+
+		with open(self._index_path(), 'rb') as f:
+			data = f.read()
+
+		sizes = {}
+		for i in range(len(data) // _INDEX_RECORD.size):
+			entry = _INDEX_RECORD.unpack_from(data, i * _INDEX_RECORD.size)
+			segment, offset, length, _ = entry
+			if segment not in sizes:
+				path = self._segment_path(segment)
+				sizes[segment] = os.path.getsize(path) if os.path.exists(path) else 0
+			# The block was not completely written
+			if offset + _LENGTH.size + length > sizes[segment]:
+				break
+			self._heights[entry[3].hex()] = len(self._entries)
+			self._entries.append(entry)
+
+		# Drop the torn records and the segments written after them
+		with open(self._index_path(), 'r+b') as f:
+			f.truncate(len(self._entries) * _INDEX_RECORD.size)
+		segment, _ = self._tail()
+		for other in sizes:
+			if other > segment:
+				os.remove(self._segment_path(other))
+
+	def __len__(self):
+		return len(self._entries)
+
+	def __contains__(self, block_hash):
+		return block_hash in self._heights
+
+	def append(self, block):
+		"""Append a block at the end of the store
+
+		:param block: the block *(already verified)*
+		:type block: Block
+		"""
+		self._write(block)
+		if self._pending >= self.sync_every:
+			self.flush()
+
+	def extend(self, blocks):
+		"""Append several blocks, the files are fsync-ed once at the end"""
+		for block in blocks:
+			self._write(block)
+		self.flush()
+
+	def _write(self, block):
+		data = json.dumps(block.to_json()).encode()
+		segment, offset = self._tail()
+		if offset and offset + _LENGTH.size + len(data) > self.segment_size:
+			self.flush()
+			self._file.close()
+			segment, offset = segment + 1, 0
+			self._segment = segment
+			# A segment left by a crash before its first block was indexed is overwritten
+			self._file = open(self._segment_path(segment), 'wb')
+
+		self._file.write(_LENGTH.pack(len(data)) + data)
+		entry = (segment, offset, len(data), bytes.fromhex(block.hash))
+		self._index.write(_INDEX_RECORD.pack(*entry))
+		self._heights[block.hash] = len(self._entries)
+		self._entries.append(entry)
+		self._pending += 1
+
+	def checksum(self, height):
+		"""The CRC32 of the index records and of the segment bytes of the blocks before `height`
+
+		:param height: number of blocks covered
+		:type height: int
+
+		:rtype: int
+		"""
+		self.flush()
+		with open(self._index_path(), 'rb') as f:
+			crc = zlib.crc32(f.read(height * _INDEX_RECORD.size))
+
+		ends = {}
+		for segment, offset, length, _ in self._entries[:height]:
+			ends[segment] = offset + _LENGTH.size + length
+		for segment in sorted(ends):
+			view = self._map(segment, ends[segment])
+			for start in range(0, ends[segment], _CHUNK):
+				crc = zlib.crc32(view[start:min(start + _CHUNK, ends[segment])], crc)
+		return crc
+
+	def checkpoint(self):
+		"""Record all the stored blocks as checked *(see `checked_height`)*"""
+		data = _CHECKPOINT.pack(len(self._entries), self.checksum(len(self._entries)))
+		path = self._checkpoint_path() + '.tmp'
+		with open(path, 'wb') as f:
+			f.write(data)
+			f.flush()
+			os.fsync(f.fileno())
+		os.replace(path, self._checkpoint_path())
+
+	def checked_height(self):
+		"""The number of blocks at the start of the store recorded by the last checkpoint
+
+		0 when there is no checkpoint or when the records it covers changed since
+		*(a truncation, a record damaged on disk)*
+
+		:rtype: int
+		"""
+		try:
+			with open(self._checkpoint_path(), 'rb') as f:
+				height, crc = _CHECKPOINT.unpack(f.read())
+		except (OSError, struct.error):
+			return 0
+		if height > len(self._entries) or self.checksum(height) != crc:
+			return 0
+		return height
+
+	def flush(self):
+		"""Write the pending appends and fsync the segment and the index"""
+		for f in (self._file, self._index):
+			f.flush()
+			os.fsync(f.fileno())
+		self._pending = 0
+
+	def _map(self, segment, end):
+		"""Memory map of a segment covering at least `end` bytes"""
+		view = self._maps.get(segment)
+		if view is None or len(view) < end:
+			if segment == self._segment:
+				# The appended bytes may still be in the buffer of the file
+				self._file.flush()
+			if view is not None:
+				view.close()
+			with open(self._segment_path(segment), 'rb') as f:
+				view = self._maps[segment] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+		return view
+
+	def read(self, height):
+		"""The json of the block at `height` as it is stored
+
+		:param height: index of the block in the chain
+		:type height: int
+
+		:rtype: bytes
+		"""
+		segment, offset, length, _ = self._entries[height]
+		start = offset + _LENGTH.size
+		return self._map(segment, start + length)[start:start + length]
+
+	def get_block(self, height):
+		"""The block at `height`
+
+		:rtype: Block
+		"""
+		return Block.json_to_block(json.loads(self.read(height)))
+
+	def height_of(self, block_hash):
+		"""The height of the block of hash `block_hash`, None if it is not stored"""
+		return self._heights.get(block_hash)
+
+	def load_blocks(self):
+		"""All the stored blocks, in the order of the chain
+
+		:rtype: list of Block
+		"""
+		return [self.get_block(height) for height in range(len(self._entries))]
+
+	def chain_json(self):
+		"""The json of the whole chain *(as `BlockChain.to_json`)* built from the stored bytes
+
+		:rtype: bytes
+		"""
+		return b'{' + b', '.join(b'"%d": %s' % (height, self.read(height))
+								 for height in range(len(self._entries))) + b'}'
+
+	def truncate(self, height):
+		"""Drop the blocks from `height` to the end of the store
+
+		:param height: the first block dropped
+		:type height: int
+		"""
+		if height >= len(self._entries):
+			return
+
+		for block_hash in [entry[3].hex() for entry in self._entries[height:]]:
+			self._heights.pop(block_hash, None)
+		del self._entries[height:]
+
+		self.flush()
+		self._close_maps()
+		self._file.close()
+
+		segment, end = self._tail()
+		for other in range(segment + 1, self._segment + 1):
+			os.remove(self._segment_path(other))
+		self._segment = segment
+		self._file = open(self._segment_path(segment), 'ab')
+		self._file.truncate(end)
+
+		self._index.truncate(len(self._entries) * _INDEX_RECORD.size)
+		self.flush()
+
+	def replace(self, blocks, fork=0):
+		"""Replace the stored blocks from `fork` by the ones of `blocks`
+
+		:param blocks: the blocks of the new chain
+		:type blocks: list of Block
+		:param fork: number of blocks shared with the stored chain, defaults to 0
+		:type fork: int, optional
+		"""
+		self.truncate(fork)
+		self.extend(blocks[len(self._entries):])
+
+	def _close_maps(self):
+		for view in self._maps.values():
+			view.close()
+		self._maps.clear()
+
+	def close(self):
+		"""Flush and close the files"""
+		self.flush()
+		self._close_maps()
+		self._file.close()
+		self._index.close()
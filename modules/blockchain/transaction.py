@@ -1,5 +1,7 @@
 import hashlib
 from modules.blockchain.cryp import Cryp
+from modules.blockchain.encoding import (ENCODING_VERSION, encode_key, encode_mapping,
+										 encode_signature, encode_varint)
 
 class Transaction:
 	"""the transaction object contains all the information about a transaction
@@ -28,9 +30,16 @@ class Transaction:
 
 		:meth __init__: Constructor of the object
 		:meth to_json: returns a *dict* containing all the information
+		:meth to_bytes: returns the canonical encoding of the transaction
+		:meth hash_transaction: returns the hash of the transaction *(cached until a field changes)*
+		:meth signature_item: returns the (public key, signature, data) to verify
 
 	"""
-	def __init__(self, sender, recipient, book, private_key=None, transaction_type=1, book_type='book'):
+
+	# Fields covered by the hash, assigning one of them drops the cached hash
+	_HASHED_FIELDS = frozenset(('type', 'sender', 'recipient', 'book', 'signature'))
+
+	def __init__(self, sender, recipient, book, private_key=None, transaction_type=1, book_type='book', signature=None):
 		if transaction_type in (1,2):
 			self.type = transaction_type
 		else:
@@ -46,6 +55,9 @@ class Transaction:
 		
 		if transaction_type == 2:
 			self.signature = None
+		elif signature:
+			# Already signed transaction (received from another node)
+			self.signature = signature
 		elif private_key:
 			self.signature = Cryp.get_signature(str(self.book), private_key)
 		else:
@@ -62,6 +74,48 @@ class Transaction:
 		}
 		return json_dict
 
+	def __setattr__(self, name, value):
+		if name in self._HASHED_FIELDS:
+			self.__dict__.pop('_hash', None)
+		object.__setattr__(self, name, value)
+
+	def to_bytes(self):
+		"""Canonical encoding of the transaction *see `modules.blockchain.encoding`*
+
+		:returns: version, type, sender, recipient, book and signature
+		:rtype: bytes
+		"""
+		return b''.join((
+			encode_varint(ENCODING_VERSION),
+			encode_varint(self.type),
+			encode_key(self.sender),
+			encode_key(self.recipient),
+			encode_mapping(self.book),
+			encode_signature(self.signature)
+		))
+
+	def hash_transaction(self):
+		"""Hash of the canonical encoding, computed once and kept until a field changes
+
+		:returns: sha256 digest of the transaction
+		:rtype: bytes
+		"""
+		try:
+			return self._hash
+		except AttributeError:
+			self._hash = hashlib.sha256(self.to_bytes()).digest()
+			return self._hash
+
+	def signature_item(self):
+		"""The signature to verify *see `modules.blockchain.verification`*
+
+		:returns: (public key, signature, signed data) or None for a reward transaction
+		:rtype: tuple or None
+		"""
+		if self.type == 2:
+			return None
+		return (self.sender, self.signature, str(self.book))
+
 
 	def __eq__(self, other):
 		return (self.to_json() == other.to_json())
@@ -87,6 +141,9 @@ class Transaction:
 		type_t = json_transaction['type']
 		recipient = json_transaction['recipient']
 		book = json_transaction['book']
-		signature = json_signature['signature']
-		
-		return Transaction(sender,recipient,book,type_t,book_type='json')
\ No newline at end of file
+		signature = json_transaction['signature']
+
+		if type_t == 1:
+			sender = Cryp.load_pub(sender)
+
+		return Transaction(sender, recipient, book, transaction_type=type_t, book_type='json', signature=signature)
@@ -0,0 +1,279 @@
+import multiprocessing as mp
+import threading
+from collections import OrderedDict
+from time import perf_counter
+
+from fastecdsa import ecdsa
+from fastecdsa.curve import secp256k1
+from fastecdsa.point import Point
+
+from modules.blockchain.cryp import SIGNATURES_VERIFIED
+from modules.blockchain.encoding import split_pair
+from modules.metrics import REGISTRY
+
+VERIFICATION_BATCH_SECONDS = REGISTRY.histogram('openbook_signature_batch_seconds', 'Time spent verifying a batch of signatures')
+
+
+def _verify_chunk(chunk):
+	"""Verify a chunk of ``(x, y, r, s, data)`` items *(ran in the worker processes)*
+
+	The public keys and signatures are sent as integers, they are cheaper to pickle than `Point` objects
+	"""
+	results = []
+	for x, y, r, s, data in chunk:
+		try:
+			results.append(ecdsa.verify((r, s), data, Point(x, y, secp256k1), curve=secp256k1))
+		except Exception:
+			# A key that is not on the curve or an out of range signature
+			results.append(False)
+	return results
+
+
+class SignatureCache:
+	"""Bounded LRU set of the signatures that have already been verified
+
+	The keys are ``(transaction hash, signature)``, only valid signatures are recorded.
+	The cache is shared between the reactor and the verification threads.
+
+	:Attributes:
+
+		:attr maxsize: maximum number of signatures kept, 0 disables the cache
+		:type maxsize: int
+
+		:attr hits: number of lookups that found the signature
+		:type hits: int
+
+		:attr misses: number of lookups that did not
+		:type misses: int
+
+	:Methods:
+
+		:meth check: Look for a signature, counts a hit or a miss
+
+		:meth add: Record a verified signature
+
+		:meth resize: Change the maximum size of the cache
+
+		:meth stats: The counters of the cache
+	"""
+
+	def __init__(self, maxsize=100000):
+		self.maxsize = maxsize
+		self.hits = 0
+		self.misses = 0
+		self._entries = OrderedDict()
+		self._lock = threading.Lock()
+
+	def __len__(self):
+		return len(self._entries)
+
+	def check(self, key):
+		"""Look for a verified signature
+
+		:param key: (transaction hash, signature)
+		:type key: tuple
+
+		:returns: True if the signature has already been verified
+		:rtype: bool
+		"""
+		with self._lock:
+			if key in self._entries:
+				self._entries.move_to_end(key)
+				self.hits += 1
+				return True
+			self.misses += 1
+			return False
+
+	def add(self, key):
+		"""Record a verified signature, the least recently used one is dropped when the cache is full"""
+		with self._lock:
+			if self.maxsize <= 0:
+				return
+			self._entries[key] = True
+			self._entries.move_to_end(key)
+			while len(self._entries) > self.maxsize:
+				self._entries.popitem(last=False)
+
+	def resize(self, maxsize):
+		"""Change the maximum number of signatures kept"""
+		with self._lock:
+			self.maxsize = maxsize
+			while len(self._entries) > max(maxsize, 0):
+				self._entries.popitem(last=False)
+
+	def stats(self):
+		"""The counters of the cache
+
+		:returns: hits, misses, size and maxsize
+		:rtype: dict
+		"""
+		return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries), 'maxsize': self.maxsize}
+
+
+class SignatureVerifier:
+	"""Batch verification of signatures spread over a pool of worker processes
+
+	Small batches are verified in the calling process, the cost of sending them
+	to the pool would be higher than the verification itself.
+
+	:Attributes:
+
+		:attr processes: number of worker processes, None for one per core
+		:type processes: int
+
+		:attr chunk_size: number of signatures sent to a worker at once
+		:type chunk_size: int
+
+		:attr inline_threshold: batches smaller than this are verified in the calling process
+		:type inline_threshold: int
+
+		:attr cache: the already verified transaction signatures
+		:type cache: SignatureCache
+
+	:Methods:
+
+		:meth verify: Verify a list of (public key, signature, data)
+
+		:meth verify_transactions: Verify the signatures of transactions, skipping the cached ones
+
+		:meth map: Run a function over a list of arguments on the pool *(block checks)*
+
+		:meth pool_size: Number of worker processes
+
+		:meth configure: Change the settings of the verifier
+
+		:meth close: Stop the worker processes
+	"""
+
+	def __init__(self, processes=None, chunk_size=256, inline_threshold=64, cache_size=100000):
+		self.processes = processes
+		self.chunk_size = chunk_size
+		self.inline_threshold = inline_threshold
+		self.cache = SignatureCache(cache_size)
+		self._pool = None
+		# The pool is created by the first thread needing it, several verifications can run at once
+		self._pool_lock = threading.Lock()
+
+	@staticmethod
+	def _prepare(item):
+		"""Convert a (public key, signature, data) item to integers, None if it can't be parsed"""
+		public_key, signature, data = item
+		if isinstance(public_key, Point):
+			key = (public_key.x, public_key.y)
+		elif isinstance(public_key, str):
+			key = split_pair(public_key)
+		else:
+			key = None
+
+		signature = split_pair(signature) if isinstance(signature, str) else None
+		if key is None or signature is None:
+			return None
+		return key + signature + (data,)
+
+	def verify(self, items):
+		"""Verify a list of signatures
+
+		:param items: the (public key, signature, data) to verify, the public key is a `Point`
+			or a `Cryp.dump_pub` string and the signature a `Cryp.get_signature` string
+		:type items: list of tuple
+
+		:returns: one result per item, in the same order
+		:rtype: list of bool
+		"""
+		start = perf_counter()
+		prepared = [self._prepare(item) for item in items]
+		valid = [item for item in prepared if item is not None]
+
+		if len(valid) < self.inline_threshold or self.processes == 1:
+			verified = _verify_chunk(valid)
+		else:
+			chunks = [valid[i:i + self.chunk_size] for i in range(0, len(valid), self.chunk_size)]
+			verified = [result for chunk in self._get_pool().map(_verify_chunk, chunks) for result in chunk]
+
+		# Counted here, the signatures verified on the pool are not seen by the main process
+		SIGNATURES_VERIFIED.inc(len(valid))
+		VERIFICATION_BATCH_SECONDS.observe(perf_counter() - start)
+
+		verified = iter(verified)
+		return [False if item is None else next(verified) for item in prepared]
+
+	def verify_transactions(self, transactions):
+		"""Verify the signatures of transactions
+
+		A signature found in the cache is not verified again, the valid ones are added to it
+		:param transactions: the transactions to verify *(reward transactions have no signature and are refused)*
+		:type transactions: list of Transaction
+
+		:returns: one result per transaction, in the same order
+		:rtype: list of bool
+		"""
+		results = [False] * len(transactions)
+		keys, items, positions = [], [], []
+
+		for i, transaction in enumerate(transactions):
+			item = transaction.signature_item()
+			if item is None:
+				continue
+			key = (transaction.hash_transaction(), transaction.signature)
+			if self.cache.check(key):
+				results[i] = True
+			else:
+				keys.append(key)
+				items.append(item)
+				positions.append(i)
+
+		for key, i, valid in zip(keys, positions, self.verify(items)):
+			if valid:
+				self.cache.add(key)
+			results[i] = valid
+
+		return results
+
+	def _get_pool(self):
+		with self._pool_lock:
+			if self._pool is None:
+				self._pool = mp.Pool(self.processes)
+			return self._pool
+
+	def pool_size(self):
+		"""Number of worker processes of the pool"""
+		return self.processes or mp.cpu_count()
+
+	def map(self, function, arguments):
+		"""Run `function` over `arguments` on the pool, the results are in the same order
+
+		:param function: a module level function *(it is pickled)*
+		:type function: callable
+
+		:param arguments: one argument per call
+		:type arguments: list
+
+		:rtype: list
+		"""
+		if self.processes == 1:
+			return list(map(function, arguments))
+		return self._get_pool().map(function, arguments)
+
+	def configure(self, processes=None, chunk_size=None, inline_threshold=None, cache_size=None):
+		"""Change the settings of the verifier, the pool is restarted with the new size"""
+		self.close()
+		self.processes = processes
+		if chunk_size is not None:
+			self.chunk_size = chunk_size
+		if inline_threshold is not None:
+			self.inline_threshold = inline_threshold
+		if cache_size is not None:
+			self.cache.resize(cache_size)
+
+	def close(self):
+		"""Stop the worker processes"""
+		with self._pool_lock:
+			pool, self._pool = self._pool, None
+		if pool is not None:
+			pool.terminate()
+			pool.join()
+
+
+# Verifier used by the transaction, block and chain validation when no other one is given
+# *(each node has its own, see `P2PFactory.verifier`)*
+default_verifier = SignatureVerifier()
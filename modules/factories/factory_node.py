@@ -1,20 +1,29 @@
 from twisted.internet.protocol import Factory
 from twisted.internet.endpoints import TCP4ServerEndpoint
-from twisted.internet.endpoints import TCP4ClientEndpoint, connectProtocol
-from twisted.internet import reactor
+from twisted.internet import reactor, threads
 
+from collections import Counter
 import sys
 sys.path.insert(0, '..')
 
 from modules.utils import uuid_generator
 from modules.protocols.protocol_node import *
 from modules.blockchain.blockchain import *
+from modules.blockchain.catalog import BookCatalog
+from modules.blockchain.mining import ParallelMiner
+from modules.blockchain.store import BlockStore
+from modules.blockchain.verification import SignatureVerifier
+from modules.logs import get_logger
+from modules.metrics import REGISTRY
+from modules.protocols.seen import SeenFilter, message_id
+
+log = get_logger('node')
 
 
 class P2PFactory(Factory):
 	"""P2PFactory
 	:Attributes:
-		:blockchain: the blockchain object of the node
+		:blockchain: the blockchain object of the node *(its mempool keeps the limits given to the factory)*
 		:debug: a debug attribute, used to print helpful messages
 		:active: The state of the node -in general
 		:max_peers: the maximum number of peers the node can connect-to
@@ -22,11 +31,49 @@ class P2PFactory(Factory):
 		:uuid: the universal identifier of the node
 		:known_peers: all the know_peers
 		:server_peers: all the peers which the current node connected-to as a client
-		:seed_point: the clientEndpoint to connect to the seed server
+		:seed: the (host, port) of the seed server
+		:seed_connection: fires with the protocol connected to the seed server
+		:connector: connects a protocol to a (host, port), returns a Deferred firing with the protocol
+			*(TCP by default, see `tcp_connector`)*
+		:clock: schedules the pings *(the reactor by default)*
+		:defer_to_thread: runs the verifications and the mining out of the reactor thread
+			*(`threads.deferToThread` by default)*
+		:miner: the pool of processes used to mine, None to mine on the reactor's process
+		:verifier: verifies the signatures of the transactions and blocks received *(pool and signature cache)*
+		:store: the on-disk copy of the chain, None to keep the chain in memory only
+		:catalog: the index of the books of the chain
+		:compression: compress the large messages sent to the peers that can decompress them
+		:compression_level: the compression level *(zlib 1-9, zstd 1-22)*
+		:compression_threshold: the messages smaller than this *(bytes)* are never compressed
+		:traffic: bytes sent to and received from the peers, before and after compression
+		:requested: the hashes of the blocks and transactions asked for to the peers, with the time of the request
+		:sources: the other peers that announced an item asked for, with the get_data to send them
+		:seen: the ids of the relayed messages seen recently *(see `modules.protocols.seen`)*
+		:dropped: number of relayed messages dropped as duplicates, per type
+	:Methods:
+		:dispatch_inv: Announce blocks and transactions to the peers
+		:dispatch_tip: Announce the last block to the peers
+		:restore_chain: Restore the chain from the store, up to the last valid record
+		:adopt_blocks: Add verified blocks to the chain's tree, switch to them if they have more work
+		:request: Record that an item is asked for, False if it is already asked to a peer
+		:add_source: Record a peer to ask for an item if the peer it is asked to does not deliver it
+		:stats: The counters of the node *(traffic, messages, mempool, signature cache)*
+		:register_metrics: Expose the state of the node in the metrics registry
 	"""
 	
-	def __init__(self, port, max_peers=0, debug=True):
-		self.blockchain = BlockChain()
+	def __init__(self, port, max_peers=0, debug=True, mining_processes=None, verify_processes=None,
+				 signature_cache_size=None, mempool=None, datadir=None, compression=True,
+				 compression_level=6, compression_threshold=1024, seed=('localhost', 5000), connector=None,
+				 clock=None, defer_to_thread=None):
+		self.blockchain = BlockChain(debug=debug, mempool=mempool)
+
+		# The chain is restored from the store *(see `restore_chain`)*
+		self.store = BlockStore(datadir) if datadir else None
+		if self.store is not None:
+			self.restore_chain()
+
+		self.catalog = BookCatalog(self.blockchain.block_chain)
+
 		# blockchain buffer will contain a temporary list of blockchains 
 		self._blockchain_buffer = []
 		
@@ -42,6 +89,32 @@ class P2PFactory(Factory):
 		self.port = port
 
 		self.uuid = uuid_generator()
+
+		# The network and the clock of the node *(replaced by an in-process network in the simulations)*
+		self.seed = seed
+		self.connector = connector or tcp_connector
+		self.clock = clock or reactor
+		self.defer_to_thread = defer_to_thread or threads.deferToThread
+
+		# Ids of the relayed messages seen recently, the duplicates are dropped *(counted per type)*
+		self.seen = SeenFilter(self.clock)
+		self.dropped = Counter()
+
+		# Compression of the large messages, negotiated with every peer
+		self.compression = compression
+		self.compression_level = compression_level
+		self.compression_threshold = compression_threshold
+		self.traffic = Counter()
+		self.register_metrics()
+
+		# Parallel proof of work, the pool is kept between two blocks
+		self.miner = ParallelMiner(mining_processes) if mining_processes else None
+
+		# Size of the pool verifying the signatures in batch *(one process per core by default)*
+		# and number of verified signatures kept in cache, the pool and the cache belong to the node
+		self.verifier = SignatureVerifier(processes=verify_processes)
+		if signature_cache_size is not None:
+			self.verifier.cache.resize(signature_cache_size)
 		
 		# dict of all the peers that are connected to this node
 		self.known_peers = {}
@@ -49,27 +122,233 @@ class P2PFactory(Factory):
 		# List of all the peers that the current node will connect-to as a `client`
 		self.server_peers = []
 
+		# Blocks and transactions asked for to the peers, with the time of the request
+		self.requested = {}
+		# Other peers that announced them, asked in turn when a request times out
+		self.sources = {}
+
 		#Connect to the SeedSever
-		seed_point = TCP4ClientEndpoint(reactor, "localhost", 5000)
-		self.seed_connection = connectProtocol(seed_point, P2Protocol(self, node_type=2))
+		self.seed_connection = self.connector(*seed, P2Protocol(self, node_type=2))
 
 		# Initiate handshake with seed server
 		self.update_peers()
 
+	def restore_chain(self):
+		"""Restore the chain from the store, up to the last valid record
+
+		The stored blocks have been verified before being written, their signatures are not verified again.
+		The blocks covered by the checkpoint of the store are trusted, the store is cut before the first
+		block after them that can not be read or whose hash, link or proof is not valid
+		*(a record changed or damaged on disk)*. The restored chain is recorded as checked
+
+		:returns: the number of blocks restored
+		:rtype: int
+		"""
+		checked = self.store.checked_height()
+		blocks = []
+		for height in range(len(self.store)):
+			try:
+				blocks.append(self.store.get_block(height))
+			except (ValueError, KeyError, TypeError):
+				break
+
+		valid = BlockChain.valid_prefix(blocks, min(checked, len(blocks)))
+		if valid < len(self.store):
+			log.warning('Dropping the %d stored blocks from the height %d, they are not valid',
+						len(self.store) - valid, valid)
+			self.store.truncate(valid)
+
+		if valid:
+			self.blockchain.block_chain = blocks[:valid]
+		else:
+			self.store.extend(self.blockchain.block_chain)
+		self.store.checkpoint()
+		return valid
+
 	def update_peers(self):
 		# Send Request to get new_peers from seed server
 		self.seed_connection.addCallback(lambda p : p.send_handshake())
 
-	def dispatch_get_blockchain(self, protocol):
-		# Send a get_blockchain request except for the node who started the feed-back
-		for id,p in know_peers.items():
+	def dispatch_inv(self, protocol, blocks=(), transactions=()):
+		# Announce blocks and transactions except to the node they came from, the peers ask for the ones they lack
+		# The id is derived from the items, the same announcement coming back is dropped
+		inv_id = message_id(blocks, transactions)
+		self.seen.add(inv_id)
+		for id,p in self.known_peers.items():
 			if p != protocol:
-				p.send_get_blockchain()
+				p.send_inv(blocks, transactions, inv_id)
 
-	def dispatch_blockchain(self, protocol, bc):
-		for id,p in know_peers.items():
-			if p != protocol:
-				p.send_blockchain(bc)
+	def dispatch_tip(self, protocol):
+		# Announce the last block
+		blockchain = self.blockchain
+		tip = blockchain.number_blocks() - 1
+		self.dispatch_inv(protocol, blocks=[[tip, blockchain.block_chain[tip].hash]])
+
+	def request(self, key):
+		"""Record that a block or a transaction is asked for to a peer
+
+		:param key: the hash of the item
+		:type key: str
+
+		:returns: False if it has been asked for to a peer less than `REQUEST_TIMEOUT` seconds ago
+		:rtype: bool
+		"""
+		now = self.clock.seconds()
+		asked = self.requested.get(key)
+		if asked is not None and now - asked < REQUEST_TIMEOUT:
+			return False
+		if len(self.requested) >= MAX_KNOWN_INVENTORY:
+			self.requested = {item: time for item, time in self.requested.items() if now - time < REQUEST_TIMEOUT}
+		self.requested[key] = now
+		return True
+
+	def add_source(self, key, protocol, get_data):
+		"""Record that a peer announced an item already asked for to another peer
+
+		If the item is not received within `REQUEST_TIMEOUT`, it is asked for to the next connected source
+
+		:param key: the hash of the item
+		:type key: str
+		:param protocol: the connection to the peer
+		:type protocol: P2Protocol *-protocol_node.py*
+		:param get_data: the arguments of `P2Protocol.send_get_data` asking for the item
+		:type get_data: dict
+		"""
+		asked = self.requested.get(key)
+		if asked is None:
+			return
+		sources = self.sources.get(key)
+		if sources is None:
+			sources = self.sources[key] = []
+			self.clock.callLater(max(asked + REQUEST_TIMEOUT - self.clock.seconds(), 0), self._retry, key)
+		if all(source is not protocol for source, _ in sources):
+			sources.append((protocol, get_data))
+
+	def _retry(self, key):
+		# The item has been received *(or dropped)*, or asked for again meanwhile
+		asked = self.requested.get(key)
+		if asked is None:
+			self.sources.pop(key, None)
+			return
+		remaining = asked + REQUEST_TIMEOUT - self.clock.seconds()
+		if remaining > 0:
+			self.clock.callLater(remaining, self._retry, key)
+			return
+
+		sources = self.sources.pop(key)
+		while sources:
+			protocol, get_data = sources.pop(0)
+			if self.known_peers.get(protocol.remote_nodeid) is protocol:
+				self.requested[key] = self.clock.seconds()
+				protocol.send_get_data(**get_data)
+				break
+		if sources:
+			self.sources[key] = sources
+			self.clock.callLater(REQUEST_TIMEOUT, self._retry, key)
+
+	def adopt_blocks(self, blocks):
+		"""Add verified blocks to the tree of the chain, the chain switches to them if they have more work
+
+		Only the blocks after the fork point are replaced, in the chain, the store and the catalog, the
+		mempool is updated by `BlockChain.reorganize`. The blocks of a branch with less work are kept in
+		the tree *(it can become the best one)* until it ends too far below the tip
+
+		:param blocks: the verified blocks, extending the chain or one of its forks
+		:type blocks: list of Block
+
+		:returns: the height of the first block changed, None if the chain did not change
+		:rtype: int or None
+		"""
+		fork = self.blockchain.reorganize(blocks)
+		if fork is None:
+			return None
+
+		# The block being mined does not extend the new tip
+		self.cancel_mining()
+
+		block_chain = self.blockchain.block_chain
+		if self.store is not None:
+			self.store.replace(block_chain, fork)
+		self.catalog.replace(block_chain, fork)
+		return fork
+
+	def mine(self, recipient):
+		"""Mine a block out of the reactor thread, add it like the blocks of the peers and announce it
+
+		:param recipient: Miner's ID - who is being rewarded for mining the block
+		:type recipient: str
+
+		:returns: fires with the new block, or None if the round was cancelled
+		:rtype: Deferred
+		"""
+		d = self.defer_to_thread(self.blockchain.mine_candidate, recipient, self.miner)
+
+		def mined(block):
+			# The block is added on the reactor thread, it is dropped if the tip changed during the search
+			if block is None or block.previous_hash != self.blockchain.block_chain[-1].hash:
+				return None
+			self.adopt_blocks([block])
+			self.dispatch_tip(None)
+			return block
+
+		return d.addCallback(mined)
+
+	def cancel_mining(self):
+		"""Stop the running mining round *(a new tip was received)*"""
+		if self.miner is not None:
+			self.miner.cancel()
+
+	def stats(self):
+		"""The counters of the node
+
+		:returns: traffic *(bytes sent/received and their size before compression)*, messages
+			*(count, size and handling time per type)*, duplicates *(relayed messages dropped per type,
+			ids remembered)*, mempool and signatures
+		:rtype: dict
+		"""
+		traffic = {key: self.traffic[key] for key in ('bytes_sent', 'bytes_sent_uncompressed',
+													  'bytes_received', 'bytes_received_uncompressed')}
+		return {'traffic': traffic, 'messages': P2Protocol.router.snapshot(),
+				'duplicates': {'dropped': dict(self.dropped), 'seen': len(self.seen)},
+				'mempool': self.blockchain.open_transactions.stats(),
+				'signatures': self.verifier.cache.stats()}
+
+	def register_metrics(self, registry=REGISTRY):
+		"""Expose the state of the node in the metrics registry *(read when the metrics are scraped)*
+
+		The metrics are labelled with the uuid of the node, several nodes can run in the same process
+		:param registry: defaults to `modules.metrics.REGISTRY`
+		:type registry: Registry *-modules.metrics*, optional
+		"""
+		node = self.uuid
+		registry.gauge('openbook_chain_height', 'Height of the last block of the local chain',
+					   lambda: self.blockchain.number_blocks() - 1, node=node)
+		registry.gauge('openbook_peers', 'Connected peers', lambda: len(self.known_peers), node=node)
+		registry.gauge('openbook_mempool_transactions', 'Transactions in the mempool',
+					   lambda: len(self.blockchain.open_transactions), node=node)
+		registry.gauge('openbook_mempool_bytes', 'Size of the transactions in the mempool',
+					   lambda: self.blockchain.open_transactions.bytes, node=node)
+		registry.counter('openbook_duplicate_messages_total', 'Relayed messages dropped as already seen',
+						 lambda: sum(self.dropped.values()), node=node)
+		registry.counter('openbook_signature_cache_hits_total', 'Signatures found in the cache',
+						 lambda: self.verifier.cache.hits, node=node)
+		registry.counter('openbook_signature_cache_misses_total', 'Signatures not found in the cache',
+						 lambda: self.verifier.cache.misses, node=node)
+		for direction in ('sent', 'received'):
+			registry.counter('openbook_bytes_total', 'Bytes exchanged with the peers',
+							 lambda key=f'bytes_{direction}': self.traffic[key], direction=direction, node=node)
+			registry.counter('openbook_uncompressed_bytes_total', 'Bytes exchanged with the peers before compression',
+							 lambda key=f'bytes_{direction}_uncompressed': self.traffic[key], direction=direction,
+							 node=node)
+
+	def stopFactory(self):
+		if self.miner is not None:
+			self.miner.close()
+		self.verifier.close()
+		if self.store is not None:
+			# The stored blocks were verified before being written
+			self.store.checkpoint()
+			self.store.close()
 
 	def buildProtocol(self, addr):
 		return P2Protocol(self)
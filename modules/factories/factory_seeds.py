@@ -5,6 +5,8 @@ from twisted.internet import reactor
 import sys
 sys.path.insert(0, '..')
 
+from modules.metrics import REGISTRY
+from modules.utils import uuid_generator
 from modules.protocols.protocol_seeds import *
 
 
@@ -14,12 +16,20 @@ class SeedFactory(Factory):
 	:Attributes:
 		:debug: a debug attribute, used to print helpful messages
 		:known_peers: a dict that stores all the remote nodes
+		:clock: schedules the pings *(the reactor by default)*
+		:uuid: identifies the seed server in the metrics
 	"""
-	def __init__(self, debug=True):
+	def __init__(self, debug=True, clock=None):
 		# debug variable if True prints log
 		self.debug = debug
 
 		self.known_peers = {}
 
+		self.clock = clock or reactor
+
+		self.uuid = uuid_generator()
+		REGISTRY.gauge('openbook_seed_known_peers', 'Nodes registered on the seed server', lambda: len(self.known_peers),
+					   seed=self.uuid)
+
 	def buildProtocol(self, addr):
 		return SeedProtocol(self)
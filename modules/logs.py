@@ -0,0 +1,183 @@
+"""Logging of the node, the seed server and the client
+
+The records are put in a queue by the reactor thread and formatted and written by a
+background thread *(QueueListener)*, the reactor only pays for creating the record. The
+arguments of a record are formatted by the writer, they must not be modified once logged.
+A record is one line: time, level, logger, message and its fields::
+
+	2021-03-01 12:00:00,000 DEBUG openbook.node: received info_type=ping size=28 peer=5f1c...
+
+The fields are passed with ``extra=fields(...)``. The records of the high-rate messages
+*(ping, post_transaction)* are sampled: only one out of N is kept, see `SamplingFilter`.
+"""
+import atexit
+import copy
+import logging
+import queue
+import sys
+from itertools import count
+from logging.handlers import QueueHandler, QueueListener
+
+# Level of the dumps of the whole messages, below DEBUG
+TRACE = 5
+logging.addLevelName(TRACE, 'TRACE')
+
+LEVELS = ('TRACE', 'DEBUG', 'INFO', 'WARNING', 'ERROR')
+
+# One record kept out of N for these message types
+DEFAULT_SAMPLING = {'ping': 10, 'pong': 10, 'post_transaction': 100}
+
+ROOT = 'openbook'
+
+_listener = None
+
+
+def get_logger(name):
+	"""The logger of a part of the application *(child of the 'openbook' logger)*
+
+	:param name: the name of the part *(node, seeds, client, blockchain, ...)*
+	:type name: str
+
+	:rtype: Logger
+	"""
+	return logging.getLogger(f'{ROOT}.{name}')
+
+
+def fields(**values):
+	"""The structured fields of a record, to pass as `extra`
+
+	>>> log.debug('received', extra=fields(info_type='ping', size=28))
+	"""
+	return {'fields': values}
+
+
+class StructuredFormatter(logging.Formatter):
+	"""Formats a record with its fields appended as ``key=value``"""
+
+	def __init__(self):
+		logging.Formatter.__init__(self, '%(asctime)s %(levelname)s %(name)s: %(message)s')
+
+	def format(self, record):
+		line = logging.Formatter.format(self, record)
+		values = getattr(record, 'fields', None)
+		if values:
+			line += ' ' + ' '.join(f'{key}={value}' for key, value in values.items())
+		return line
+
+
+class _LazyQueueHandler(QueueHandler):
+	"""Queues the records as they are, the writer thread formats their message"""
+
+	def prepare(self, record):
+		return copy.copy(record)
+
+
+class SamplingFilter(logging.Filter):
+	"""Keeps one record out of N for the message types of `rates`
+
+	The records are sampled on their `info_type` field *(separately for every level)*, the warnings
+	and errors are always kept.
+
+	:Attributes:
+
+		:attr rates: the N of each message type *(1 keeps every record)*
+		:type rates: dict
+	"""
+
+	def __init__(self, rates=None):
+		logging.Filter.__init__(self)
+		self.rates = dict(DEFAULT_SAMPLING if rates is None else rates)
+		self._counters = {}
+
+	def filter(self, record):
+		if record.levelno >= logging.WARNING:
+			return True
+		info_type = getattr(record, 'fields', {}).get('info_type')
+		rate = self.rates.get(info_type)
+		if rate is None or rate <= 1:
+			return True
+		key = (info_type, record.levelno)
+		counter = self._counters.get(key)
+		if counter is None:
+			counter = self._counters[key] = count()
+		return next(counter) % rate == 0
+
+
+def setup_logging(level='INFO', sampling=None, stream=None):
+	"""Send the records of the 'openbook' loggers to a background writer
+
+	Calling it again replaces the previous configuration.
+
+	:param level: the lowest level written *(TRACE, DEBUG, INFO, WARNING or ERROR)*, defaults to 'INFO'
+	:type level: str, optional
+	:param sampling: one record kept out of N per message type, defaults to `DEFAULT_SAMPLING`
+	:type sampling: dict, optional
+	:param stream: where the records are written, defaults to stderr
+	:type stream: file, optional
+
+	:returns: the listener writing the records *(stopped at exit)*
+	:rtype: QueueListener
+	"""
+	global _listener
+
+	stop_logging()
+	logger = logging.getLogger(ROOT)
+
+	records = queue.SimpleQueue()
+	handler = _LazyQueueHandler(records)
+	handler.addFilter(SamplingFilter(sampling))
+
+	writer = logging.StreamHandler(stream or sys.stderr)
+	writer.setFormatter(StructuredFormatter())
+
+	logger.addHandler(handler)
+	logger.setLevel(logging.getLevelName(level.upper()) if isinstance(level, str) else level)
+	# The records are not written twice by the handlers of the root logger
+	logger.propagate = False
+
+	_listener = QueueListener(records, writer)
+	_listener.start()
+	return _listener
+
+
+def stop_logging():
+	"""Write the queued records and stop the background writer"""
+	global _listener
+	if _listener is not None:
+		_listener.stop()
+		_listener = None
+
+	logger = logging.getLogger(ROOT)
+	for handler in list(logger.handlers):
+		if isinstance(handler, QueueHandler):
+			logger.removeHandler(handler)
+
+
+def parse_sampling(values):
+	"""The sampling rates given on the command line *(TYPE=N)*
+
+	:param values: the ``TYPE=N`` arguments, None for the default rates
+	:type values: list or None
+
+	:rtype: dict
+	:raises ValueError: if an argument is not ``TYPE=N``
+	"""
+	rates = dict(DEFAULT_SAMPLING)
+	for value in values or ():
+		info_type, _, rate = value.partition('=')
+		rates[info_type] = int(rate)
+	return rates
+
+
+def setup_from_args(arg):
+	"""Configure the logging from the arguments of `modules.utils.argparser`
+
+	``--log-level`` gives the level, ``-d/--debug`` alone means DEBUG.
+
+	:rtype: QueueListener
+	"""
+	level = arg.log_level or ('DEBUG' if arg.debug else 'INFO')
+	return setup_logging(level, parse_sampling(arg.log_sample))
+
+
+atexit.register(stop_logging)
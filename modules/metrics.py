@@ -0,0 +1,266 @@
+"""Metrics of the node and of the seed server
+
+The metrics are registered in `REGISTRY` and exposed in the Prometheus text format
+*(see `serve_metrics`)*. The hot paths only increment an attribute or fill a histogram,
+the values kept elsewhere *(chain height, mempool, traffic)* are read by functions when
+the metrics are scraped.
+"""
+from bisect import bisect_left
+
+# Upper bounds of the buckets *(seconds and bytes)*
+LATENCY_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5)
+SIZE_BUCKETS = tuple(64 * 4 ** i for i in range(11))
+
+
+class Histogram:
+	"""Number of observed values per bucket
+
+	A value is counted in the first bucket whose upper bound is greater or equal to it,
+	the values above the last bound are counted in an extra *(infinite)* bucket.
+
+	:Attributes:
+
+		:attr buckets: the upper bounds of the buckets, in increasing order
+		:type buckets: tuple
+
+		:attr counts: number of values in each bucket *(plus the infinite bucket)*
+		:type counts: list of int
+
+		:attr count: number of values observed
+		:type count: int
+
+		:attr sum: sum of the values observed
+		:type sum: float
+
+	:Methods:
+
+		:meth observe: Count a value
+
+		:meth quantile: Upper bound of the bucket holding the given quantile
+
+		:meth snapshot: The counters of the histogram
+	"""
+	kind = 'histogram'
+
+	def __init__(self, buckets=LATENCY_BUCKETS):
+		self.buckets = tuple(buckets)
+		self.counts = [0] * (len(self.buckets) + 1)
+		self.count = 0
+		self.sum = 0
+
+	def observe(self, value):
+		"""Count a value
+
+		:param value: the observed value
+		:type value: int or float
+		"""
+		self.counts[bisect_left(self.buckets, value)] += 1
+		self.count += 1
+		self.sum += value
+
+	def quantile(self, q):
+		"""Upper bound of the bucket holding the quantile `q` of the values
+
+		:param q: the quantile *(0.5 for the median)*
+		:type q: float
+
+		:returns: the upper bound, infinity if it is in the last bucket, None if nothing was observed
+		:rtype: float or None
+		"""
+		if not self.count:
+			return None
+		rank, seen = q * self.count, 0
+		for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+			seen += count
+			if seen >= rank:
+				return bound
+		return float('inf')
+
+	def snapshot(self):
+		"""The counters of the histogram
+
+		:returns: count, sum and the number of values per upper bound *('inf' for the last bucket)*
+		:rtype: dict
+		"""
+		bounds = [str(bound) for bound in self.buckets] + ['inf']
+		return {'count': self.count, 'sum': self.sum, 'buckets': dict(zip(bounds, self.counts))}
+
+
+class Counter:
+	"""A value that only goes up
+
+	:Attributes:
+
+		:attr function: returns the value when it is read, defaults to None *(the counted value)*
+		:type function: callable
+
+	:Methods:
+
+		:meth inc: Add to the counter
+	"""
+	kind = 'counter'
+
+	def __init__(self, function=None):
+		self.function = function
+		self._value = 0
+
+	def inc(self, amount=1):
+		self._value += amount
+
+	@property
+	def value(self):
+		return self.function() if self.function is not None else self._value
+
+
+class Gauge(Counter):
+	"""A value that goes up and down
+
+	:Methods:
+
+		:meth set: Change the value
+
+		:meth inc: Add to the value *(negative to decrease it)*
+	"""
+	kind = 'gauge'
+
+	def set(self, value):
+		self._value = value
+
+
+def _labels(labels, extra=None):
+	items = sorted(labels.items()) + ([extra] if extra else [])
+	if not items:
+		return ''
+	escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in items)
+	return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(items, escaped)) + '}'
+
+
+def _number(value):
+	if value == float('inf'):
+		return '+Inf'
+	return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Registry:
+	"""The metrics exposed by the process
+
+	A metric is identified by its name and its labels, registering it again raises a ValueError
+	*(two owners of the same metric, one would hide the other)*: the metrics of an object that
+	can have several instances in the process are told apart by a label.
+
+	:Methods:
+
+		:meth counter: Register a counter
+
+		:meth gauge: Register a gauge
+
+		:meth histogram: Register a histogram
+
+		:meth exposition: The metrics in the Prometheus text format
+	"""
+
+	def __init__(self):
+		# name -> (kind, help, {labels: metric})
+		self._families = {}
+
+	def _register(self, cls, name, help, labels, create):
+		family = self._families.get(name)
+		if family is None:
+			family = self._families[name] = (cls.kind, help, {})
+		elif family[0] != cls.kind:
+			raise ValueError(f'{name} is already registered as a {family[0]}')
+
+		key = tuple(sorted(labels.items()))
+		if key in family[2]:
+			raise ValueError(f'{name}{_labels(labels)} is already registered')
+		metric = family[2][key] = create()
+		return metric
+
+	def counter(self, name, help, function=None, **labels):
+		"""Register a counter
+
+		:param name: name of the metric *(ends with _total)*
+		:type name: str
+		:param help: description of the metric
+		:type help: str
+		:param function: returns the value when it is scraped, defaults to None *(the counter is incremented)*
+		:type function: callable, optional
+		:param labels: the labels of the metric
+
+		:rtype: Counter
+		"""
+		return self._register(Counter, name, help, labels, lambda: Counter(function))
+
+	def gauge(self, name, help, function=None, **labels):
+		"""Register a gauge *(same parameters as `counter`)*
+
+		:rtype: Gauge
+		"""
+		return self._register(Gauge, name, help, labels, lambda: Gauge(function))
+
+	def histogram(self, name, help, buckets=LATENCY_BUCKETS, histogram=None, **labels):
+		"""Register a histogram
+
+		:param buckets: the upper bounds of the buckets, defaults to `LATENCY_BUCKETS`
+		:type buckets: tuple, optional
+		:param histogram: an existing histogram to expose, defaults to None *(a new one)*
+		:type histogram: Histogram, optional
+
+		:rtype: Histogram
+		"""
+		return self._register(Histogram, name, help, labels, lambda: histogram or Histogram(buckets))
+
+	def exposition(self):
+		"""The metrics in the Prometheus text format *(version 0.0.4)*
+
+		:rtype: str
+		"""
+		lines = []
+		for name, (kind, help, metrics) in sorted(self._families.items()):
+			lines.append(f'# HELP {name} {help}')
+			lines.append(f'# TYPE {name} {kind}')
+			for key, metric in metrics.items():
+				labels = dict(key)
+				if kind != 'histogram':
+					lines.append(f'{name}{_labels(labels)} {_number(metric.value)}')
+					continue
+				cumulated = 0
+				for bound, count in zip(metric.buckets + (float('inf'),), metric.counts):
+					cumulated += count
+					lines.append(f'{name}_bucket{_labels(labels, ("le", _number(bound)))} {cumulated}')
+				lines.append(f'{name}_sum{_labels(labels)} {_number(metric.sum)}')
+				lines.append(f'{name}_count{_labels(labels)} {metric.count}')
+		return '\n'.join(lines) + '\n'
+
+
+# The metrics of the process
+REGISTRY = Registry()
+
+
+def serve_metrics(port, registry=REGISTRY, interface='127.0.0.1'):
+	"""Expose the metrics on http://interface:port/metrics *(for Prometheus)*
+
+	:param port: the HTTP port
+	:type port: int
+	:param registry: the metrics to expose, defaults to `REGISTRY`
+	:type registry: Registry, optional
+	:param interface: the listening address, defaults to the local interface only
+	:type interface: str, optional
+
+	:returns: the listening port
+	:rtype: IListeningPort *twisted*
+	"""
+	from twisted.internet import reactor
+	from twisted.web.resource import Resource
+	from twisted.web.server import Site
+
+	class MetricsResource(Resource):
+		isLeaf = True
+
+		def render_GET(self, request):
+			request.setHeader(b'content-type', b'text/plain; version=0.0.4; charset=utf-8')
+			return registry.exposition().encode()
+
+	root = Resource()
+	root.putChild(b'metrics', MetricsResource())
+	return reactor.listenTCP(port, Site(root), interface=interface)
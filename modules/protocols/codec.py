@@ -0,0 +1,250 @@
+"""Compact binary encoding of the protocol messages
+
+The messages are json objects, the binary codec encodes the same values with a one byte tag:
+
+	* `T_NONE`, `T_FALSE`, `T_TRUE`: the value itself
+	* `T_INT`: zigzag varint *(indexes, nonces, heights)*
+	* `T_FLOAT`: 8 bytes double
+	* `T_STR`: varint length + utf-8 string
+	* `T_HEX`: varint length + raw bytes of a lowercase hex string *(hashes)*
+	* `T_PAIR`: 64 bytes, the two integers of a ``0x..,0x..`` string *(public keys and signatures)*
+	* `T_LIST`: varint count + items
+	* `T_DICT`: varint count + key/value pairs
+	* `T_WORD`: one byte index in `WORDS` *(the keys and the usual values of the messages)*
+
+Every value is decoded to the exact json value it was encoded from. The peers advertise the
+codecs they support in their handshake, a frame starting with ``{`` is always json so the
+peers that only speak json keep working.
+"""
+import json
+import re
+import struct
+
+from modules.blockchain.encoding import decode_varint, encode_varint, split_pair
+
+# Codecs in order of preference
+CODECS = ('binary', 'json')
+
+T_NONE = 0
+T_FALSE = 1
+T_TRUE = 2
+T_INT = 3
+T_FLOAT = 4
+T_STR = 5
+T_HEX = 6
+T_PAIR = 7
+T_LIST = 8
+T_DICT = 9
+T_WORD = 10
+
+# The index of a word is its encoding, new words are only ever appended
+WORDS = (
+	'information_type', 'nodeid', 'my_ip', 'my_port', 'codecs', 'binary', 'json',
+	'handshake', 'ping', 'pong', 'post_peers', 'get_peers', 'number_queue', 'known_peers', 'UNKNOWN', 'SeedServer',
+	'get_blockchain', 'post_blockchain', 'blockchain', 'blockchain_start', 'blockchain_blocks', 'blockchain_end',
+	'count', 'get_headers', 'headers', 'locator', 'start', 'height', 'get_blocks', 'blocks', 'from', 'to',
+	'post_transaction', 'get_transaction', 'transaction_done', 'data',
+	'previous_hash', 'index', 'transactions', 'nonce', 'Timestamp', 'hash', 'merkle_root',
+	'type', 'sender', 'recipient', 'book', 'signature', 'title', 'author', 'date', 'genre',
+	'mining', 'the-chain', 'BlockChain', 'client', '',
+	'compressions', 'zlib', 'zstd',
+	'inv', 'get_data', 'block', 'id',
+)
+_WORD_INDEX = {word: i for i, word in enumerate(WORDS)}
+
+_HEX_RE = re.compile(r'^(?:[0-9a-f]{2})+$')
+_FLOAT = struct.Struct('>d')
+
+# Maximum nesting of the lists and dicts of a message *(a block is nested 5 levels deep)*
+MAX_DEPTH = 32
+
+
+def _pair(value):
+	"""The integers of a ``0x..,0x..`` string, None if the string would not be rebuilt identically"""
+	pair = split_pair(value)
+	if pair is None or pair[0] >> 256 or pair[1] >> 256 or value != f'0x{pair[0]:x},0x{pair[1]:x}':
+		return None
+	return pair
+
+
+def _encode_str(value, out):
+	word = _WORD_INDEX.get(value)
+	if word is not None:
+		out.append(T_WORD)
+		out.append(word)
+		return
+	pair = _pair(value) if value.startswith('0x') else None
+	if pair is not None:
+		out.append(T_PAIR)
+		out += pair[0].to_bytes(32, 'big')
+		out += pair[1].to_bytes(32, 'big')
+	elif _HEX_RE.match(value):
+		out.append(T_HEX)
+		out += encode_varint(len(value) // 2)
+		out += bytes.fromhex(value)
+	else:
+		raw = value.encode()
+		out.append(T_STR)
+		out += encode_varint(len(raw))
+		out += raw
+
+
+def _encode(value, out):
+	# The most frequent types are tested first
+	kind = type(value)
+	if kind is str:
+		_encode_str(value, out)
+	elif kind is dict:
+		out.append(T_DICT)
+		out += encode_varint(len(value))
+		for key, item in value.items():
+			# Like json, the keys are strings
+			_encode_str(key if type(key) is str else json.dumps(key), out)
+			_encode(item, out)
+	elif kind is list or kind is tuple:
+		out.append(T_LIST)
+		out += encode_varint(len(value))
+		for item in value:
+			_encode(item, out)
+	elif value is None:
+		out.append(T_NONE)
+	elif value is True:
+		out.append(T_TRUE)
+	elif value is False:
+		out.append(T_FALSE)
+	elif isinstance(value, int):
+		out.append(T_INT)
+		out += encode_varint(value << 1 if value >= 0 else (-value << 1) - 1)
+	elif isinstance(value, float):
+		out.append(T_FLOAT)
+		out += _FLOAT.pack(value)
+	elif isinstance(value, str):
+		_encode_str(str(value), out)
+	else:
+		raise TypeError(f'{type(value).__name__} can not be encoded')
+
+
+def encode(value):
+	"""Encode a json value
+
+	:param value: the message *(dict, list, str, int, float, bool or None)*
+
+	:rtype: bytes
+	"""
+	out = bytearray()
+	_encode(value, out)
+	return bytes(out)
+
+
+def _decode(data, offset, depth=0):
+	tag = data[offset]
+	offset += 1
+
+	if tag == T_WORD:
+		return WORDS[data[offset]], offset + 1
+	if tag == T_STR:
+		length, offset = decode_varint(data, offset)
+		return data[offset:offset + length].decode(), offset + length
+	if tag == T_HEX:
+		length, offset = decode_varint(data, offset)
+		return data[offset:offset + length].hex(), offset + length
+	if tag == T_PAIR:
+		x = int.from_bytes(data[offset:offset + 32], 'big')
+		y = int.from_bytes(data[offset + 32:offset + 64], 'big')
+		return f'0x{x:x},0x{y:x}', offset + 64
+	if tag == T_INT:
+		number, offset = decode_varint(data, offset)
+		return (number >> 1) ^ -(number & 1), offset
+	if tag == T_DICT or tag == T_LIST:
+		if depth >= MAX_DEPTH:
+			raise ValueError(f'binary message nested more than {MAX_DEPTH} levels')
+		count, offset = decode_varint(data, offset)
+		if tag == T_LIST:
+			value = []
+			for _ in range(count):
+				item, offset = _decode(data, offset, depth + 1)
+				value.append(item)
+			return value, offset
+		value = {}
+		for _ in range(count):
+			key, offset = _decode(data, offset, depth + 1)
+			value[key], offset = _decode(data, offset, depth + 1)
+		return value, offset
+	if tag == T_NONE:
+		return None, offset
+	if tag == T_TRUE:
+		return True, offset
+	if tag == T_FALSE:
+		return False, offset
+	if tag == T_FLOAT:
+		return _FLOAT.unpack_from(data, offset)[0], offset + _FLOAT.size
+	raise ValueError(f'unknown tag {tag} at {offset - 1}')
+
+
+def decode(data):
+	"""Decode a binary message
+
+	:param data: the encoded message
+	:type data: bytes
+
+	:returns: the json value
+	:raises ValueError: if the data is not a complete binary message
+	"""
+	try:
+		value, offset = _decode(data, 0)
+	except (IndexError, UnicodeDecodeError, TypeError, struct.error) as e:
+		# TypeError: a list or a dict used as a dict key
+		raise ValueError(f'truncated or invalid binary message ({e})')
+	if offset != len(data):
+		raise ValueError(f'{len(data) - offset} bytes after the end of the binary message')
+	return value
+
+
+def encode_message(message, codec='json'):
+	"""Serialize a message with `codec`
+
+	:param message: the message *{'information_type': ..., ...}*
+	:type message: dict
+	:param codec: 'binary' or 'json', defaults to 'json'
+	:type codec: str, optional
+
+	:rtype: bytes
+	"""
+	if codec == 'binary':
+		return encode(message)
+	return json.dumps(message).encode()
+
+
+def decode_message(data):
+	"""Parse a message, whatever the codec it was sent with *(json messages start with '{')*
+
+	:param data: the payload of a frame
+	:type data: bytes
+
+	:rtype: dict
+	:raises ValueError: if the payload is not a message *(a dict)*
+	"""
+	if data[:1] == b'{':
+		try:
+			message = json.loads(data)
+		except RecursionError:
+			raise ValueError('json message nested too deeply')
+	else:
+		message = decode(data)
+	if not isinstance(message, dict):
+		raise ValueError(f'the message is a {type(message).__name__}, not a dict')
+	return message
+
+
+def negotiate(codecs):
+	"""The codec to send messages with, given the codecs advertised by the peer
+
+	:param codecs: the codecs of the peer *(None for a peer that does not advertise any)*
+	:type codecs: list or None
+
+	:rtype: str
+	"""
+	for codec in CODECS:
+		if codec in (codecs or ()):
+			return codec
+	return 'json'
@@ -0,0 +1,121 @@
+"""Compression of the large messages *(chains, ranges of blocks)*
+
+A compressed message starts with a marker byte of its algorithm, which can't be the first
+byte of a json *('{')* or binary message, followed by the compressed bytes. The peers
+advertise the algorithms they support in their handshake, zstd is used when the
+`zstandard` package is installed on both sides, zlib otherwise.
+"""
+import zlib
+
+try:
+	import zstandard
+except ImportError:
+	zstandard = None
+
+from modules.protocols.framing import MAX_FRAME_SIZE
+
+ZLIB = 0xfa
+ZSTD = 0xfb
+
+# Algorithms in order of preference
+COMPRESSIONS = ('zstd', 'zlib') if zstandard is not None else ('zlib',)
+
+_MARKERS = {'zlib': ZLIB, 'zstd': ZSTD}
+
+
+class Compressor:
+	"""Compress the messages sent on a connection
+
+	:Attributes:
+
+		:attr algorithm: 'zstd', 'zlib' or None *(no compression)*
+		:type algorithm: str
+
+		:attr level: the compression level
+		:type level: int
+
+		:attr threshold: the messages smaller than this are sent as they are
+		:type threshold: int
+
+	:Methods:
+
+		:meth compress: Compress a message if it is worth it
+	"""
+
+	def __init__(self, algorithm=None, level=6, threshold=1024):
+		self.algorithm = algorithm
+		self.level = level
+		self.threshold = threshold
+		if algorithm == 'zstd':
+			self._zstd = zstandard.ZstdCompressor(level=level)
+
+	def compress(self, payload):
+		"""Compress a message, it is sent as it is if it is small or does not shrink
+
+		:param payload: the serialized message
+		:type payload: bytes
+
+		:rtype: bytes
+		"""
+		if self.algorithm is None or len(payload) < self.threshold:
+			return payload
+
+		if self.algorithm == 'zstd':
+			compressed = self._zstd.compress(payload)
+		else:
+			compressed = zlib.compress(payload, self.level)
+
+		if len(compressed) + 1 >= len(payload):
+			return payload
+		return bytes((_MARKERS[self.algorithm],)) + compressed
+
+
+def decompress(data, max_size=MAX_FRAME_SIZE):
+	"""Decompress a received message, the messages that are not compressed are returned as they are
+
+	:param data: the payload of a frame
+	:type data: bytes
+	:param max_size: maximum size of the decompressed message, defaults to the maximum frame size
+	:type max_size: int, optional
+
+	:rtype: bytes
+	:raises ValueError: if the message can't be decompressed or is larger than `max_size`
+	"""
+	marker = data[0] if data else None
+	if marker == ZLIB:
+		decompressor = zlib.decompressobj()
+		try:
+			payload = decompressor.decompress(memoryview(data)[1:], max_size)
+		except zlib.error as e:
+			raise ValueError(f'invalid zlib message ({e})')
+		if decompressor.unconsumed_tail:
+			raise ValueError(f'compressed message larger than {max_size} bytes')
+		if not decompressor.eof:
+			raise ValueError('truncated zlib message')
+		return payload
+
+	if marker == ZSTD:
+		if zstandard is None:
+			raise ValueError('zstd message received, the zstandard package is not installed')
+		try:
+			# The compressor writes the size of the message, it is checked before decompressing
+			return zstandard.ZstdDecompressor().decompress(data[1:], max_output_size=max_size)
+		except zstandard.ZstdError as e:
+			raise ValueError(f'invalid zstd message ({e})')
+
+	return data
+
+
+def negotiate(compressions):
+	"""The algorithm to compress the messages with, given the algorithms advertised by the peer
+
+	:param compressions: the algorithms of the peer *(None for a peer that does not advertise any)*
+	:type compressions: list or None
+
+	:returns: the algorithm or None if no algorithm is shared
+	:rtype: str or None
+	"""
+	for algorithm in COMPRESSIONS:
+		if algorithm in (compressions or ()):
+			return algorithm
+	return None
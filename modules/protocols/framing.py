@@ -0,0 +1,90 @@
+"""Length-prefixed framing of the messages exchanged between the nodes
+
+Every message is sent as a frame: its length on 4 bytes *(big endian)* followed by its bytes.
+The receiving side appends the TCP segments to one buffer and cuts the complete frames out of it,
+a message split over several segments *(a long chain)* is only handled once it is complete.
+"""
+import struct
+
+_LENGTH = struct.Struct('>I')
+
+# Frames longer than this are refused, the connection is dropped
+MAX_FRAME_SIZE = 64 * 1024 * 1024
+
+
+class FrameTooLarge(ValueError):
+	"""Raised when a frame is longer than the maximum frame size"""
+
+
+def encode_frame(payload):
+	"""Prefix a message with its length
+
+	:param payload: the message
+	:type payload: bytes
+
+	:rtype: bytes
+	"""
+	return _LENGTH.pack(len(payload)) + payload
+
+
+class FrameDecoder:
+	"""Cut the frames out of a stream of bytes
+
+	The received bytes are appended to one buffer, the frames are sliced out of it with a
+	memoryview and the consumed bytes are dropped once they make up half of the buffer.
+
+	:Attributes:
+
+		:attr max_frame_size: the longest frame accepted
+		:type max_frame_size: int
+
+	:Methods:
+
+		:meth feed: Add received bytes, returns the complete frames
+	"""
+
+	def __init__(self, max_frame_size=MAX_FRAME_SIZE):
+		self.max_frame_size = max_frame_size
+		self._buffer = bytearray()
+		self._offset = 0
+
+	def __len__(self):
+		"""Number of bytes received but not returned yet"""
+		return len(self._buffer) - self._offset
+
+	def feed(self, data):
+		"""Add received bytes
+
+		:param data: a segment of the stream
+		:type data: bytes
+
+		:returns: the payloads of the frames completed by `data`
+		:rtype: list of bytes
+
+		:raises FrameTooLarge: if a frame is longer than `max_frame_size`
+		"""
+		buffer = self._buffer
+		buffer += data
+
+		frames = []
+		with memoryview(buffer) as view:
+			while len(buffer) - self._offset >= _LENGTH.size:
+				length, = _LENGTH.unpack_from(buffer, self._offset)
+				if length > self.max_frame_size:
+					raise FrameTooLarge(f'frame of {length} bytes, the maximum is {self.max_frame_size}')
+
+				start = self._offset + _LENGTH.size
+				if len(buffer) - start < length:
+					break
+				frames.append(bytes(view[start:start + length]))
+				self._offset = start + length
+
+		# Drop the consumed bytes when they are not worth keeping
+		if self._offset == len(buffer):
+			buffer.clear()
+			self._offset = 0
+		elif self._offset > len(buffer) // 2:
+			del buffer[:self._offset]
+			self._offset = 0
+
+		return frames
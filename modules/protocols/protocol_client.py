@@ -10,14 +10,17 @@ sys.path.insert(0, '..')
 
 from modules.blockchain.transaction import Transaction
 from modules.blockchain.book import Book 
+from modules.protocols.codec import CODECS, decode_message, encode_message
+from modules.protocols.compression import Compressor, decompress
+from modules.protocols.framing import FrameDecoder, FrameTooLarge, encode_frame
+from modules.protocols.router import Router
+from modules.logs import TRACE, fields, get_logger
 
+from collections import Counter
 from time import time
 from operator import xor
 import json
-
-# Debug libs
-from pprint import pprint as pp
-from termcolor import colored
+import logging
 
 
 class ClientProtocol(Protocol):
@@ -25,57 +28,131 @@ class ClientProtocol(Protocol):
 		the Client protocol
 		
 		:Attributes:
-			:attr debug: debug mode, *default to **True***
+			:attr debug: debug mode, the debug records of the instance are only logged if True, *default to **True***
 			:type debug: bool
+			:attr log: the logger of the protocol *(shared by the instances of the class)*
+			:type log: Logger
+			:attr codec: the codec of the sent messages, 'json' until the peer advertises 'binary'
+			:type codec: str
+			:attr compressor: compresses the large sent messages, no compression until the peer advertises an algorithm
+			:type compressor: Compressor *modules.protocols.compression*
+			:attr traffic: bytes sent and received, before *(`*_uncompressed`)* and after compression
+			:type traffic: Counter
+			:attr router: the handler of each message type, measured per type *(shared by the instances of the class)*
+			:type router: Router *modules.protocols.router*
 		:Methods:
 			:Twisted specific:
 				:meth connectionMade: triggered when the connection is made
 				:meth connectionLost: triggered when the connection is lost
-				:meth dataReceived: every time a data is received, this method is called
+				:meth dataReceived: every time a data is received, this method is called *(cuts the frames out of it)*
+			:Messages:
+				:meth messageReceived: called for every complete message *(dispatched by the router)*
+				:meth send_message: Send a message *(a dict)* in a frame
+				:meth send_frame: Send an already serialized message in a frame
 			:Handling Initialisation:
 				:meth send_ping: Send a ping request
 				:meth send_pong: Respond with a pong
+				:meth handel_ping: called when a ping is received
 				:meth handel_pong: called when a pong is received
 				:meth send_handshake: Send all the informations about the node
+				:meth receive_handshake: called when a handshake is received, only the first one is handled
+				:meth handel_handshake: handles the handshake of the remote node
 			:Getting new peers:
 				:meth handel_post_peers: called when new peers are received
 			:Starting a client instance:
 				:meth connect_to: This method connect to a node *'as a client'*
 	"""
-	def __init__(self):
+	log = get_logger('client')
+
+	router = Router({
+		'handshake': 'receive_handshake',
+		'ping': 'handel_ping',
+		'pong': 'handel_pong',
+		'post_peers': 'handel_post_peers',
+		'transaction_done': lambda protocol, message: protocol.handel_done_transaction(),
+	}, name='client')
+
+	def __init__(self, debug=True):
 		Protocol.__init__(self)
-		self.debug = True
+		self.state = 'waiting'
+		self.remote_nodeid = None
+		self.debug = debug
+		self.codec = 'json'
+		self.compressor = Compressor()
+		self.traffic = Counter()
+		# Receive buffer of the length-prefixed frames
+		self._decoder = FrameDecoder()
 
 	def connectionMade(self):
-		self._debug(f'Connection Made with {self.transport.getPeer()}')
+		self.log.info('Connection Made with %s', self.transport.getPeer())
 
 
 	def connectionLost(self, reason):
-		self._debug(f'Connection Lost')
+		self.log.info('Connection Lost')
 
 
 	def dataReceived(self, data):
-		self._debug(f'---------------Received Data---------------')
-
-		for line in data.decode('utf-8').splitlines():
-			line = line.strip()
-			current_data = json.loads(line)
-			info_type = current_data['information_type']
-			self._debug(current_data)
-
-			if info_type == 'handshake':
-				self.state = 'Active'
-			
-			elif info_type == 'ping':
-				self.send_pong()
-			elif info_type == 'pong':
-				self.handel_pong(line)
-			
-			elif info_type == 'post_peers':
-				self.handel_post_peers(line)
-
-			elif info_type == 'transaction_done':
-				self.handel_done_transaction()
+		"""Cuts the complete frames out of the received bytes and handles their message
+
+		A message split over several segments is handled once all its bytes are received,
+		the connection is dropped if a frame is larger than the maximum frame size.
+		A message whose handler fails is logged and dropped, the next frames are still handled
+		"""
+		try:
+			frames = self._decoder.feed(data)
+		except FrameTooLarge as e:
+			self.log.warning('%s :: Dropping the connection', e, extra=fields(peer=self.remote_nodeid))
+			self.transport.loseConnection()
+			return
+
+		for frame in frames:
+			# The messages are json or binary, compressed or not, whatever the settings of the sender
+			try:
+				payload = decompress(frame)
+				message = decode_message(payload)
+			except ValueError as e:
+				self.log.warning('Invalid message dropped :: %s', e, extra=fields(peer=self.remote_nodeid))
+				continue
+			self.traffic['bytes_received'] += len(frame)
+			self.traffic['bytes_received_uncompressed'] += len(payload)
+			try:
+				self.messageReceived(message, len(frame))
+			except Exception:
+				self.log.exception('Failed to handle a %s message', message.get('information_type'),
+								   extra=fields(peer=self.remote_nodeid))
+
+	def messageReceived(self, message, size=0):
+		"""called for every message received, the router calls the handler of its type
+
+		:param message: the message *{'information_type': ..., ...}*
+		:type message: dict
+		:param size: size of the frame of the message, defaults to 0
+		:type size: int, optional
+		"""
+		# The fields are only built if the record is logged, the whole message only at the TRACE level
+		if self.debug and self.log.isEnabledFor(logging.DEBUG):
+			info_type = message.get('information_type')
+			self.log.debug('received', extra=fields(info_type=info_type, size=size, peer=self.remote_nodeid))
+			self.log.log(TRACE, '%s', message, extra=fields(info_type=info_type))
+		return self.router.dispatch(self, message, size)
+
+	def send_message(self, message):
+		"""Send a message to the connected node
+
+		:param message: the message *{'information_type': ..., ...}*
+		:type message: dict
+		"""
+		self.send_frame(encode_message(message, self.codec))
+
+	def send_frame(self, payload):
+		"""Send an already serialized message *(json or binary bytes)* to the connected node
+
+		The message is compressed if it is larger than the threshold of the compressor
+		"""
+		frame = self.compressor.compress(payload)
+		self.traffic['bytes_sent'] += len(frame)
+		self.traffic['bytes_sent_uncompressed'] += len(payload)
+		self.transport.write(encode_frame(frame))
 
 	# Send ping to the connected node
 	def send_ping(self):
@@ -84,9 +161,9 @@ class ClientProtocol(Protocol):
 		:var ping_json: stores the ping request which will be sent
 		:type ping_json: json
 		"""
-		ping_json = json.dumps({'information_type': 'ping'})
-		self._debug(f'Pinging {self.remote_nodeid}')
-		self.transport.write((ping_json + '\n').encode())
+		ping_json = {'information_type': 'ping'}
+		self._debug('Pinging %s', self.remote_nodeid)
+		self.send_message(ping_json)
 
 	# Send pong to the connected node
 	def send_pong(self):
@@ -95,13 +172,16 @@ class ClientProtocol(Protocol):
 		:var ping_json: stores the pong request which will be sent
 		:type ping_json: json
 		"""
-		pong_json = json.dumps({'information_type': 'pong'})
-		self._debug(f'Ponging {self.remote_nodeid}')
-		self.transport.write((pong_json + '\n').encode())
+		pong_json = {'information_type': 'pong'}
+		self._debug('Ponging %s', self.remote_nodeid)
+		self.send_message(pong_json)
+
 
+	def handel_ping(self, ping):
+		self.send_pong()
 
 	def handel_pong(self, pong):
-		self._debug(f'Node {self.remote_nodeid} still active ::{pong}')
+		self._debug('Node %s still active', self.remote_nodeid)
 
 
 	def send_handshake(self):
@@ -112,20 +192,34 @@ class ClientProtocol(Protocol):
 			* id 
 			* ip of the client
 			* port of the client
+			* codecs the client can decode
 		:type hs: json
 		"""
-		self._debug(f'Sending handshake {self.transport.getPeer()}')
-		hs = json.dumps({
+		self._debug('Sending handshake %s', self.transport.getPeer())
+		hs = {
 						'information_type': 'handshake',
 						'nodeid': 'client',
 						'my_ip': '',
-						'my_port': ''
-						})
-		self.transport.write((hs+'\n').encode())
+						'my_port': '',
+						'codecs': list(CODECS)
+						}
+		self.send_message(hs)
+
+	def receive_handshake(self, hs):
+		"""Handles the first handshake received, the connection is then active
+
+		:param hs: handshake
+		:type hs: dict
+		"""
+		if self.state != 'Active':
+			self.handel_handshake(hs)
+			self.state = 'Active'
+
+	def handel_handshake(self, hs):
+		pass
 
 	def handel_post_peers(self, peers):
 		self._debug(':: Post peers Received')
-		peers = json.loads(peers)
 		number_queue = peers['number_queue']
 		self.remote_nodeid = peers['nodeid']
 
@@ -133,7 +227,7 @@ class ClientProtocol(Protocol):
 			peer = peer.split(':')
 			ip = peer[1]
 			port = peer[2]
-			print(ip,port)
+			self.log.info('Connecting to %s:%s', ip, port)
 			status = self.connect_to(ip,port)
 			if status:
 				break
@@ -149,13 +243,13 @@ class ClientProtocol(Protocol):
 		book = Book(title,author,date,genre)
 		trans = Transaction(sender,None,book)
 		try:
-			byte_trans = json.dumps({'information_type':'post_transaction','data':trans.to_json()})
-			self.transport.write((byte_trans+'\n').encode())
+			byte_trans = {'information_type':'post_transaction','data':trans.to_json()}
+			self.send_message(byte_trans)
 
 		except Exception as e:
-			self._debug('Exception occurred (dumping and sending the data)')
+			self.log.exception('Exception occurred (dumping and sending the data)')
 		else:
-			self._debug(':: Transaction sent ::')
+			self.log.info(':: Transaction sent ::')
 
 	def handel_done_transaction(self):
 		self.transport.loseConnection()
@@ -169,17 +263,13 @@ class ClientProtocol(Protocol):
 		except:
 			return False
 
-	def _debug(self, msg, pprint=False):
-		"""Prints helpful information in debug mode
-		
-		_debug print with different color depending on the node_type 
-		:param msg: the message to display
+	def _debug(self, msg, *args):
+		"""Logs helpful information in debug mode
+
+		The message is formatted lazily *(only if the record is written, by the background writer)*
+		:param msg: the message to log, with %-style placeholders
 		:type msg: string
-		:param pprint: prints a msg with a pprint *with indentation*, defaults to False
-		:type pprint: bool, optional
+		:param args: the values of the placeholders
 		"""
 		if self.debug:
-			if not pprint:
-				print(colored(msg,'blue'))
-			else:
-				pp(msg, indent=4, width=4)
\ No newline at end of file
+			self.log.debug(msg, *args)
@@ -2,24 +2,51 @@
 from twisted.internet.protocol import Protocol
 from twisted.internet.task import LoopingCall
 from twisted.internet.endpoints import TCP4ClientEndpoint, connectProtocol
-from twisted.internet import reactor
+from twisted.internet import defer, reactor
 
 # Import from standard modules
-from time import time
+from time import perf_counter, time
 from operator import xor
 import json
 
-# Debug libs
-from pprint import pprint as pp
-from termcolor import colored
-
 # Import from custom modules
 import sys
 sys.path.insert(0, '..')
 
 from modules.utils import max_pow_2
+from modules.blockchain.block import Block
+from modules.blockchain.blockchain import BlockChain, VERIFICATION_SECONDS
 from modules.blockchain.transaction import Transaction
+from modules.protocols.codec import CODECS, negotiate
+from modules.protocols import compression
+from modules.logs import fields, get_logger
 from modules.protocols.protocol_client import ClientProtocol
+from modules.protocols.streaming import ChainProducer
+
+# Maximum number of headers and of blocks sent in one message
+MAX_HEADERS = 2000
+MAX_BLOCKS = 500
+
+# Hashes remembered per peer as known by it, they are not announced to it again
+MAX_KNOWN_INVENTORY = 10000
+# Time *(seconds)* before an item asked for to a peer can be asked for to another one
+REQUEST_TIMEOUT = 10
+
+
+def tcp_connector(ip, port, protocol):
+	"""Connects `protocol` to a node over TCP *(the default connector of the factories)*
+
+	:param ip: ip address
+	:type ip: str
+	:param port: port number
+	:type port: int
+	:param protocol: the protocol of the connection
+	:type protocol: Protocol *twisted*
+
+	:returns: fires with the protocol once connected
+	:rtype: Deferred
+	"""
+	return connectProtocol(TCP4ClientEndpoint(reactor, ip, int(port)), protocol)
 
 
 class P2Protocol(ClientProtocol):
@@ -47,29 +74,80 @@ class P2Protocol(ClientProtocol):
 			:type loop_ping: LoopingCall *twisted.internet.task*
 			:attr last_ping: Last time the node sent a ping
 			:type last_ping: int
+			:attr sync: the blocks being downloaded from the peer, None when not synchronizing
+			:type sync: dict
+			:attr incoming: the blocks of the chain being streamed by the peer, None when no chain is streamed
+				*(at most the number of blocks announced by its `blockchain_start`)*
+			:type incoming: list
+			:attr known_inventory: the block and transaction hashes the peer is known to have *(oldest first)*
+			:type known_inventory: dict
 		:Methods:
 			:Twisted specific:
 				:meth connectionMade: triggered when the connection is made **Override from ClientProtocol**
+				:meth messageReceived: drops the relayed messages already seen **Override from ClientProtocol**
 				:meth connectionLost: triggered when the connection is lost **Override from ClientProtocol**
-				:meth dataReceived: every time a data is received, this method is called **Override from ClientProtocol**
 			:Handling Initialisation:
 				:meth handel_pong: called when a pong is received **Override from ClientProtocol**
 				:meth send_handshake: Send all the informations about the node **Override from ClientProtocol**
-				:meth handel_handshake: called when a handshake is received
+				:meth handel_handshake: called when the first handshake is received
 			:Getting new peers:
 				:meth handel_post_peers: called when new peers are received **Override from ClientProtocol**
 			:Sending/Posting/Handling the block-chain:
 				:meth send_get_blockchain: Sends a *"get block-chain request"* to receive the node's chain
-				:meth send_blockchain: Sends the local chain
+				:meth handel_get_blockchain: Streams the local chain
+				:meth send_blockchain: Streams the local chain *(back-pressured, see ChainProducer)*
 				:meth handel_blockchain: called whenever a block-chain is received
+				:meth handel_blockchain_start: Starts collecting a streamed chain
+				:meth handel_blockchain_blocks: Parses a chunk of a streamed chain
+				:meth handel_blockchain_end: Verifies and adopts the streamed chain
+				:meth verify_and_adopt: Verifies received blocks and switches the local chain to them if they have more work
+			:Header-first synchronization:
+				:meth send_get_headers: Sends the block locator of the local chain
+				:meth handel_get_headers: Sends the headers following the last block shared with the peer
+				:meth send_headers: Sends a range of headers
+				:meth handel_headers: Checks the received headers and requests the missing blocks
+				:meth send_get_blocks: Requests a range of blocks
+				:meth handel_get_blocks: Sends the requested range of blocks
+				:meth handel_blocks: Collects the requested blocks, the chain is verified once they are all received
+			:Inventory relay:
+				:meth send_inv: Announces blocks and transactions the peer does not know of
+				:meth handel_inv: Asks for the announced items missing from the node
+				:meth send_get_data: Asks for blocks and transactions
+				:meth handel_get_data: Sends the requested blocks and transactions
+				:meth handel_block: Verifies a block extending the local chain and adopts it
+				:meth handel_transactions: Verifies relayed transactions, adds them to the mempool and announces them
 			:Sending/Posting/Handling the transactions:
 				:meth send_transaction: Sends a transaction
-				:meth handel_transaction: called whenever a transaction is received
+				:meth handel_transaction: called whenever a transaction is received *(from a client)*
+				:meth send_transaction_done: Tells the client that its transaction has been handled
 			:Starting a client instance:
 				:meth connect_to: This method connect to a node *'as a client'*
-			:Debug Mode:
-				:meth _debug: Prints helpful information **Override from ClientProtocol**
 	"""
+	log = get_logger('node')
+
+	# Nodes only announce the chains they verified and adopted
+	router = ClientProtocol.router.extend({
+		'get_blockchain': 'handel_get_blockchain',
+		'post_blockchain': lambda protocol, message: protocol.handel_post_blockchain(message).addCallback(
+			lambda adopted: adopted[0] and protocol.factory.dispatch_tip(protocol)),
+		'blockchain_start': 'handel_blockchain_start',
+		'blockchain_blocks': 'handel_blockchain_blocks',
+		'blockchain_end': lambda protocol, message: protocol.handel_blockchain_end().addCallback(
+			lambda adopted: adopted[0] and protocol.factory.dispatch_tip(protocol)),
+		'get_headers': 'handel_get_headers',
+		'headers': 'handel_headers',
+		'get_blocks': 'handel_get_blocks',
+		'blocks': 'handel_blocks',
+		'inv': 'handel_inv',
+		'get_data': 'handel_get_data',
+		'block': lambda protocol, message: protocol.handel_block(message).addCallback(
+			lambda adopted: adopted[0] and protocol.factory.dispatch_tip(protocol)),
+		'transactions': 'handel_transactions',
+		'get_transaction': lambda protocol, message: None,
+		'post_transaction': 'handel_transaction',
+		'transaction_done': lambda protocol, message: None,
+	}, name='node')
+
 	def __init__(self, factory, node_type=1):
 		self.state = 'waiting'
 		self.factory = factory
@@ -83,62 +161,64 @@ class P2Protocol(ClientProtocol):
 		self.remote_nodeid = None
 		#Looping call to ping the connected nodes
 		self.loop_ping = LoopingCall(self.send_ping) 
+		self.loop_ping.clock = factory.clock
 		self.last_ping = None
 
-		ClientProtocol.__init__(self)
+		# Header-first synchronization with the connected node
+		self.sync = None
+		self._headers_requested = False
+		# Abandons the synchronization if the peer does not answer a request within `REQUEST_TIMEOUT`
+		self._sync_timeout = None
+
+		# Streamed chains *(sent and received)*, and the number of blocks announced for the received one
+		self.incoming = None
+		self._incoming_count = 0
+		self._producer = None
+		self._next_stream = None
+
+		# Inventory relay, used as an ordered set
+		self.known_inventory = {}
+
+		ClientProtocol.__init__(self, debug=factory.debug)
+		# The traffic of all the connections is counted by the factory
+		self.traffic = factory.traffic
 
 
+	def messageReceived(self, message, size=0):
+		"""Drops the relayed messages already seen before handling them *(see `modules.protocols.seen`)*
+
+		An announcement already seen still tells that the peer has its items, they can be asked for
+		to it if the peer they are asked to does not deliver them *(see `handel_inv`)*
+
+		*Override method from ClientProtocol*
+		"""
+		message_id = message.get('id')
+		if message_id is not None and self.factory.seen.check(message_id):
+			self.factory.dropped[message.get('information_type')] += 1
+			if message.get('information_type') == 'inv':
+				self.handel_inv(message, duplicate=True)
+			return None
+		return ClientProtocol.messageReceived(self, message, size)
+
 	def connectionMade(self):
-		self._debug(f'{ "<-" if self.node_type == 1 else "->" }Connection Made with {self.transport.getPeer()}')
+		self.log.info('%sConnection Made with %s', '<-' if self.node_type == 1 else '->', self.transport.getPeer())
 		self.my_ip = self.transport.getHost().host
 
 	def connectionLost(self, reason):
-		self._debug(f'Connection Lost with {self.remote_nodeid} {reason}')
+		self.log.info('Connection Lost with %s %s', self.remote_nodeid, reason.getErrorMessage())
+		self._answered()
 		if self.remote_nodeid in self.factory.known_peers:
 			self.factory.known_peers.pop(self.remote_nodeid)
 			if self.loop_ping.running == True:
 				self.loop_ping.stop()
 
 
-	def dataReceived(self, data):
-		self._debug(f'---------------Received Data---------------')
-		
-		for line in data.decode('utf-8').splitlines():
-			
-			line = line.strip()
-			current_data = json.loads(line)
-			self._debug(current_data, pprint=True)
-
-			info_type = current_data['information_type'] # Get the type of the request
-
-			if info_type == 'handshake' and self.state != 'Active':
-				self.handel_handshake(line)
-				self.state = 'Active'
-			
-			elif info_type == 'ping':
-				self.send_pong()
-			elif info_type == 'pong':
-				self.handel_pong(line)
-			
-			elif info_type == 'post_peers':
-				self.handel_post_peers(line)
-			
-			elif info_type == 'get_blockchain':
-				self.send_blockchain()
-				self.factory.dispatch_get_blockchain(self)
-
-			elif info_type == 'post_blockchain':
-				adopted = self.handel_post_blockchain()
-				# Nodes will only dispatch blockchain that are verified
-				if adopted[0] == True:
-					self.factory.dispatch_blockchain(self,adopted[1])
-			
-			elif info_type == 'get_transaction':
-				pass
-			elif info_type == 'post_transaction':
-				self.handel_transaction(line)
+	def handel_get_blockchain(self, request):
+		"""Streams the local chain to the node
 
-		self._debug(42*'^' + '\n\n\n\n')
+		The other peers are not asked for their chain, the new blocks are announced *(see `send_inv`)*
+		"""
+		self.send_blockchain()
 
 	# Handling Initialisation
 	def handel_pong(self, pong):
@@ -152,7 +232,7 @@ class P2Protocol(ClientProtocol):
 
 		*Override method from ClientProtocol*
 		"""
-		self._debug(f'Node {self.remote_nodeid} still active ::{pong}')
+		self._debug('Node %s still active', self.remote_nodeid)
 		self.last_ping = time()
 
 	def send_handshake(self):
@@ -163,33 +243,42 @@ class P2Protocol(ClientProtocol):
 			* nodeid
 			* ip of the node
 			* port of the node
+			* codecs the node can decode
+			* compression algorithms the node can decompress
 
 		:type hs: json
 		
 		*Override method from ClientProtocol*
 		"""
-		self._debug(f'Sending handshake {self.transport.getPeer()}')
-		hs = json.dumps({
+		self._debug('Sending handshake %s', self.transport.getPeer())
+		hs = {
 						'information_type': 'handshake',
 						'nodeid': self.nodeid,
 						'my_ip': self.my_ip,
-						'my_port': self.my_port
-						})
-		self.transport.write((hs+'\n').encode())	
+						'my_port': self.my_port,
+						'codecs': list(CODECS),
+						'compressions': list(compression.COMPRESSIONS)
+						}
+		self.send_message(hs)	
 
 	def handel_handshake(self, hs):
 		"""deals with what to do when a handshake is received
 
 		:param hs: handshake
-		:type hs: Json/dict
+		:type hs: dict
 		"""
 
-		hs = json.loads(hs)
 		# Get the remote node id (uuid) from handshake
 		self.remote_nodeid = hs['nodeid']
+		# Peers that do not advertise any codec only speak json
+		self.codec = negotiate(hs.get('codecs'))
+		# The large messages are compressed if both peers share an algorithm *(and the node compresses)*
+		algorithm = compression.negotiate(hs.get('compressions')) if self.factory.compression else None
+		self.compressor = compression.Compressor(algorithm, self.factory.compression_level,
+												 self.factory.compression_threshold)
 
 		if self.remote_nodeid == self.nodeid:
-			self._debug('Oups, Connected to myself')
+			self.log.info('Oups, Connected to myself')
 			self.transport.loseConnection()
 		else:
 			self.factory.known_peers[self.remote_nodeid] = self
@@ -215,11 +304,10 @@ class P2Protocol(ClientProtocol):
 		loop through the peers and connect to them by following the kademlia routing table
 
 		:param peers: list of new peers
-		:type peers: json/dict
+		:type peers: dict
 		
 		*@override from ClientProtocol*
 		"""
-		peers = json.loads(peers)
 		number_queue = peers['number_queue']
 		self.remote_nodeid = peers['nodeid']
 
@@ -230,7 +318,7 @@ class P2Protocol(ClientProtocol):
 			
 			# Creating A connection following Kademlia RT
 			if xor(int(number_queue),int(rank)) in max_pow_2(len(peers['known_peers'])+1):
-				self._debug('Found New Node :: Connecting')
+				self.log.info('Found New Node :: Connecting')
 				self.connect_to(ip,port)
 
 
@@ -238,50 +326,487 @@ class P2Protocol(ClientProtocol):
 	def send_get_blockchain(self):
 		"""The method that sends a request to get a chain"""
 
-		block_json = json.dumps({'information_type': 'get_blockchain'})
-		self._debug(f'Send get_blockchain request {self.remote_nodeid}')
-		self.transport.write((block_json + '\n').encode())
+		block_json = {'information_type': 'get_blockchain'}
+		self._debug('Send get_blockchain request %s', self.remote_nodeid)
+		self.send_message(block_json)
 
 	def send_blockchain(self, bc=None):
-		"""sends the local chain to the connected node
+		"""streams the local chain to the connected node
+
+		The chain is sent a chunk of blocks at a time, the next chunk is serialized when the
+		transport has sent the previous one *(see ChainProducer)*. A chain asked for during a
+		transfer is sent after it, only the last one asked for is kept.
 
-		:var serial_block: contains the local blockchain and information_type tag next to it
-		:serial_block: json
+		:param bc: the chain to send, defaults to None *(the local chain)*
+		:type bc: BlockChain, optional
+
+		:returns: fires when the transfer of this chain is over, None if it has been queued
+		:rtype: Deferred or None
 		"""
-		if bc is None:
-			blockchain = self.factory.blockchain.to_json()
-		else:
-			blockchain = bc.to_json()
+		if self._producer is not None:
+			self._next_stream = bc or self.factory.blockchain
+			return None
+
+		blockchain = bc or self.factory.blockchain
+		self._producer = ChainProducer(self.transport, blockchain.block_chain, store=self.factory.store,
+									   codec=self.codec, send_frame=self.send_frame)
+
+		def done(result):
+			self._producer = None
+			following, self._next_stream = self._next_stream, None
+			if result and following is not None:
+				self.send_blockchain(following)
+			return result
+
+		return self._producer.start().addCallback(done)
+
+	def handel_blockchain_start(self, start):
+		"""A peer starts streaming its chain
+
+		:param start: *{'information_type': 'blockchain_start', 'count': number of blocks}*
+		:type start: dict
+		"""
+		self.incoming = []
+		self._incoming_count = start['count']
+
+	def handel_blockchain_blocks(self, chunk):
+		"""Parses the blocks of a chunk of the streamed chain as they arrive
 
-		serial_block = json.dumps({
-									'information_type': 'post_blockchain',
-									'blockchain': blockchain
-								})
-		self.transport.write(serial_block)
+		A peer sending more blocks than it announced is disconnected
+
+		:param chunk: *{'information_type': 'blockchain_blocks', 'blocks': [...]}*
+		:type chunk: dict
+		"""
+		if self.incoming is None:
+			return
+		if len(self.incoming) + len(chunk['blocks']) > self._incoming_count:
+			self.log.warning('-> More blocks than the %d announced, dropping the connection', self._incoming_count,
+							 extra=fields(peer=self.remote_nodeid))
+			self.incoming = None
+			self.transport.loseConnection()
+			return
+		self.incoming.extend(Block.json_to_block(block) for block in chunk['blocks'])
+
+	def handel_blockchain_end(self):
+		"""The streamed chain is complete, its new blocks are verified and adopted if they have more work
+
+		A chain with fewer blocks than announced is incomplete, it is dropped
+
+		:returns: fires with the result of `verify_and_adopt`
+		:rtype: Deferred
+		"""
+		if self.incoming is None:
+			return defer.succeed((False, None))
+
+		blocks, self.incoming = self.incoming, None
+		if len(blocks) != self._incoming_count:
+			self.log.warning('-> %d blocks received out of the %d announced', len(blocks), self._incoming_count,
+							 extra=fields(peer=self.remote_nodeid))
+			return defer.succeed((False, None))
+		return self.verify_and_adopt(blocks)
 
 	def handel_post_blockchain(self, blockchain):
 		"""deals with what to do when a block-chain is received
 		
-		if the received blockchain is longer then we update the local one
+		if the received blockchain has more work then the local one switches to it, from the fork point.
+		Only the blocks the local tree does not have are verified *(see `verify_and_adopt`)*
+
+		:param blockchain: the new chain *{'information_type': 'post_blockchain', 'blockchain': {...}}*
+		:type blockchain: dict
+
+		:returns: fires with the result if the blockchain received is verified and adopted and the blockchain object
+		:return type: Deferred of a tuple of either (bool,BlockChain)-if adopted or (bool, None) otherwise
+		"""
+		blockchain = BlockChain.json_to_blockchain(blockchain['blockchain'])
+		return self.verify_and_adopt(blockchain.block_chain)
+
+	def verify_and_adopt(self, blocks):
+		"""Verifies received blocks and adds them to the tree of the local chain
 
-		:param blockchain: the new chain
-		:type blockchain: json/dict
+		The blocks already in the tree are skipped, the others are verified out of the reactor thread
+		*(the signatures are verified in batch)* from their parent in the tree. The local chain switches
+		to them if they end the branch with the most work, only the blocks after the fork point change.
 
-		:returns: result if the blockchain received is verified and the blockchain object
-		:return type: tuple of either (bool,BlockChain)-if verified or (bool, None) otherwise
+		:param blocks: the received blocks, each one following the previous one
+		:type blocks: list of Block
+
+		:returns: fires with (True, blockchain) if the local chain switched to the blocks, (False, None) otherwise
+		:rtype: Deferred
+		"""
+		local = self.factory.blockchain
+		tree = local.tree
+		known = 0
+		while known < len(blocks) and blocks[known].hash in tree:
+			known += 1
+		blocks = blocks[known:]
+
+		if not blocks:
+			self._debug('-> Updating Local Blockchain -> No new block')
+			return defer.succeed((False, None))
+		# The tree is only read here, on the reactor thread, the worker gets a plain list of blocks
+		segment = local.branch_segment(blocks)
+		if segment is None:
+			self._debug('-> Updating Local Blockchain -> The blocks do not follow a known block')
+			return defer.succeed((False, None))
+		start = perf_counter()
+
+		def verified(flags):
+			VERIFICATION_SECONDS.observe(perf_counter() - start)
+			if flags:
+				self.log.warning('-> Invalid blocks %s', flags, extra=fields(peer=self.remote_nodeid))
+				return (False, None)
+
+			fork = self.factory.adopt_blocks(blocks)
+			if fork is None:
+				self._debug('-> Updating Local Blockchain -> Local Blockchain has more work')
+				return (False, None)
+			self.log.info('-> Updating Local Blockchain from the block %d', fork, extra=fields(peer=self.remote_nodeid))
+			return (True, self.factory.blockchain)
+
+		trusted = blocks[0].previous_hash is not None
+		return self.factory.defer_to_thread(BlockChain.check_branch, segment, trusted,
+											self.factory.verifier).addCallback(verified)
+
+	# Header-first synchronization
+	def send_get_headers(self):
+		"""Asks the connected node for the headers following the last block both chains share"""
+		self._debug('Send get_headers request %s', self.remote_nodeid)
+		self._headers_requested = True
+		self._wait_answer()
+		get_headers = {
+								'information_type': 'get_headers',
+								'locator': self.factory.blockchain.block_locator()
+							}
+		self.send_message(get_headers)
+
+	def handel_get_headers(self, get_headers):
+		"""Sends the headers following the last block of the locator found in the local chain
+
+		:param get_headers: the request *{'information_type': 'get_headers', 'locator': [[height, hash], ...]}*
+		:type get_headers: dict
+		"""
+		blockchain = self.factory.blockchain
+		start = blockchain.find_fork(get_headers['locator'])
+		self.send_headers(start, blockchain.headers(start, start + MAX_HEADERS))
+
+	def send_headers(self, start, headers):
+		"""Sends a range of headers
+
+		:param start: the height of the first header
+		:type start: int
+		:param headers: the headers *see `Block.header_json`*
+		:type headers: list of dict
+		"""
+		headers_json = {
+								'information_type': 'headers',
+								'start': start,
+								'headers': headers,
+								'height': self.factory.blockchain.number_blocks()
+							}
+		self.send_message(headers_json)
+
+	def handel_headers(self, headers):
+		"""Checks the received headers and requests the blocks missing from the local chain
+
+		Nothing is requested when the peer's chain is not longer than the local one.
+
+		:param headers: *{'information_type': 'headers', 'start': height, 'headers': [...], 'height': height of the peer}*
+		:type headers: dict
 		"""
-		blockchain = json.loads(blockchain)['blockchain']
-		if BlockChain.verify_blockchain(blockchain):
-			if blockchain.number_blocks() > self.factory.blockchain.number_blocks():
-				self._debug('-> Updating Local Blockchain')
-				self.factory.blockchain = blockchain
+		requested, self._headers_requested = self._headers_requested, False
+		if requested:
+			self._answered()
+		local = self.factory.blockchain
+		height = headers['height']
+		start = headers['start']
+		received = [Block.json_to_block(header) for header in headers['headers']]
+
+		# Skip the headers of the blocks the local chain already has
+		known = 0
+		while (known < len(received) and start + known < local.number_blocks()
+			   and local.block_chain[start + known].hash == received[known].hash):
+			known += 1
+		start, received = start + known, received[known:]
+
+		if height <= local.number_blocks() or self.sync is not None:
+			return
+		if not received:
+			# All the headers were known, ask for the next ones
+			self.send_get_headers()
+			return
+
+		if start > local.number_blocks() or (start > 0 and local.block_chain[start - 1].hash != received[0].previous_hash):
+			# The announced block does not extend the local chain, find the common ancestor
+			if not requested:
+				self.send_get_headers()
+			return
+
+		# The first header is checked against the local block before it, only the hash of a genesis header
+		flags = BlockChain.check_blocks(local.block_chain[start - 1:start] + received, trusted=start > 0)
+		if start == 0 and received[0].hash != received[0].compute_hash():
+			flags.insert(0, "[!] Found difference between the hash and the calculated one in the block 0")
+		if flags:
+			self.log.warning('-> Invalid headers %s', flags, extra=fields(peer=self.remote_nodeid))
+			return
+
+		self.sync = {
+			'start': start,
+			'hashes': [header.hash for header in received],
+			'blocks': [],
+			'more': height > start + len(received)
+		}
+		self.send_get_blocks(start, min(start + MAX_BLOCKS, start + len(received)))
+
+	def _wait_answer(self):
+		self._answered()
+		self._sync_timeout = self.factory.clock.callLater(REQUEST_TIMEOUT, self._sync_timed_out)
+
+	def _answered(self):
+		if self._sync_timeout is not None and self._sync_timeout.active():
+			self._sync_timeout.cancel()
+		self._sync_timeout = None
+
+	def _sync_timed_out(self):
+		# The next announcement of the peer starts a new synchronization
+		self.log.warning('-> No answer to the synchronization requests', extra=fields(peer=self.remote_nodeid))
+		self._sync_timeout = None
+		self.sync = None
+		self._headers_requested = False
+
+	def send_get_blocks(self, start, stop):
+		"""Requests the blocks `block_chain[start:stop]`"""
+		self._debug('Send get_blocks request %s [%d:%d]', self.remote_nodeid, start, stop)
+		self._wait_answer()
+		get_blocks = {'information_type': 'get_blocks', 'from': start, 'to': stop}
+		self.send_message(get_blocks)
+
+	def handel_get_blocks(self, get_blocks):
+		"""Sends the requested blocks, at most `MAX_BLOCKS`
+
+		The json of the blocks is read from the store when the node has one *(and the peer speaks json)*.
+
+		:param get_blocks: *{'information_type': 'get_blocks', 'from': height, 'to': height}*
+		:type get_blocks: dict
+		"""
+		blockchain = self.factory.blockchain
+		start = max(get_blocks['from'], 0)
+		stop = min(get_blocks['to'], start + MAX_BLOCKS, blockchain.number_blocks())
+
+		store = self.factory.store
+		if self.codec == 'json' and store is not None and len(store) == blockchain.number_blocks():
+			blocks = b', '.join(store.read(height) for height in range(start, stop))
+			self.send_frame(b'{"information_type": "blocks", "from": %d, "blocks": [%s]}' % (start, blocks))
+			return
+
+		blocks_json = {
+								'information_type': 'blocks',
+								'from': start,
+								'blocks': [block.to_json() for block in blockchain.block_chain[start:stop]]
+							}
+		self.send_message(blocks_json)
+
+	def handel_blocks(self, blocks):
+		"""Collects the blocks of the synchronization, they must match the received headers
+
+		Once all the blocks are received, the local blocks before them and the new ones are
+		verified and adopted as one chain.
+
+		:param blocks: *{'information_type': 'blocks', 'from': height, 'blocks': [...]}*
+		:type blocks: dict
+
+		:returns: fires with the result of `verify_and_adopt` once all the blocks are received
+		:rtype: Deferred
+		"""
+		sync = self.sync
+		if sync is None:
+			return defer.succeed((False, None))
+		self._answered()
+
+		received = sync['blocks']
+		if blocks['from'] != sync['start'] + len(received):
+			self.sync = None
+			return defer.succeed((False, None))
+
+		for block in blocks['blocks']:
+			block = Block.json_to_block(block)
+			if len(received) == len(sync['hashes']) or block.hash != sync['hashes'][len(received)]:
+				self.log.warning('-> The blocks do not match the headers', extra=fields(peer=self.remote_nodeid))
+				self.sync = None
+				return defer.succeed((False, None))
+			received.append(block)
+
+		stop = sync['start'] + len(sync['hashes'])
+		following = sync['start'] + len(received)
+		if following < stop:
+			if blocks['blocks']:
+				self.send_get_blocks(following, min(following + MAX_BLOCKS, stop))
 			else:
-				self._debug('-> Updating Local Blockchain -> Local Blockchain longer')
-			
-			return (True, blockchain)
-		else:
-			return (False, None)
+				self.sync = None
+			return defer.succeed((False, None))
+
+		self.sync = None
+
+		def adopted(result):
+			if result[0]:
+				self.factory.dispatch_tip(self)
+			if sync['more']:
+				self.send_get_headers()
+			return result
+
+		return self.verify_and_adopt(received).addCallback(adopted)
+
+
+	# Inventory relay
+	def _remember(self, key):
+		known = self.known_inventory
+		known[key] = None
+		if len(known) > MAX_KNOWN_INVENTORY:
+			del known[next(iter(known))]
+
+	def send_inv(self, blocks=(), transactions=(), inv_id=None):
+		"""Announces blocks and transactions, the items the peer is known to have are left out
+
+		:param blocks: the [height, hash] of the blocks
+		:type blocks: list
+		:param transactions: the hashes of the transactions *(hex)*
+		:type transactions: list of str
+		:param inv_id: the id of the announcement *(see `modules.protocols.seen`)*, defaults to None
+		:type inv_id: str, optional
+		"""
+		blocks = [block for block in blocks if block[1] not in self.known_inventory]
+		transactions = [transaction for transaction in transactions if transaction not in self.known_inventory]
+		if not blocks and not transactions:
+			return
+		for key in [block[1] for block in blocks] + transactions:
+			self._remember(key)
+
+		inv = {'information_type': 'inv'}
+		if inv_id is not None:
+			inv['id'] = inv_id
+		if blocks:
+			inv['blocks'] = blocks
+		if transactions:
+			inv['transactions'] = transactions
+		self.send_message(inv)
+
+	def handel_inv(self, inv, duplicate=False):
+		"""Asks for the announced items the node does not have and that are not asked to another peer
+
+		A block following the local tip is asked for, the peer is asked for its headers when the
+		block is further away *(see `send_get_headers`)*, the blocks that can not make a longer chain are ignored.
+		The peer is recorded as a source of the items asked to another peer *(see `P2PFactory.add_source`)*.
+
+		:param inv: *{'information_type': 'inv', 'id': id, 'blocks': [[height, hash], ...], 'transactions': [hash, ...]}*
+		:type inv: dict
+		:param duplicate: the announcement has already been received from another peer, defaults to False
+			*(the headers are not asked for again)*
+		:type duplicate: bool, optional
+		"""
+		local = self.factory.blockchain
+		blocks, transactions = [], []
+
+		for height, block_hash in inv.get('blocks', ()):
+			self._remember(block_hash)
+			if height < local.number_blocks() or block_hash in local.tree:
+				continue
+			# Only the blocks asked for with get_data are recorded as requested, the headers are not tracked
+			if height == local.number_blocks():
+				if self.factory.request(block_hash):
+					blocks.append([height, block_hash])
+				else:
+					self.factory.add_source(block_hash, self, {'blocks': [[height, block_hash]]})
+			elif self.sync is None and not self._headers_requested and not duplicate:
+				self.send_get_headers()
+
+		mempool = local.open_transactions
+		for transaction_hash in inv.get('transactions', ()):
+			self._remember(transaction_hash)
+			if mempool.get(bytes.fromhex(transaction_hash)) is not None:
+				continue
+			if self.factory.request(transaction_hash):
+				transactions.append(transaction_hash)
+			else:
+				self.factory.add_source(transaction_hash, self, {'transactions': [transaction_hash]})
+
+		if blocks or transactions:
+			self.send_get_data(blocks, transactions)
 
+	def send_get_data(self, blocks=(), transactions=()):
+		"""Asks for blocks *([height, hash])* and transactions *(hashes)*"""
+		self._debug('Send get_data request %s', self.remote_nodeid)
+		get_data = {'information_type': 'get_data', 'blocks': list(blocks), 'transactions': list(transactions)}
+		self.send_message(get_data)
+
+	def handel_get_data(self, get_data):
+		"""Sends the requested blocks *(one message each)* and transactions *(in one message)*, the unknown ones are skipped
+
+		:param get_data: *{'information_type': 'get_data', 'blocks': [[height, hash], ...], 'transactions': [hash, ...]}*
+		:type get_data: dict
+		"""
+		blockchain = self.factory.blockchain
+		for height, block_hash in get_data.get('blocks', ()):
+			if 0 <= height < blockchain.number_blocks() and blockchain.block_chain[height].hash == block_hash:
+				self.send_message({'information_type': 'block', 'block': blockchain.block_chain[height].to_json()})
+
+		mempool = blockchain.open_transactions
+		transactions = [mempool.get(bytes.fromhex(transaction_hash)) for transaction_hash in get_data.get('transactions', ())]
+		transactions = [transaction.to_json() for transaction in transactions if transaction is not None]
+		if transactions:
+			self.send_message({'information_type': 'transactions', 'transactions': transactions})
+
+	def handel_block(self, message):
+		"""Verifies a block extending the local chain or one of its forks and adopts it
+
+		A block whose parent is not in the tree of the local chain comes from an unknown fork,
+		the peer is asked for its headers
+
+		:param message: *{'information_type': 'block', 'block': {...}}*
+		:type message: dict
+
+		:returns: fires with the result of `verify_and_adopt`
+		:rtype: Deferred
+		"""
+		block = Block.json_to_block(message['block'])
+		self.factory.requested.pop(block.hash, None)
+		self._remember(block.hash)
+
+		if block.previous_hash not in self.factory.blockchain.tree:
+			if self.sync is None and not self._headers_requested:
+				self.send_get_headers()
+			return defer.succeed((False, None))
+
+		return self.verify_and_adopt([block])
+
+	def handel_transactions(self, message):
+		"""Verifies relayed transactions, adds the valid ones to the mempool and announces them to the other peers
+
+		:param message: *{'information_type': 'transactions', 'transactions': [...]}*
+		:type message: dict
+
+		:returns: fires with the transactions added
+		:rtype: Deferred
+		"""
+		mempool = self.factory.blockchain.open_transactions
+		received = []
+		for transaction in message['transactions']:
+			transaction = Transaction.json_to_transaction(transaction)
+			key = transaction.hash_transaction().hex()
+			self.factory.requested.pop(key, None)
+			self._remember(key)
+			# Reward transactions are only created by the miners
+			if transaction.type != 2 and transaction not in mempool:
+				received.append(transaction)
+
+		def verified(results):
+			added = [transaction for transaction, valid in zip(received, results)
+					 if valid and self.factory.blockchain.create_append_transaction(transaction, verified=True)]
+			if added:
+				self.factory.dispatch_inv(self, transactions=[transaction.hash_transaction().hex() for transaction in added])
+			return added
+
+		if not received:
+			return defer.succeed([])
+		return self.factory.defer_to_thread(self.factory.verifier.verify_transactions, received).addCallback(verified)
 
 	# Sending/Posting/Handling the transactions
 	def send_transaction(self):
@@ -294,19 +819,45 @@ class P2Protocol(ClientProtocol):
 	def handel_transaction(self, new_transaction):
 		"""what to do when a transaction is received
 		
-		when receiving the transaction, we verify it and add it the block
+		when receiving the transaction, we verify it *(out of the reactor thread)*, add it the mempool
+		and announce it to the peers
 
 		:param new_transaction: the new transaction *{'information_type':'post_transaction','data':transaction}*
-		:type new_transaction: str
+		:type new_transaction: dict
+
+		:returns: fires with True if the transaction was added
+		:rtype: Deferred
 		"""
-		new_transaction = json.loads(new_transaction) # convert to json
-		
 		transaction = Transaction.json_to_transaction(new_transaction['data'])
-		self.factory.blockchain.create_append_transaction(transaction)
-		
+
+		def verified(results):
+			added = False
+			if not results[0]:
+				self.log.info('-> Transaction refused, invalid signature', extra=fields(info_type='post_transaction'))
+			elif not self.factory.blockchain.create_append_transaction(transaction, verified=True):
+				self.log.info('-> Transaction refused by the mempool', extra=fields(info_type='post_transaction'))
+			else:
+				added = True
+				self.factory.dispatch_inv(self, transactions=[transaction.hash_transaction().hex()])
+
+			self.send_transaction_done()
+			return added
+
+		# Duplicates are dropped before any verification
+		if transaction in self.factory.blockchain.open_transactions:
+			self._debug('-> Transaction already in the mempool')
+			self.send_transaction_done()
+			return defer.succeed(False)
+		# Reward transactions are only created by the miners
+		if transaction.type == 2:
+			return defer.succeed([False]).addCallback(verified)
+		return self.factory.defer_to_thread(self.factory.verifier.verify_transactions, [transaction]).addCallback(verified)
+
+	def send_transaction_done(self):
+		"""Tells the client that its transaction has been handled"""
 		self._debug('Sending \'transaction_done\'')
-		done_json = json.dumps({'information_type': 'transaction_done'})
-		self.transport.write((done_json + '\n').encode())
+		done_json = {'information_type': 'transaction_done'}
+		self.send_message(done_json)
 
 
 	# Starting a client instance
@@ -322,24 +873,8 @@ class P2Protocol(ClientProtocol):
 		"""
 		def to_do(protocol):
 			protocol.send_handshake()
-			time.time(60)
-			protocol.send_get_blockchain()
+			# Only the blocks missing from the local chain are downloaded
+			protocol.send_get_headers()
 
-		connection_point = TCP4ClientEndpoint(reactor, ip, int(port))
-		d = connectProtocol(connection_point, P2Protocol(self.factory,node_type=2))
+		d = self.factory.connector(ip, port, P2Protocol(self.factory,node_type=2))
 		d.addCallback(to_do)
-
-	def _debug(self, msg, pprint=False):
-		"""Prints helpful information in debug mode
-		
-		_debug print with different color depending on the node_type 
-		:param msg: the message to display
-		:type msg: string
-		:param pprint: prints a msg with a pprint *with indentation*, defaults to False
-		:type pprint: bool, optional
-		"""
-		if self.debug:
-			if not pprint:
-				print(colored(msg,'red' if self.node_type == 1 else 'blue'))
-			else:
-				pp(msg, indent=4, width=4)
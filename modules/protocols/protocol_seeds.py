@@ -3,6 +3,8 @@ from twisted.internet.task import LoopingCall
 from time import time
 import json
 
+from modules.logs import get_logger
+from modules.protocols.codec import negotiate
 from modules.protocols.protocol_client import ClientProtocol
 
 class SeedProtocol(ClientProtocol):
@@ -29,7 +31,6 @@ class SeedProtocol(ClientProtocol):
 	:Methods:
 		:Twisted specific:
 			:connectionLost: triggered when the connection is made -**Override from ClientProtocol**
-			:dataReceived: triggered when the connection is lost -**Override from ClientProtocol**
 		:Seed-Sever specific:
 			:format_peers: create a list of all the known nodes with their ip, port and number in the queue 
 				-*{'number_queue' : nodeis:ip:port}*
@@ -39,6 +40,14 @@ class SeedProtocol(ClientProtocol):
 			:handel_pong: called when a pong is received.
 			:handel_handshake: called when a handshake is received.
 	"""
+	log = get_logger('seeds')
+
+	router = ClientProtocol.router.extend({
+		'get_peers': lambda protocol, message: protocol.send_peers(),
+		'post_peers': lambda protocol, message: None,
+		'transaction_done': lambda protocol, message: None,
+	}, name='seeds')
+
 	def __init__(self, factory):
 		self.state = 'waiting'
 		self.factory = factory
@@ -50,12 +59,13 @@ class SeedProtocol(ClientProtocol):
 		
 		#Looping call to ping the connected nodes
 		self.loop_ping = LoopingCall(self.send_ping) 
+		self.loop_ping.clock = factory.clock
 		self.last_ping = None
 
-		ClientProtocol.__init__(self)
+		ClientProtocol.__init__(self, debug=factory.debug)
 
 	def connectionLost(self, reason):
-		self._debug(f'Connection Lost with {self.remote_nodeid}')
+		self.log.info('Connection Lost with %s', self.remote_nodeid)
 		
 		if self.remote_nodeid != 'client':
 			id_rank = self.remote_nodeid+':'+self.number_queue
@@ -64,28 +74,6 @@ class SeedProtocol(ClientProtocol):
 				self.loop_ping.stop()
 
 
-	def dataReceived(self, data):
-
-		self._debug(f'---------------Received Data---------------')
-		
-		for line in data.decode('utf-8').splitlines():
-			line = line.strip()
-			
-			current_data = json.loads(line)
-			info_type = current_data['information_type']
-			self._debug(current_data,True)
-
-			if info_type == 'handshake' and self.state != 'Active':
-				self.handel_handshake(line)
-				self.state = 'Active'
-			elif info_type == 'ping':
-				self.send_pong()
-			elif info_type == 'pong':
-				self.handel_pong(line)
-			elif info_type == 'get_peers':
-				self.send_peers()
-
-
 	def format_peers(self):
 		"""Create a formated dict, that holds all the information about the nodes *{'number_queue' : nodeis:ip:port}*
 		
@@ -104,9 +92,9 @@ class SeedProtocol(ClientProtocol):
 		
 		when a pong is received, we can be sure about the state of the connected node
 		:param pong: the pong msg
-		:type pong: str
+		:type pong: dict
 		"""
-		self._debug(f'Node {self.remote_nodeid} still active ::{pong}')
+		self._debug('Node %s still active', self.remote_nodeid)
 		self.last_ping = time()
 
 	def send_peers(self):
@@ -123,15 +111,15 @@ class SeedProtocol(ClientProtocol):
 		}
 		``
 		"""
-		self._debug(f'Sending Peers {self.transport.getPeer()}')
-		hs = json.dumps({
+		self._debug('Sending Peers %s', self.transport.getPeer())
+		hs = {
 						'information_type': 'post_peers',
 						'nodeid': 'SeedServer',
 						'number_queue': self.number_queue if self.remote_nodeid != 'client' else 'UNKNOWN',
 						'known_peers': self.format_peers(),
-						})
+						}
 
-		self.transport.write((hs+'\n').encode())
+		self.send_message(hs)
 
 	def handel_handshake(self, hs):
 		"""called when a handshake is received.
@@ -140,20 +128,20 @@ class SeedProtocol(ClientProtocol):
 		for a client: we simply send a list of all the nodes
 		for a node: first we add the node in the register and send back the list of the nodes 
 		:param hs: the handshake data
-		:type hs: string
+		:type hs: dict
 		"""
-		hs = json.loads(hs)
-		
 		#Extraction remote node information
 		self.remote_nodeid = hs['nodeid']
 		self.remote_ip = hs['my_ip']
 		self.remote_port = hs['my_port']
+		# Answer with the most compact codec both sides support
+		self.codec = negotiate(hs.get('codecs'))
 
 		if hs['nodeid'] == 'client':
 			self._debug('Received handshake from client :: Proceed sending nodes')
 			self.send_peers()
 		else:
-			self._debug('Received handshake from node :: Proceed by adding to the list')
+			self.log.info('Received handshake from node :: Proceed by adding to the list')
 			self._handel_node(hs)
 
 	def _handel_node(self, hs):
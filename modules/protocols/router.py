@@ -0,0 +1,160 @@
+"""Table-driven dispatch of the received messages
+
+Every protocol *(client, seed server, node)* has a router mapping the `information_type`
+of a message to its handler. The router measures the handlers: number of messages, size
+of the messages and time spent in the handler per message type. The handlers run on the
+reactor thread, a handler slower than the budget delays every other connection, it is
+logged as a warning.
+"""
+from time import perf_counter
+
+from modules.logs import fields, get_logger
+from modules.metrics import LATENCY_BUCKETS, REGISTRY, SIZE_BUCKETS, Histogram
+
+log = get_logger('router')
+
+# Time a handler can block the reactor *(seconds)* before being reported
+REACTOR_BUDGET = 0.05
+
+
+class MessageStats:
+	"""The measures of one message type
+
+	:Attributes:
+
+		:attr count: number of messages received
+		:type count: int
+
+		:attr bytes: histogram of the size of the messages *(bytes, before decompression)*
+		:type bytes: Histogram *modules.metrics*
+
+		:attr latency: histogram of the time spent in the handler *(seconds)*
+		:type latency: Histogram *modules.metrics*
+
+		:attr slow: number of messages whose handler exceeded the budget
+		:type slow: int
+	"""
+
+	def __init__(self, labels=None):
+		self.count = 0
+		self.bytes = Histogram(SIZE_BUCKETS)
+		self.latency = Histogram(LATENCY_BUCKETS)
+		self.slow = 0
+
+		# The counters are read when the metrics are scraped, the dispatch only increments them
+		if labels is not None:
+			REGISTRY.counter('openbook_messages_received_total', 'Messages received', lambda: self.count, **labels)
+			REGISTRY.counter('openbook_slow_handlers_total', 'Messages whose handler exceeded the reactor budget',
+							 lambda: self.slow, **labels)
+			REGISTRY.histogram('openbook_message_bytes', 'Size of the received messages', histogram=self.bytes, **labels)
+			REGISTRY.histogram('openbook_handler_seconds', 'Time spent handling the received messages',
+							   histogram=self.latency, **labels)
+
+	def snapshot(self):
+		return {'count': self.count, 'slow': self.slow,
+				'bytes': self.bytes.snapshot(), 'latency': self.latency.snapshot()}
+
+
+class Router:
+	"""Dispatch the messages to their handler
+
+	A handler is the name of a method of the protocol, called with the message, or a
+	function called with the protocol and the message *(to adapt the methods taking other
+	arguments)*. The names are looked up on the protocol so the subclasses can override them.
+
+	:Attributes:
+
+		:attr routes: the handler of each message type
+		:type routes: dict
+
+		:attr budget: time *(seconds)* a handler can take before being reported, defaults to `REACTOR_BUDGET`
+		:type budget: float
+
+		:attr name: the protocol of the router, its measures are exposed in `modules.metrics.REGISTRY`
+			with a ``protocol`` label, defaults to None *(not exposed)*
+		:type name: str
+
+		:attr stats: the measures of each message type received *(the types without handler are counted as 'unknown')*
+		:type stats: dict of MessageStats
+
+	:Methods:
+
+		:meth route: Register the handler of a message type
+
+		:meth extend: A new router with the routes of this one and more *(for the subclasses)*
+
+		:meth dispatch: Call the handler of a message and measure it
+
+		:meth snapshot: The measures of every message type
+	"""
+
+	def __init__(self, routes=None, budget=REACTOR_BUDGET, name=None):
+		self.routes = dict(routes or {})
+		self.budget = budget
+		self.name = name
+		self.stats = {}
+
+	def route(self, info_type, handler):
+		"""Register the handler of a message type
+
+		:param info_type: the `information_type` of the messages
+		:type info_type: str
+		:param handler: name of the method of the protocol or function *(protocol, message)*
+		:type handler: str or callable
+		"""
+		self.routes[info_type] = handler
+
+	def extend(self, routes, name=None):
+		"""A new router with the routes of this one, replaced or completed by `routes`
+
+		:param routes: the routes to add
+		:type routes: dict
+		:param name: the protocol of the new router, defaults to None
+		:type name: str, optional
+
+		:rtype: Router
+		"""
+		return Router({**self.routes, **routes}, self.budget, name)
+
+	def dispatch(self, protocol, message, size=0):
+		"""Call the handler of a message and measure it
+
+		:param protocol: the protocol which received the message
+		:type protocol: ClientProtocol *-modules.protocols.protocol_client*
+		:param message: the message *{'information_type': ..., ...}*
+		:type message: dict
+		:param size: size of the frame of the message, defaults to 0
+		:type size: int, optional
+
+		:returns: what the handler returned, None for the messages without handler
+		"""
+		info_type = message.get('information_type')
+		handler = self.routes.get(info_type)
+		key = info_type if handler is not None else 'unknown'
+		stats = self.stats.get(key)
+		if stats is None:
+			stats = self.stats[key] = MessageStats(None if self.name is None else {'protocol': self.name, 'type': key})
+		stats.count += 1
+		stats.bytes.observe(size)
+		if handler is None:
+			return None
+
+		start = perf_counter()
+		try:
+			if isinstance(handler, str):
+				return getattr(protocol, handler)(message)
+			return handler(protocol, message)
+		finally:
+			elapsed = perf_counter() - start
+			stats.latency.observe(elapsed)
+			if elapsed > self.budget:
+				stats.slow += 1
+				log.warning('%s handler blocked the reactor for %.1f ms (budget %.1f ms)', info_type,
+							elapsed * 1000, self.budget * 1000, extra=fields(info_type=info_type))
+
+	def snapshot(self):
+		"""The measures of every message type
+
+		:rtype: dict
+		"""
+		return {info_type: stats.snapshot() for info_type, stats in self.stats.items()}
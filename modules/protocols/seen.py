@@ -0,0 +1,102 @@
+"""Identifiers of the relayed messages recently seen by a node
+
+A relayed message *(an `inv` announcement)* carries an ``id`` derived from what it announces,
+so the same announcement relayed by several peers has the same id. The node drops the
+messages whose id it has already seen before handling them.
+"""
+import hashlib
+import json
+
+# Time *(seconds)* an id is remembered, and the number of buckets the window is split in
+SEEN_WINDOW = 600
+SEEN_BUCKETS = 10
+
+
+def message_id(*items):
+	"""The id of a relayed message, derived from what it announces
+
+	:param items: json values *(e.g. the announced block and transaction hashes)*
+
+	:returns: 8 bytes, in hex
+	:rtype: str
+	"""
+	return hashlib.sha256(json.dumps(items, separators=(',', ':')).encode()).hexdigest()[:16]
+
+
+class SeenFilter:
+	"""Time-bucketed set of the ids seen during the last `window` seconds
+
+	The ids are added to the newest bucket, the oldest bucket is dropped every
+	`window / buckets` seconds, so an id is remembered between `window * (buckets - 1) / buckets`
+	and `window` seconds and the memory used is bounded by the rate of the messages.
+
+	:Attributes:
+
+		:attr window: time *(seconds)* an id is remembered
+		:type window: float
+
+		:attr clock: gives the current time *(the reactor of the node)*
+		:type clock: IReactorTime *twisted*
+
+		:attr hits: number of ids found in the filter
+		:type hits: int
+
+	:Methods:
+
+		:meth check: Tell if an id has been seen and record it
+
+		:meth add: Record an id
+
+		:meth stats: The counters of the filter
+	"""
+
+	def __init__(self, clock, window=SEEN_WINDOW, buckets=SEEN_BUCKETS):
+		self.clock = clock
+		self.window = window
+		self.hits = 0
+		self._span = window / buckets
+		self._buckets = [set() for _ in range(buckets)]
+		self._start = clock.seconds()
+
+	def _rotate(self):
+		now = self.clock.seconds()
+		if now - self._start < self._span:
+			return
+		# Every bucket older than the window is replaced by an empty one
+		expired = min(int((now - self._start) // self._span), len(self._buckets))
+		self._buckets = self._buckets[expired:] + [set() for _ in range(expired)]
+		self._start += (now - self._start) // self._span * self._span
+
+	def check(self, key):
+		"""Tell if an id has been seen during the window, the id is recorded
+
+		:param key: the id
+		:type key: str
+
+		:returns: True if it was already seen
+		:rtype: bool
+		"""
+		self._rotate()
+		for bucket in self._buckets:
+			if key in bucket:
+				self.hits += 1
+				return True
+		self._buckets[-1].add(key)
+		return False
+
+	def add(self, key):
+		"""Record an id *(of a message sent by the node)*"""
+		self._rotate()
+		self._buckets[-1].add(key)
+
+	def __len__(self):
+		self._rotate()
+		return sum(map(len, self._buckets))
+
+	def stats(self):
+		"""The counters of the filter
+
+		:returns: hits and number of ids remembered
+		:rtype: dict
+		"""
+		return {'hits': self.hits, 'size': len(self)}
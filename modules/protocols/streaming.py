@@ -0,0 +1,102 @@
+from twisted.internet import defer
+from twisted.internet.interfaces import IPullProducer
+from zope.interface import implementer
+
+from modules.protocols.codec import encode_message
+from modules.protocols.framing import encode_frame
+
+
+@implementer(IPullProducer)
+class ChainProducer:
+	"""Pull producer streaming a chain to a peer, a few blocks per message
+
+	The transport asks for the next message once the previous ones have been sent,
+	so a slow peer slows the producer down instead of the whole chain being buffered.
+	The messages are sent in frames *(see `modules.protocols.framing`)*:
+
+		* ``{'information_type': 'blockchain_start', 'count': number of blocks}``
+		* ``{'information_type': 'blockchain_blocks', 'blocks': [...]}`` *(`chunk_size` blocks each)*
+		* ``{'information_type': 'blockchain_end'}``
+
+	:Attributes:
+
+		:attr transport: the transport of the peer
+		:type transport: ITransport *twisted*
+
+		:attr blocks: the blocks to send *(a copy of the list, the chain can change during the transfer)*
+		:type blocks: list of Block
+
+		:attr chunk_size: number of blocks per message
+		:type chunk_size: int
+
+		:attr store: the block store, its json is sent instead of serializing the blocks, defaults to None
+		:type store: BlockStore *-modules.blockchain.store*
+
+		:attr codec: the codec of the messages *see `modules.protocols.codec`*, defaults to 'json'
+		:type codec: str
+
+		:attr send_frame: sends a serialized message *(the protocol compresses and counts it)*, defaults to writing its frame on the transport
+		:type send_frame: callable
+
+		:attr deferred: fires with True when the whole chain has been written, False if the transfer was stopped
+		:type deferred: Deferred
+
+	:Methods:
+
+		:meth start: Register the producer on the transport
+
+		:meth resumeProducing: Write the next message *(called by the transport)*
+
+		:meth stopProducing: Stop the transfer *(the connection is lost)*
+	"""
+
+	def __init__(self, transport, blocks, chunk_size=64, store=None, codec='json', send_frame=None):
+		self.transport = transport
+		self.blocks = list(blocks)
+		self.chunk_size = chunk_size
+		self.store = store
+		self.codec = codec
+		self.send_frame = send_frame or (lambda payload: transport.write(encode_frame(payload)))
+		self.deferred = defer.Deferred()
+
+		self._position = None
+
+	def start(self):
+		"""Register the producer, the transport pulls the messages from it"""
+		self.transport.registerProducer(self, False)
+		return self.deferred
+
+	def _chunk(self, start, stop):
+		# The stored json is only used if the store holds the same blocks
+		if (self.codec == 'json' and self.store is not None
+				and self.store.height_of(self.blocks[stop - 1].hash) == stop - 1):
+			blocks = b', '.join(self.store.read(height) for height in range(start, stop))
+			return b'{"information_type": "blockchain_blocks", "blocks": [' + blocks + b']}'
+
+		return encode_message({
+								'information_type': 'blockchain_blocks',
+								'blocks': [block.to_json() for block in self.blocks[start:stop]]
+							}, self.codec)
+
+	def resumeProducing(self):
+		if self._position is None:
+			self._position = 0
+			message = encode_message({'information_type': 'blockchain_start', 'count': len(self.blocks)}, self.codec)
+			self.send_frame(message)
+
+		elif self._position < len(self.blocks):
+			stop = min(self._position + self.chunk_size, len(self.blocks))
+			self.send_frame(self._chunk(self._position, stop))
+			self._position = stop
+
+		else:
+			self.send_frame(encode_message({'information_type': 'blockchain_end'}, self.codec))
+			self._finish(True)
+
+	def stopProducing(self):
+		self._finish(False)
+
+	def _finish(self, result):
+		if not self.deferred.called:
+			self.transport.unregisterProducer()
+			self.deferred.callback(result)
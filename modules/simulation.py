@@ -0,0 +1,505 @@
+"""In-process network of nodes, to measure how the blocks and the transactions spread
+
+`Simulation` runs a seed server and N nodes *(`P2PFactory`)* in one process. The nodes exchange
+their messages over memory transports, a write reaches the peer after the latency of the link
+plus the time needed to send the bytes written before it *(bandwidth)*.
+
+The time is simulated: `Network` is the clock of the nodes and jumps from one event to the next,
+a network of 1,000 nodes runs in seconds whatever the latency. The handlers run synchronously
+*(the verifications and the mining too)* and their processing time is not added to the simulated
+time. The nodes share the process, so they share its signature cache and the message counters
+of the protocol routers.
+
+	simulation = Simulation(100)
+	simulation.start()
+	print(simulation.propagate_block())
+"""
+import heapq
+import itertools
+import math
+from collections import Counter
+from time import perf_counter
+
+from twisted.internet import defer, error
+from twisted.internet.address import IPv4Address
+from twisted.internet.base import DelayedCall
+from twisted.internet.interfaces import IConsumer, IReactorTime, ITransport
+from twisted.python.failure import Failure
+from zope.interface import implementer
+
+from modules.factories.factory_node import P2PFactory
+from modules.factories.factory_seeds import SeedFactory
+from modules.protocols.protocol_client import ClientProtocol
+from modules.protocols.protocol_node import P2Protocol
+from modules.protocols.protocol_seeds import SeedProtocol
+
+# One way latency *(seconds)* and bandwidth *(bytes per second)* of the links
+LATENCY = 0.05
+BANDWIDTH = 1250000
+
+# Addresses of the simulated seed server, client and nodes
+SEED = ('10.0.0.1', 5000)
+CLIENT = '10.0.0.2'
+PORT = 5001
+
+
+def run_inline(function, *args, **kwargs):
+	"""Run a function in the reactor thread *(replaces `threads.deferToThread` in the simulations)*
+
+	:returns: fires with the result of the function
+	:rtype: Deferred
+	"""
+	return defer.maybeDeferred(function, *args, **kwargs)
+
+
+def percentile(values, q):
+	"""Nearest-rank percentile of sorted values
+
+	:param values: the values, in increasing order
+	:type values: list
+	:param q: the percentile *(0.5 for the median)*
+	:type q: float
+
+	:returns: the value, None if there are none
+	"""
+	if not values:
+		return None
+	return values[min(len(values) - 1, max(0, math.ceil(q * len(values)) - 1))]
+
+
+@implementer(ITransport, IConsumer)
+class MemoryTransport:
+	"""One end of a connection of the simulated network
+
+	:Attributes:
+
+		:attr network: the network delivering the bytes
+		:type network: Network
+
+		:attr host: the address of this end
+		:type host: IPv4Address *twisted*
+
+		:attr peer: the address of the other end
+		:type peer: IPv4Address *twisted*
+
+		:attr other: the transport of the other end
+		:type other: MemoryTransport
+
+		:attr protocol: the protocol of this end
+		:type protocol: Protocol *twisted*
+
+		:attr connected: False once the connection is lost
+		:type connected: bool
+
+		:attr producer: the producer writing on the transport, None if there is none
+		:type producer: IPullProducer *twisted*
+
+	:Methods:
+
+		:meth write: Send bytes to the other end
+	"""
+
+	def __init__(self, network, host, peer):
+		self.network = network
+		self.host = host
+		self.peer = peer
+		self.other = None
+		self.protocol = None
+		self.connected = False
+		self.disconnecting = False
+		self.producer = None
+		# Time at which the link has sent the bytes written so far
+		self._free = 0
+
+	def connect(self, protocol):
+		self.protocol = protocol
+		self.connected = True
+		protocol.makeConnection(self)
+
+	def write(self, data):
+		if not self.connected or not data:
+			return
+		network = self.network
+		network.bytes += len(data)
+		now = network.seconds()
+		self._free = max(self._free, now) + (len(data) / network.bandwidth if network.bandwidth else 0)
+		network.schedule(self._free - now + network.latency, self.other._receive, data)
+
+	def writeSequence(self, data):
+		self.write(b''.join(data))
+
+	def _receive(self, data):
+		if self.connected:
+			self.protocol.dataReceived(data)
+			self.network.delivered(self.protocol)
+
+	def loseConnection(self):
+		# The bytes already written are delivered before the connection is closed
+		if not self.connected or self.disconnecting:
+			return
+		self.disconnecting = True
+		now = self.network.seconds()
+		self.network.schedule(max(self._free - now, 0) + self.network.latency, self._close)
+
+	abortConnection = loseConnection
+
+	def _close(self):
+		for transport in (self, self.other):
+			transport._lost(Failure(error.ConnectionDone()))
+
+	def _lost(self, reason):
+		if not self.connected:
+			return
+		self.connected = False
+		if self.producer is not None:
+			self.producer.stopProducing()
+		self.protocol.connectionLost(reason)
+
+	def getPeer(self):
+		return self.peer
+
+	def getHost(self):
+		return self.host
+
+	def registerProducer(self, producer, streaming):
+		# A pull producer writes the next message once the link has sent the previous ones
+		self.producer = producer
+		if not streaming:
+			self.network.schedule(0, self._pull, producer)
+
+	def unregisterProducer(self):
+		self.producer = None
+
+	def _pull(self, producer):
+		if self.producer is not producer or not self.connected:
+			return
+		producer.resumeProducing()
+		if self.producer is producer:
+			self.network.schedule(max(self._free - self.network.seconds(), 0), self._pull, producer)
+
+
+@implementer(IReactorTime)
+class Network:
+	"""Memory transports between the nodes, and their clock
+
+	The network is the clock of the factories *(pings)* and schedules the delivery of the bytes.
+	`run` jumps from one event to the next until all the bytes are delivered.
+
+	:Attributes:
+
+		:attr latency: one way latency of the links *(seconds)*
+		:type latency: float
+
+		:attr bandwidth: bytes per second of each link, None for no limit
+		:type bandwidth: int
+
+		:attr bytes: bytes written on the transports
+		:type bytes: int
+
+		:attr listeners: the factory listening on each (ip, port)
+		:type listeners: dict
+
+		:attr observers: functions called with the protocol after every delivery
+		:type observers: list of callable
+
+	:Methods:
+
+		:meth listen: Accept the connections to (ip, port) with a factory
+
+		:meth connector: The connector of the node at an ip *(see `P2PFactory.connector`)*
+
+		:meth connect: Connect a protocol to (ip, port)
+
+		:meth schedule: Schedule an event of the network *(`run` waits for it)*
+
+		:meth run: Run the events until the network is idle
+
+		:meth seconds, callLater, getDelayedCalls: the simulated clock *(IReactorTime)*
+	"""
+
+	def __init__(self, latency=LATENCY, bandwidth=BANDWIDTH):
+		self.latency = latency
+		self.bandwidth = bandwidth
+		self.bytes = 0
+		self.listeners = {}
+		self.observers = []
+
+		self._now = 0
+		self._calls = []
+		self._sequence = itertools.count()
+		self._pending = 0
+		self._ports = itertools.count(40000)
+
+	# The clock
+	def seconds(self):
+		return self._now
+
+	def callLater(self, delay, function, *args, **kw):
+		call = DelayedCall(self._now + delay, function, args, kw, lambda call: None, self._push, seconds=self.seconds)
+		self._push(call)
+		return call
+
+	def getDelayedCalls(self):
+		return list(dict.fromkeys(call for _, _, call in self._calls if call.active()))
+
+	def _push(self, call):
+		heapq.heappush(self._calls, (call.time, next(self._sequence), call))
+
+	def schedule(self, delay, function, *args):
+		"""Schedule an event of the network *(a delivery, a connection)*, `run` waits for it"""
+		self._pending += 1
+		return self.callLater(delay, self._event, function, args)
+
+	def _event(self, function, args):
+		self._pending -= 1
+		function(*args)
+
+	def run(self, until=None):
+		"""Run the events until the network is idle *(the pings are not waited for)*
+
+		:param until: also run the events scheduled until this time, defaults to None
+		:type until: float, optional
+
+		:returns: the simulated time
+		:rtype: float
+		"""
+		while self._calls and (self._pending or until is not None):
+			when, _, call = self._calls[0]
+			if until is not None and when > until and not self._pending:
+				break
+			heapq.heappop(self._calls)
+			# Cancelled, or moved by `reset`
+			if not call.active() or when != call.time:
+				continue
+			if call.delayed_time:
+				call.activate_delay()
+				self._push(call)
+				continue
+			self._now = max(self._now, when)
+			call.called = 1
+			call.func(*call.args, **call.kw)
+
+		if until is not None:
+			self._now = max(self._now, until)
+		return self._now
+
+	# The connections
+	def listen(self, ip, port, factory):
+		"""Accept the connections to (ip, port), their protocol is built by the factory"""
+		self.listeners[(ip, int(port))] = factory
+
+	def connector(self, ip):
+		"""The connector of the node at `ip`
+
+		:returns: a function (ip, port, protocol) connecting the protocol, see `connect`
+		:rtype: callable
+		"""
+		return lambda host, port, protocol: self.connect(ip, host, port, protocol)
+
+	def connect(self, source, ip, port, protocol):
+		"""Connect a protocol to the factory listening on (ip, port), after the latency of the link
+
+		:param source: the ip of the connecting node
+		:type source: str
+
+		:returns: fires with the protocol once connected *(ConnectionRefusedError if nothing listens)*
+		:rtype: Deferred
+		"""
+		d = defer.Deferred()
+		self.schedule(self.latency, self._connected, source, ip, int(port), protocol, d)
+		return d
+
+	def _connected(self, source, ip, port, protocol, d):
+		factory = self.listeners.get((ip, port))
+		if factory is None:
+			d.errback(error.ConnectionRefusedError(f'{ip}:{port}'))
+			return
+
+		client = MemoryTransport(self, IPv4Address('TCP', source, next(self._ports)), IPv4Address('TCP', ip, port))
+		server = MemoryTransport(self, client.peer, client.host)
+		client.other, server.other = server, client
+		server.connect(factory.buildProtocol(client.host))
+		client.connect(protocol)
+		d.callback(protocol)
+
+	def delivered(self, protocol):
+		for observer in self.observers:
+			observer(protocol)
+
+
+class Simulation:
+	"""A seed server and nodes on a simulated network
+
+	:Attributes:
+
+		:attr size: number of nodes started by `start`
+		:type size: int
+
+		:attr network: the transports and the clock
+		:type network: Network
+
+		:attr seed: the seed server
+		:type seed: SeedFactory *-modules.factories.factory_seeds*
+
+		:attr nodes: the nodes, in the order they joined the network
+		:type nodes: list of P2PFactory *-modules.factories.factory_node*
+
+		:attr options: the other arguments of the nodes *(see `P2PFactory`)*
+		:type options: dict
+
+	:Methods:
+
+		:meth add_node: Create a node, it joins the network through the seed server
+
+		:meth start: Start the nodes one after the other
+
+		:meth measure: Inject something and report how it spread
+
+		:meth propagate_block: Mine a block on a node and report how it spread
+
+		:meth send_transaction: Send a transaction to a node and report how it spread
+
+		:meth messages: Number of messages received, per type
+	"""
+
+	def __init__(self, size=10, latency=LATENCY, bandwidth=BANDWIDTH, **options):
+		self.size = size
+		self.options = options
+		self.network = Network(latency, bandwidth)
+		self.seed = SeedFactory(debug=False, clock=self.network)
+		self.network.listen(*SEED, self.seed)
+		self.nodes = []
+		self._addresses = {}
+
+	def add_node(self):
+		"""Create a node, it asks the seed server for peers and connects to them
+
+		:rtype: P2PFactory *-modules.factories.factory_node*
+		"""
+		index = len(self.nodes)
+		ip = f'10.1.{index // 256}.{index % 256}'
+		options = {'debug': False, 'verify_processes': 1, **self.options}
+		node = P2PFactory(PORT, seed=SEED, connector=self.network.connector(ip), clock=self.network,
+						  defer_to_thread=run_inline, **options)
+		# The genesis blocks are timestamped, the nodes start from the one of the first node as if they had synchronized
+		if self.nodes:
+			node.blockchain.block_chain = self.nodes[0].blockchain.block_chain[:1]
+		self.network.listen(ip, PORT, node)
+		self.nodes.append(node)
+		self._addresses[node] = ip
+		return node
+
+	def start(self):
+		"""Start the nodes one after the other, each one once the previous one has joined the network
+
+		:returns: the simulated time
+		:rtype: float
+		"""
+		while len(self.nodes) < self.size:
+			self.add_node()
+			self.network.run()
+		return self.network.seconds()
+
+	@staticmethod
+	def messages():
+		"""Number of messages received by the nodes, the seed server and the clients, per type
+
+		:rtype: Counter
+		"""
+		counts = Counter()
+		for router in (P2Protocol.router, SeedProtocol.router, ClientProtocol.router):
+			for info_type, stats in router.stats.items():
+				counts[info_type] += stats.count
+		return counts
+
+	def measure(self, inject, reached):
+		"""Inject something in the network and run it until it is idle
+
+		A node is reached at the end of the first delivery after which `reached` is True,
+		the latencies are counted from the injection.
+
+		:param inject: sends what is measured
+		:type inject: callable
+		:param reached: tells if a node got it
+		:type reached: callable *(P2PFactory) -> bool*
+
+		:returns: number of nodes and of nodes reached, latency percentiles of the nodes reached
+			*(p50, p90, p99 and max, seconds)*, duration until the network is idle, messages
+			handled per type, relayed messages dropped as duplicates, bytes sent and the time
+			taken by the simulation *(wall_seconds)*
+		:rtype: dict
+		"""
+		network = self.network
+		arrivals = {}
+
+		def observe(protocol):
+			node = protocol.factory
+			if node in self._addresses and node not in arrivals and reached(node):
+				arrivals[node] = network.seconds()
+
+		messages, sent = self.messages(), network.bytes
+		dropped = sum(sum(node.dropped.values()) for node in self.nodes)
+		start, wall = network.seconds(), perf_counter()
+		network.observers.append(observe)
+		try:
+			inject()
+			for node in self.nodes:
+				if reached(node):
+					arrivals[node] = start
+			network.run()
+		finally:
+			network.observers.remove(observe)
+
+		latencies = sorted(arrival - start for arrival in arrivals.values())
+		received = self.messages()
+		received.subtract(messages)
+		return {
+			'nodes': len(self.nodes),
+			'reached': len(latencies),
+			'p50': percentile(latencies, 0.5),
+			'p90': percentile(latencies, 0.9),
+			'p99': percentile(latencies, 0.99),
+			'max': latencies[-1] if latencies else None,
+			'duration': network.seconds() - start,
+			'messages': +received,
+			'dropped': sum(sum(node.dropped.values()) for node in self.nodes) - dropped,
+			'bytes': network.bytes - sent,
+			'wall_seconds': perf_counter() - wall,
+		}
+
+	def propagate_block(self, node=0, recipient='simulation'):
+		"""Mine a block on a node and report how it spread *(see `measure`)*
+
+		:param node: the index of the miner, defaults to 0
+		:type node: int, optional
+		"""
+		miner = self.nodes[node]
+		height = miner.blockchain.number_blocks()
+		mined = {}
+
+		def reached(node):
+			blocks = node.blockchain.block_chain
+			return 'hash' in mined and len(blocks) > height and blocks[height].hash == mined['hash']
+
+		def inject():
+			miner.mine(recipient).addCallback(lambda block: block and mined.update(hash=block.hash))
+
+		return self.measure(inject, reached)
+
+	def send_transaction(self, transaction, node=0):
+		"""Send a transaction to a node, as the client does, and report how it spread *(see `measure`)*
+
+		:param transaction: a signed transaction
+		:type transaction: Transaction *-modules.blockchain.transaction*
+		:param node: the index of the node receiving it, defaults to 0
+		:type node: int, optional
+		"""
+		ip = self._addresses[self.nodes[node]]
+		message = {'information_type': 'post_transaction', 'data': transaction.to_json()}
+
+		def inject():
+			client = ClientProtocol()
+			client.debug = False
+			self.network.connect(CLIENT, ip, PORT, client).addCallback(lambda protocol: protocol.send_message(message))
+
+		return self.measure(inject, lambda node: transaction in node.blockchain.open_transactions)
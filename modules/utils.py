@@ -1,6 +1,8 @@
 from uuid import uuid4
 import argparse
 
+from modules.logs import LEVELS
+
 """Funcion that generate a
 universally unique identifier"""
 uuid_generator = lambda: str(uuid4())
@@ -17,7 +19,8 @@ def max_pow_2(number_peers):
 def argparser(description):
 	"""Create a parser for the argument
 	
-	make a parser with the appropriate options *port number*, *debug mode* 
+	make a parser with the appropriate options *port number*, *debug mode*, *log level*, *log sampling*,
+	*metrics port*
 	
 	:param description: description of the script *example: node description*
 	:type description: str
@@ -28,5 +31,12 @@ def argparser(description):
 	parser = argparse.ArgumentParser(description=description)
 	parser.add_argument('-p', '--port', metavar='N', type=int, help='the port number', required=True)
 	parser.add_argument('-d', '--debug', help='Activate the debug mode aka verbose', action='store_true')
+	parser.add_argument('--log-level', choices=LEVELS, type=str.upper,
+						default=None, help='lowest level logged (DEBUG with --debug, INFO otherwise)')
+	parser.add_argument('--log-sample', metavar='TYPE=N', action='append', default=None,
+						help='log one out of N received messages of TYPE (ping=10, pong=10, post_transaction=100 by default)')
+	
+	parser.add_argument('--metrics-port', metavar='N', type=int, default=None,
+						help='expose the metrics on http://127.0.0.1:N/metrics (Prometheus text format)')
 	
 	return parser
@@ -1,21 +1,51 @@
 """Node script: Runs a ServerEndPoint to access the network
 """
 if __name__ == '__main__':
+	from modules.logs import setup_from_args
+	from modules.metrics import serve_metrics
 	from modules.utils import argparser
 	from modules.factories.factory_node import *
 
 	parser = argparser(description='Runs a ServerEndPoint to access the network')
+	parser.add_argument('-m', '--mining-processes', metavar='N', type=int, default=None,
+						help='mine on a pool of N processes')
+	parser.add_argument('-v', '--verify-processes', metavar='N', type=int, default=None,
+						help='verify the signatures on a pool of N processes (one per core by default)')
+	parser.add_argument('-c', '--signature-cache-size', metavar='N', type=int, default=None,
+						help='number of verified signatures kept in cache')
+	parser.add_argument('--datadir', metavar='DIR', default=None,
+						help='store the chain in DIR, the node restarts from it')
+	parser.add_argument('--compression-level', metavar='N', type=int, default=6,
+						help='compression level of the large messages (zlib 1-9, zstd 1-22)')
+	parser.add_argument('--compression-threshold', metavar='BYTES', type=int, default=1024,
+						help='messages smaller than BYTES are sent uncompressed')
+	parser.add_argument('--no-compression', action='store_true',
+						help='never compress the sent messages')
+	parser.add_argument('--handler-budget', metavar='MS', type=float, default=50,
+						help='report the message handlers blocking the reactor for more than MS milliseconds')
 	
 	arg = parser.parse_args()
 	port = int(arg.port)
+	setup_from_args(arg)
 
 	if arg.debug:
 		print(17 * '_' + 'Start' + 17 * '_')
 
 	endpoint = TCP4ServerEndpoint(reactor, port)
 
-	node_factory = P2PFactory(port)
+	P2Protocol.router.budget = arg.handler_budget / 1000
+
+	node_factory = P2PFactory(port, debug=arg.debug, mining_processes=arg.mining_processes,
+							  verify_processes=arg.verify_processes,
+							  signature_cache_size=arg.signature_cache_size,
+							  datadir=arg.datadir,
+							  compression=not arg.no_compression,
+							  compression_level=arg.compression_level,
+							  compression_threshold=arg.compression_threshold)
 	endpoint.listen(node_factory)
 
+	if arg.metrics_port is not None:
+		serve_metrics(arg.metrics_port)
+
 	reactor.run()
 
@@ -5,17 +5,24 @@
 
 if __name__ == '__main__':
 	from modules.factories.factory_seeds import *
+	from modules.logs import setup_from_args
+	from modules.metrics import serve_metrics
 	from modules.utils import argparser
 
 	parser = argparser(description='Seed Server script,Has the role of a "DNS" or "Track server",links new nodes to the network')
 	
 	arg = parser.parse_args()
 	port = int(arg.port)
+	setup_from_args(arg)
 	#port = 5989 # for the development
 	
 	if arg.debug:
 		print('[Seeds Server is Up]')
 	
 	endpoint = TCP4ServerEndpoint(reactor, port)
-	endpoint.listen(SeedFactory())
+	endpoint.listen(SeedFactory(debug=arg.debug))
+
+	if arg.metrics_port is not None:
+		serve_metrics(arg.metrics_port)
+
 	reactor.run()
@@ -122,21 +122,21 @@ class TestBlock(unittest.TestCase):
 
 	def test_hash_block(self):
 		self.assertEqual(self.block_1.hash_block(),
-						'02d72389b7366e51a4270cda1060554c9bde10538ae38c65d9b2f00e2a08b1f6')
+						'7129a595223246035bd65ec7dd65f8b62dcbc7a97ee70042ce1142e8fe6e8022')
 		self.assertEqual(self.block_2.hash_block(),
-						'9c5c13f5f5649f9056b4f6c82fa0b64759a50c05a581389db17201832bf6db4e')
+						'cb05345821c2c078cb783731e2d90bba6c11ef1df6ff1cf0f2ca0064e03e10b6')
 		self.assertEqual(self.block_3.hash_block(),
-						'4dd090f8c5ab15a626f3db2d23461988a10b9cdf3d96e71b4cc9510111bd4221')
+						'9d2ff0304c7b92efbc3097c2c1f184b97194dfa7a405949600f8cdcaa43d3333')
 		self.assertEqual(self.block_4.hash_block(),
-						'9109f2750130e7e5fafc19f12f57cfa07852e392e566e4f2e17d1e0ce2de7295')
+						'7e35c98b243937cffe2622a281edd15ebdab951025feaacaa9268de49d2ec9c9')
 		self.assertEqual(self.block_5.hash_block(),
-						'6bd746967f61871e934983f806bb1a24932b094fa2e2bd6dd05f4bbafdb20346')
+						'49b03453f349998367e8efa8004ad2e88406b040176f54338856be01eeb9c31d')
 		self.assertEqual(self.block_6.hash_block(),
-						'30199907b1885b8569a981f2361301f0eb0686b469f279121621012c6195d21a')
+						'fe5e3e2ec1e043f8ce0cad31d944673eae1ad54043af01b8aa80f04e78dfba16')
 		self.assertEqual(self.block_7.hash_block(),
-						'f5765a40ef87969bcec557812b8392746b5f77203a3ad1d7d639aa4d39724fa7')
+						'c35728a151b3e7640e8944f0c62b793fca98e47ec6453cef1521603d59b3b28e')
 		self.assertEqual(self.block_8.hash_block(),
-						'099773753a36cb773cb62f5990b6dd83d8212d07cbb01e10c2aae206cbe2e8f5')
+						'd80521bb82e8d94390ae58f27660ea48feae6d799f5720f597efbbe156d2be28')
 
 	def test_json_to_block(self):
 		block_3 = Block("49f68a5c8493ec2c0bf489821c21fc3b")
@@ -146,8 +146,59 @@ class TestBlock(unittest.TestCase):
 
 		self.assertEqual(new_block, block_3)
 
-		# verify if the transactions are of a list type
-		self.assertEqual(type(new_block.transactions), list)
+		# The transactions are kept in a tuple, they can't be changed in place
+		self.assertEqual(type(new_block.transactions), tuple)
+
+	def test_hash_cache(self):
+		block_hash = self.block_2.hash_block()
+		self.assertEqual(self.block_2.hash_block(), block_hash)
+
+		# Assigning a hashed field drops the cached hash
+		self.block_2.nonce += 1
+		self.assertNotEqual(self.block_2.hash_block(), block_hash)
+		self.block_2.nonce -= 1
+		self.assertEqual(self.block_2.hash_block(), block_hash)
+
+		self.block_2.transactions = self.block_2.transactions[:1]
+		self.assertNotEqual(self.block_2.hash_block(), block_hash)
+
+	def test_compute_hash(self):
+		self.assertEqual(self.block_2.compute_hash(), self.block_2.hash_block())
+		with self.assertRaises(AttributeError):
+			self.block_2.transactions.append(self.block_2.transactions[0])
+
+		# A transaction edited in place keeps the cached hash, not the computed one
+		self.block_2.transactions[0].book['title'] = 'The Selfish Gene'
+		self.assertEqual(self.block_2.hash_block(), self.block_2.hash)
+		self.assertNotEqual(self.block_2.compute_hash(), self.block_2.hash)
+
+	def test_eq(self):
+		self.assertEqual(self.block_2, Block.json_to_block(self.block_2.to_json()))
+		self.assertNotEqual(self.block_2, self.block_3)
+
+
+	def test_merkle_root(self):
+		self.assertEqual(self.block_2.merkle_root, self.block_3.merkle_root)
+		self.assertNotEqual(self.block_2.merkle_root, self.block_5.merkle_root)
+
+		block_hash = self.block_2.hash_block()
+		self.block_2.transactions = self.block_2.transactions[::-1]
+		self.assertNotEqual(self.block_2.hash_block(), block_hash)
+
+	def test_merkle_proof(self):
+		for index, transaction in enumerate(self.block_2.transactions):
+			proof = self.block_2.merkle_proof(index)
+			self.assertTrue(Block.verify_inclusion(transaction, proof, self.block_2.merkle_root))
+			self.assertFalse(Block.verify_inclusion(transaction, proof, self.block_5.merkle_root))
+
+	def test_header_json(self):
+		header = Block.json_to_block(self.block_2.header_json())
+		self.assertIsNone(header.transactions)
+		self.assertEqual(header.merkle_root, self.block_2.merkle_root)
+		# The header alone gives the hash of the block
+		self.assertEqual(header.hash_block(), self.block_2.hash_block())
+		self.assertEqual(header, self.block_2)
+
 
 
 
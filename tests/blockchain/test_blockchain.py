@@ -9,6 +9,7 @@ from modules.blockchain.blockchain import BlockChain
 from modules.blockchain.transaction import Transaction
 from modules.blockchain.book import Book
 from modules.blockchain.block import Block
+from modules.blockchain.verification import SignatureVerifier
 from fastecdsa.keys import import_key
 from fastecdsa.curve import secp256k1
 
@@ -130,9 +131,13 @@ class TestBlockchain(unittest.TestCase):
 
 
 	def test_proof_of_work(self):
-		with patch("modules.blockchain.blockchain.BlockChain.valid_proof", autospec=True) as mocked_valid_proof:
-			mocked_valid_proof = True
-			self.assertEqual(self.blockchain_0.proof_of_work(), 0)
+		last_hash = self.blockchain_1.block_chain[-1].hash
+		self.blockchain_1.open_transactions.append(self.transaction_1)
+
+		nonce = self.blockchain_1.proof_of_work()
+		self.assertEqual(self.blockchain_1.valid_proof(last_hash, nonce), True)
+		# proof_of_work returns the first valid nonce
+		self.assertEqual(any(self.blockchain_1.valid_proof(last_hash, n) for n in range(nonce)), False)
 
 
 	def test_create_append_transaction(self):
@@ -182,12 +187,38 @@ class TestBlockchain(unittest.TestCase):
 		self.assertEqual(self.blockchain_0.number_blocks(), 4)
 
 	def test_verify_transaction(self):
-		pass
+		self.assertEqual(self.blockchain_0.verify_transaction(self.transaction_1), True)
+		# Rewards are only created by mine_block
+		self.assertEqual(self.blockchain_0.verify_transaction(self.transaction_2), False)
+
+		self.transaction_1.book = dict(self.transaction_1.book, title='The Selfish Gene')
+		self.assertEqual(self.blockchain_0.verify_transaction(self.transaction_1), False)
+
+	def test_verify_blockchain_signatures(self):
+		block_0 = Block(None, [], index=1, nonce=208395)
+		block_1 = Block(block_0.hash, [self.transaction_1, self.transaction_2], index=2)
+		block_1.nonce = self.blockchain_0.proof_of_work([self.transaction_1], block_0.hash)
+		block_1.timestamp = block_1.date_time_now()
+		block_1.hash = block_1.hash_block()
+
+		self.blockchain_0.block_chain = [block_0, block_1]
+		self.blockchain_0.debug = False
+		self.assertEqual(BlockChain.verify_blockchain(self.blockchain_0), True)
+
+		# Signed by another key
+		forged = Transaction(self.public_key, None, Book("The Selfish Gene", "Richard Dawkins", "1976", "Science"), 42)
+		block_1.transactions = [self.transaction_1, forged]
+		block_1.hash = block_1.hash_block()
+		self.assertEqual(BlockChain.verify_blockchain(self.blockchain_0), False)
+
+		# The signatures of a trusted first block are not verified again
+		self.assertEqual(BlockChain.check_blocks([block_1]), ['[!] Found a transaction with an invalid signature in the block 0'])
+		self.assertEqual(BlockChain.check_blocks([block_1], trusted=True), [])
 
 	def test_verify_blockchain(self):
 		
 		block_0 = Block(None, [], index=1, nonce=208395)
-		block_1 = Block(block_0.hash, [], index=2)
+		block_1 = Block(block_0.hash, [], index=2, nonce=self.blockchain_0.proof_of_work([], block_0.hash))
 		
 		self.blockchain_0.block_chain = [block_0, block_1]
 		self.blockchain_0.debug = False
@@ -222,6 +253,61 @@ class TestBlockchain(unittest.TestCase):
 		block_1.transactions = [Transaction(sender=None, recipient='maistro', book=None, transaction_type=2)]
 		self.assertEqual(BlockChain.verify_blockchain(self.blockchain_0), False)
 
+	def test_verify_blockchain_headers(self):
+		block_0 = Block(None, [], index=1, nonce=208395)
+		block_1 = Block(block_0.hash, [self.transaction_1], index=2)
+		block_1.timestamp = block_1.date_time_now()
+		block_1.hash = block_1.hash_block()
+
+		# A light client only has the headers
+		headers = [Block.json_to_block(block.header_json()) for block in (block_0, block_1)]
+		self.assertEqual(BlockChain.verify_blockchain(headers, flag_list=True), True)
+
+		headers[1].merkle_root = block_0.merkle_root
+		self.assertEqual(BlockChain.verify_blockchain(headers, flag_list=True), False)
+
+	def test_verify_blockchain_parallel(self):
+		chain = BlockChain(debug=False)
+		for i in range(12):
+			chain.mine_block('zeddo' if i % 2 else 'maistro')
+		chain.block_chain[5].nonce += 1
+		chain.block_chain[9].previous_hash = chain.block_chain[7].hash
+
+		serial = BlockChain.check_blocks(chain.block_chain)
+		self.assertEqual(len(serial), 2)
+
+		# Ranges of 4 blocks checked on a pool, the flags are the same and in the same order
+		verifier = SignatureVerifier(processes=2)
+		try:
+			with patch('modules.blockchain.blockchain.PARALLEL_MIN_BLOCKS', 4):
+				self.assertEqual(BlockChain.check_blocks(chain.block_chain, verifier=verifier, parallel=True), serial)
+				self.assertEqual(BlockChain.check_blocks(chain.block_chain, start=6, verifier=verifier, parallel=True),
+								 BlockChain.check_blocks(chain.block_chain, start=6))
+		finally:
+			verifier.close()
+
+	def test_block_locator(self):
+		chain = BlockChain(debug=False)
+		for i in range(19):
+			chain.mine_block('zeddo')
+
+		locator = chain.block_locator()
+		self.assertEqual([height for height, _ in locator], [19, 18, 17, 16, 15, 14, 13, 12, 11, 10, 8, 4, 0])
+		self.assertEqual(locator[-1][1], chain.block_chain[0].hash)
+		self.assertEqual(chain.find_fork(locator), 20)
+
+		# The peer forked after the block 9 and mined 5 blocks
+		other = chain.fork_chain()
+		other.block_chain = other.block_chain[:10]
+		for i in range(5):
+			other.mine_block('maistro')
+		self.assertEqual(chain.find_fork(other.block_locator()), 10)
+		self.assertEqual(chain.find_fork([[3, 'unknown']]), 0)
+
+		headers = chain.headers(10, 12)
+		self.assertEqual(headers, [chain.block_chain[10].header_json(), chain.block_chain[11].header_json()])
+		self.assertEqual(Block.json_to_block(headers[0]).hash_block(), chain.block_chain[10].hash)
+
 	def test_fork_chain(self):
 		chain = BlockChain()
 		chain.block_chain = [self.block_0, self.block_1, self.block_2]
@@ -236,6 +322,44 @@ class TestBlockchain(unittest.TestCase):
 		with blockchain_restore(chain, [self.block_1, self.block_2], attr='block_chain') as tmp_chain:
 			self.assertEqual(tmp_chain == copy_chain, True)
 
+	def test_fork_chain_shares_blocks(self):
+		chain = BlockChain(debug=False)
+		for miner in ('zeddo', 'maistro', 'zeddo'):
+			chain.mine_block(miner)
+		chain.create_append_transaction(self.transaction_1)
+
+		fork = chain.fork_chain()
+		self.assertIs(fork.block_chain[2], chain.block_chain[2])
+		self.assertIsNot(fork.open_transactions, chain.open_transactions)
+
+		# Mining on the fork changes neither the chain nor its mempool
+		fork.mine_block('fork')
+		self.assertEqual(chain.number_blocks(), 4)
+		self.assertEqual(len(chain.open_transactions), 1)
+		self.assertEqual(len(fork.open_transactions), 0)
+		self.assertEqual(fork.block_chain[:4], chain.block_chain)
+
+	def test_valid_prefix(self):
+		chain = BlockChain(debug=False)
+		chain.create_append_transaction(self.transaction_1)
+		for miner in ('zeddo', 'maistro', 'zeddo'):
+			chain.mine_block(miner)
+		blocks = chain.block_chain
+		self.assertTrue(all(BlockChain.valid_block_proof(block) for block in blocks[1:]))
+		self.assertEqual(BlockChain.valid_prefix(blocks), 4)
+		self.assertEqual(BlockChain.valid_prefix([]), 0)
+
+		# A nonce that does not solve the proof of work, the hash of the block matches it
+		nonce = blocks[2].nonce + 1
+		while BlockChain.valid_block_proof(Block(blocks[1].hash, blocks[2].transactions, index=2, nonce=nonce)):
+			nonce += 1
+		forged = Block(blocks[1].hash, blocks[2].transactions, index=2, nonce=nonce)
+		self.assertEqual(BlockChain.valid_prefix(blocks[:2] + [forged]), 2)
+		# A block that does not follow the previous one
+		self.assertEqual(BlockChain.valid_prefix(blocks[:2] + blocks[3:]), 2)
+		# The blocks before the start are trusted
+		self.assertEqual(BlockChain.valid_prefix(blocks[:2] + [forged] + blocks[3:], 3), 3)
+
 	def test_json_to_blockchain(self):
 		block_0 = Block(None, [], index=1, nonce=208395)
 		block_1 = Block(block_0.hash, [], index=2)
@@ -0,0 +1,54 @@
+import sys
+sys.path.append('../../')
+
+import unittest
+from modules.blockchain.blocklist import BlockList
+
+
+class TestBlockList(unittest.TestCase):
+
+	def test_share(self):
+		blocks = BlockList.wrap(list(range(10)))
+		copy = blocks.share()
+		self.assertEqual(copy, list(range(10)))
+		self.assertEqual(blocks.share(4), list(range(4, 10)))
+		self.assertEqual(blocks.share(-2), [8, 9])
+
+		# Each list appends to its own tail
+		blocks.append(10)
+		copy.append('a')
+		self.assertEqual(blocks[-1], 10)
+		self.assertEqual(copy[-1], 'a')
+		self.assertEqual(copy[8:], [8, 9, 'a'])
+
+	def test_copy_on_write(self):
+		blocks = BlockList(range(10))
+		copy = blocks.share()
+		# The blocks after a height are replaced without copying the ones before
+		copy[6:] = ['a', 'b']
+		self.assertEqual(copy, [0, 1, 2, 3, 4, 5, 'a', 'b'])
+		self.assertEqual(copy._frozen, 6)
+
+		# A change of a shared block copies the list
+		copy[1] = 'c'
+		del copy[2]
+		copy.insert(0, 'd')
+		self.assertEqual(copy, ['d', 0, 'c', 3, 4, 5, 'a', 'b'])
+		self.assertEqual(blocks, list(range(10)))
+
+	def test_segments(self):
+		blocks = BlockList()
+		for i in range(1000):
+			blocks.append(i)
+			blocks.share()
+		# The segments are merged, their number stays logarithmic
+		self.assertLess(len(blocks._segments), 20)
+		self.assertEqual(blocks, list(range(1000)))
+		self.assertEqual(blocks[250:260], list(range(250, 260)))
+		self.assertEqual(blocks[:3] + [5], [0, 1, 2, 5])
+		with self.assertRaises(IndexError):
+			blocks[1000]
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,138 @@
+import sys
+sys.path.append('../../')
+
+import unittest
+from fastecdsa.keys import import_key
+from fastecdsa.curve import secp256k1
+
+from modules.blockchain.blockchain import BlockChain
+from modules.blockchain.book import Book
+from modules.blockchain.transaction import Transaction
+from modules.blockchain.blocktree import BlockTree, block_work
+
+
+class TestBlockTree(unittest.TestCase):
+
+	def setUp(self):
+		# main: genesis + 4 blocks, fork: the 2 first blocks + 3 other ones
+		self.main = BlockChain(debug=False)
+		for miner in ('zeddo', 'maistro', 'zeddo', 'maistro'):
+			self.main.mine_block(miner)
+		self.fork = BlockChain(override=True, debug=False)
+		self.fork.block_chain = self.main.block_chain[:2]
+		for miner in ('fork', 'fork', 'fork', 'fork'):
+			self.fork.mine_block(miner)
+
+	def test_add(self):
+		tree = BlockTree(self.main.block_chain)
+		self.assertEqual(len(tree), 5)
+		self.assertIs(tree.tip.block, self.main.block_chain[-1])
+		self.assertEqual(tree.tip.height, 4)
+		self.assertEqual(tree.tip.work, 5 * block_work(self.main.block_chain[0]))
+
+		# A block whose parent is unknown is not added
+		self.assertIsNone(tree.add(self.fork.block_chain[3]))
+		self.assertNotIn(self.fork.block_chain[3].hash, tree)
+
+		# A branch with the same work does not replace the tip
+		for block in self.fork.block_chain[2:5]:
+			tree.add(block)
+		self.assertIs(tree.tip.block, self.main.block_chain[-1])
+		tree.add(self.fork.block_chain[5])
+		self.assertIs(tree.tip.block, self.fork.block_chain[-1])
+
+	def test_fork_point(self):
+		tree = BlockTree(self.main.block_chain + self.fork.block_chain[2:])
+		main_tip, fork_tip = tree.get(self.main.block_chain[-1].hash), tree.get(self.fork.block_chain[-1].hash)
+		self.assertIs(BlockTree.fork_point(main_tip, fork_tip).block, self.main.block_chain[1])
+		self.assertEqual(BlockTree.branch(tree.get(self.main.block_chain[1].hash), fork_tip), self.fork.block_chain[2:])
+
+		# Chains starting from different genesis blocks share nothing
+		other = BlockTree(BlockChain(debug=False).block_chain)
+		self.assertIsNone(BlockTree.fork_point(main_tip, other.tip))
+
+	def test_switch(self):
+		tree = BlockTree(self.main.block_chain + self.fork.block_chain[2:])
+		block_chain = self.main.block_chain[:]
+		shared = block_chain[:2]
+		self.assertEqual(tree.switch(block_chain), 2)
+		self.assertEqual(block_chain, self.fork.block_chain)
+		# The blocks before the fork point are not replaced
+		self.assertTrue(all(a is b for a, b in zip(block_chain, shared)))
+
+		self.assertEqual(tree.switch(block_chain, tree.get(self.main.block_chain[-1].hash)), 2)
+		self.assertEqual(block_chain, self.main.block_chain)
+
+	def test_prune(self):
+		tree = BlockTree(self.main.block_chain + self.fork.block_chain[2:])
+		self.assertEqual(tree.prune(depth=1), 0)
+		# The side branch ends 2 blocks below the tip, the blocks it shares are kept
+		self.assertEqual(tree.prune(depth=0), 3)
+		self.assertEqual(len(tree), 6)
+		self.assertNotIn(self.main.block_chain[2].hash, tree)
+		self.assertIn(self.main.block_chain[1].hash, tree)
+		self.assertIs(tree.tip.block, self.fork.block_chain[-1])
+
+
+class TestReorganize(unittest.TestCase):
+
+	def test_reorganize(self):
+		main = BlockChain(debug=False)
+		for miner in ('zeddo', 'maistro', 'zeddo'):
+			main.mine_block(miner)
+		fork = BlockChain(override=True, debug=False)
+		fork.block_chain = main.block_chain[:2]
+		fork.mine_block('fork')
+		fork.mine_block('fork')
+
+		# A branch with the same work is verified and kept, the chain does not change
+		self.assertEqual(main.verify_branch(fork.block_chain[2:]), [])
+		self.assertIsNone(main.reorganize(fork.block_chain[2:]))
+		self.assertIn(fork.block_chain[-1].hash, main.tree)
+		self.assertEqual(main.number_blocks(), 4)
+
+		fork.mine_block('fork')
+		self.assertEqual(main.verify_branch(fork.block_chain[-1:]), [])
+		self.assertEqual(main.reorganize(fork.block_chain[-1:]), 2)
+		self.assertEqual(main.block_chain, fork.block_chain)
+
+	def test_reorganize_mempool(self):
+		private_key, public_key = import_key('tests/blockchain/test_files/default_keyprv.pem', curve=secp256k1)
+		shared, lost = (Transaction(public_key, public_key, Book(title, 'Author', '1999', 'Genre'), private_key)
+						for title in ('Shared', 'Lost'))
+		main = BlockChain(debug=False)
+		fork = main.fork_chain()
+		main.create_append_transaction(shared)
+		main.create_append_transaction(lost)
+		main.mine_block('zeddo')
+
+		fork.create_append_transaction(shared)
+		fork.mine_block('fork')
+		fork.mine_block('fork')
+		self.assertEqual(main.reorganize(fork.block_chain[1:]), 1)
+		# The transactions of the disconnected block go back to the mempool, except the ones of the new blocks
+		self.assertEqual(list(main.open_transactions), [lost])
+
+	def test_verify_branch(self):
+		main = BlockChain(debug=False)
+		main.mine_block('zeddo')
+		fork = main.fork_chain()
+		fork.mine_block('fork')
+		unknown = BlockChain(debug=False)
+		unknown.mine_block('zeddo')
+		unknown.mine_block('zeddo')
+
+		self.assertTrue(main.verify_branch(unknown.block_chain[2:]))
+		block = fork.block_chain[-1]
+		block.nonce += 1
+		self.assertTrue(main.verify_branch([block]))
+
+		# A nonce that does not solve the proof of work, the hash of the block matches it
+		while BlockChain.valid_block_proof(block):
+			block.nonce += 1
+		block.hash = block.compute_hash()
+		self.assertTrue(main.verify_branch([block]))
+
+
+if __name__ == '__main__':
+	unittest.main()
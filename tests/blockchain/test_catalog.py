@@ -0,0 +1,98 @@
+import sys
+sys.path.append('../../')
+
+import unittest
+from unittest import mock
+from modules.blockchain.block import Block
+from modules.blockchain.catalog import BookCatalog
+from modules.blockchain.transaction import Transaction
+from modules.blockchain.book import Book
+from fastecdsa.keys import import_key
+from fastecdsa.curve import secp256k1
+
+
+class TestBookCatalog(unittest.TestCase):
+
+	@classmethod
+	def setUpClass(cls):
+		# getting the private and public keys for the test
+		cls.private_key, cls.public_key = import_key('tests/blockchain/test_files/default_keyprv.pem', curve=secp256k1)
+
+	def block(self, *books):
+		transactions = [Transaction(self.public_key, None, book, self.private_key) for book in books]
+		transactions.append(Transaction(sender=None, recipient='zeddo', book=None, transaction_type=2))
+		return Block(None, transactions)
+
+	def setUp(self):
+		self.blocks = [
+			Block(None, [Transaction(sender=None, recipient='BlockChain', book=None, transaction_type=2)]),
+			self.block(Book("Le Gène égoïste", "Richard Dawkins", "1976", "Non-fiction"),
+					   Book("The Blind Watchmaker", "Richard Dawkins", "1986", "Non-fiction")),
+			self.block(Book("Dune", "Frank Herbert", "1965", "Science-fiction")),
+			self.block(Book("Dune Messiah", "Frank Herbert", "1969", "Science-fiction")),
+		]
+		self.catalog = BookCatalog(self.blocks)
+
+	def titles(self, entries):
+		return [entry.book['title'] for entry in entries]
+
+	def test_find(self):
+		self.assertEqual(self.catalog.height, 4)
+		self.assertEqual(len(self.catalog), 4)
+
+		entries = self.catalog.find('author', 'richard dawkins')
+		self.assertEqual(self.titles(entries), ["Le Gène égoïste", "The Blind Watchmaker"])
+		self.assertEqual(entries[0].height, 1)
+		self.assertEqual(entries[0].transaction_hash, self.blocks[1].transactions[0].hash_transaction().hex())
+		self.assertEqual(len(self.catalog.find('genre', 'Science-fiction', limit=1)), 1)
+		self.assertEqual(self.catalog.find('title', 'Dun'), [])
+		self.assertRaises(ValueError, self.catalog.find, 'isbn', '42')
+
+	def test_prefix(self):
+		self.assertEqual(self.titles(self.catalog.prefix('title', 'dune')), ["Dune", "Dune Messiah"])
+		self.assertEqual(self.titles(self.catalog.prefix('date', '19', limit=2)), ["Dune", "Dune Messiah"])
+		self.assertEqual(self.catalog.prefix('title', 'x'), [])
+
+		# The books of a new block are found
+		self.catalog.add_block(self.block(Book("Dune", "Brian Herbert", "2001", "Science-fiction")))
+		self.assertEqual(self.titles(self.catalog.prefix('title', 'DUNE')), ["Dune", "Dune", "Dune Messiah"])
+
+	def test_prefix_merge(self):
+		# The values of the new blocks are merged into the sorted ones once they are more than MIN_RECENT
+		with mock.patch('modules.blockchain.catalog.MIN_RECENT', 2):
+			catalog = BookCatalog(self.blocks)
+			catalog.add_block(self.block(Book("Dune", "Brian Herbert", "2001", "Science-fiction"),
+										 Book("Children of Dune", "Frank Herbert", "1976", "Science-fiction")))
+		self.assertLessEqual(len(catalog._recent['title']), 2)
+		self.assertEqual(self.titles(catalog.prefix('title', 'dune')), ["Dune", "Dune", "Dune Messiah"])
+		self.assertEqual(self.titles(catalog.prefix('date', '197', limit=2)), ["Le Gène égoïste", "Children of Dune"])
+		self.assertEqual([entry.book['date'] for entry in catalog.prefix('date', '')],
+						 ["1965", "1969", "1976", "1976", "1986", "2001"])
+
+		# The values of the dropped block are removed from the sorted ones
+		catalog.truncate(len(self.blocks))
+		self.assertEqual(self.titles(catalog.prefix('title', 'dune')), ["Dune", "Dune Messiah"])
+		self.assertEqual([entry.book['date'] for entry in catalog.prefix('date', '')], ["1965", "1969", "1976", "1986"])
+
+	def test_search(self):
+		self.assertEqual(self.titles(self.catalog.search('herbert dune')), ["Dune", "Dune Messiah"])
+		self.assertEqual(self.titles(self.catalog.search('gène')), ["Le Gène égoïste"])
+		self.assertEqual(self.titles(self.catalog.search('dawkins', limit=1)), ["Le Gène égoïste"])
+		self.assertEqual(self.catalog.search('dawkins herbert'), [])
+		self.assertEqual(self.catalog.search(''), [])
+
+	def test_replace(self):
+		self.catalog.prefix('title', 'dune')
+
+		# The last two blocks are replaced by another one
+		fork = self.blocks[:2] + [self.block(Book("Foundation", "Isaac Asimov", "1951", "Science-fiction"))]
+		self.catalog.replace(fork, 2)
+		self.assertEqual(self.catalog.height, 3)
+		self.assertEqual(self.titles(self.catalog.find('genre', 'science-fiction')), ["Foundation"])
+		self.assertEqual(self.catalog.prefix('title', 'dune'), [])
+		self.assertEqual(self.catalog.search('herbert'), [])
+		self.assertEqual(self.titles(self.catalog.search('dawkins')), ["Le Gène égoïste", "The Blind Watchmaker"])
+
+
+if __name__ == '__main__':
+	unittest.main()
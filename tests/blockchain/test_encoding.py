@@ -0,0 +1,64 @@
+import sys
+sys.path.append('../../')
+
+import unittest
+from modules.blockchain.encoding import *
+from modules.blockchain.cryp import Cryp
+from fastecdsa.keys import import_key
+from fastecdsa.curve import secp256k1
+
+
+class TestEncoding(unittest.TestCase):
+
+	@classmethod
+	def setUpClass(cls):
+		# getting the private and public keys for the test
+		cls.private_key, cls.public_key = import_key('tests/blockchain/test_files/default_keyprv.pem', curve=secp256k1)
+
+	def test_encode_varint(self):
+		self.assertEqual(encode_varint(0), b'\x00')
+		self.assertEqual(encode_varint(127), b'\x7f')
+		self.assertEqual(encode_varint(128), b'\x80\x01')
+		self.assertEqual(encode_varint(208393), b'\x89\xdc\x0c')
+		with self.assertRaises(ValueError):
+			encode_varint(-1)
+
+	def test_decode_varint(self):
+		for number in (0, 127, 128, 208393, 2 ** 64):
+			self.assertEqual(decode_varint(encode_varint(number)), (number, len(encode_varint(number))))
+		self.assertEqual(decode_varint(b'\x00\x89\xdc\x0c\x01', 1), (208393, 4))
+
+	def test_encode_key(self):
+		encoded = encode_key(self.public_key)
+		self.assertEqual(len(encoded), 65)
+		self.assertEqual(encoded[0], TAG_PAIR)
+		# A public key and its json form are encoded the same way
+		self.assertEqual(encode_key(Cryp.dump_pub(self.public_key)), encoded)
+		self.assertEqual(encode_key('mining'), bytes((TAG_STR, 6)) + b'mining')
+		self.assertEqual(encode_key(None), bytes((TAG_NONE,)))
+
+	def test_encode_signature(self):
+		signature = Cryp.get_signature('Test', self.private_key)
+		encoded = encode_signature(signature)
+		self.assertEqual(len(encoded), 65)
+		self.assertEqual(split_pair(signature), tuple(int(sig, 0) for sig in signature.split(',')))
+		self.assertEqual(encode_signature(None), bytes((TAG_NONE,)))
+
+	def test_encode_hash(self):
+		self.assertEqual(encode_hash('49f6'), bytes((TAG_BYTES, 2, 0x49, 0xf6)))
+		self.assertEqual(encode_hash('49F6'), encode_str('49F6'))
+		self.assertEqual(encode_hash(None), bytes((TAG_NONE,)))
+
+	def test_encode_mapping(self):
+		book = {'title': 'The Selfish Gene', 'author': 'Richard Dawkins'}
+		self.assertEqual(encode_mapping(book), encode_mapping(dict(reversed(list(book.items())))))
+		self.assertEqual(encode_mapping(book)[:2], bytes((TAG_MAP, 2)))
+		self.assertEqual(encode_mapping({'pages': 42}), encode_str('{"pages":42}'))
+		self.assertEqual(encode_mapping(None), bytes((TAG_NONE,)))
+
+	def test_canonical_json(self):
+		self.assertEqual(canonical_json({'b': 1, 'a': 'é'}), '{"a":"é","b":1}')
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,91 @@
+import sys
+sys.path.append('../../')
+
+import copy
+import unittest
+from modules.blockchain.mempool import Mempool
+from modules.blockchain.transaction import Transaction
+from modules.blockchain.book import Book
+from fastecdsa.keys import import_key, gen_keypair
+from fastecdsa.curve import secp256k1
+
+
+class TestMempool(unittest.TestCase):
+
+	@classmethod
+	def setUpClass(cls):
+		# getting the private and public keys for the test
+		cls.private_key, cls.public_key = import_key('tests/blockchain/test_files/default_keyprv.pem', curve=secp256k1)
+		cls.other_private_key, cls.other_public_key = gen_keypair(secp256k1)
+
+	def transaction(self, i, other=False):
+		book = Book(f"Book {i}", "Richard Dawkins", "1976", "Non-fiction")
+		if other:
+			return Transaction(self.other_public_key, None, book, self.other_private_key)
+		return Transaction(self.public_key, None, book, self.private_key)
+
+	def test_add(self):
+		mempool = Mempool()
+		transaction = self.transaction(0)
+		self.assertTrue(mempool.add(transaction))
+		# Duplicates are refused, even when it's another object
+		self.assertFalse(mempool.add(self.transaction(0)))
+		self.assertIn(transaction, mempool)
+		self.assertIs(mempool.get(transaction.hash_transaction()), transaction)
+		self.assertEqual(mempool, [transaction])
+		self.assertEqual(mempool.stats(), {'count': 1, 'bytes': len(transaction.to_bytes()),
+										   'evicted': 0, 'rejected': 1})
+
+	def test_max_count(self):
+		mempool = Mempool(max_count=3)
+		transactions = [self.transaction(i) for i in range(5)]
+		mempool.extend(transactions)
+		# The oldest transactions are evicted
+		self.assertEqual(mempool, transactions[2:])
+		self.assertEqual(mempool.evicted, 2)
+
+	def test_max_bytes(self):
+		transactions = [self.transaction(i) for i in range(5)]
+		size = len(transactions[0].to_bytes())
+		mempool = Mempool(max_bytes=size * 2)
+		mempool.extend(transactions)
+		self.assertEqual(mempool, transactions[3:])
+		self.assertEqual(mempool.bytes, size * 2)
+
+		self.assertFalse(Mempool(max_bytes=size - 1).add(transactions[0]))
+
+	def test_max_per_sender(self):
+		mempool = Mempool(max_per_sender=2)
+		self.assertTrue(mempool.add(self.transaction(0)))
+		self.assertTrue(mempool.add(self.transaction(1)))
+		self.assertFalse(mempool.add(self.transaction(2)))
+		self.assertTrue(mempool.add(self.transaction(2, other=True)))
+
+		# Removing a transaction frees a place for its sender
+		mempool.remove_many([self.transaction(0)])
+		self.assertTrue(mempool.add(self.transaction(2)))
+
+	def test_block_template(self):
+		mempool = Mempool()
+		transactions = [self.transaction(i) for i in range(4)]
+		mempool.extend(transactions)
+		size = len(transactions[0].to_bytes())
+
+		self.assertEqual(mempool.block_template(), transactions)
+		self.assertEqual(mempool.block_template(max_count=2), transactions[:2])
+		self.assertEqual(mempool.block_template(max_bytes=size * 3), transactions[:3])
+
+		self.assertEqual(mempool.remove_many(transactions[:2] + [transactions[0].hash_transaction()]), 2)
+		self.assertEqual(mempool.block_template(), transactions[2:])
+
+	def test_deepcopy(self):
+		mempool = Mempool()
+		mempool.add(self.transaction(0))
+		copy_mempool = copy.deepcopy(mempool)
+		self.assertEqual(copy_mempool, mempool)
+		copy_mempool.add(self.transaction(1))
+		self.assertEqual(len(mempool), 1)
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,37 @@
+import sys
+sys.path.append('../../')
+
+import hashlib
+import unittest
+from modules.blockchain.merkle import *
+
+
+class TestMerkle(unittest.TestCase):
+
+	def setUp(self):
+		self.hashes = [hashlib.sha256(str(i).encode()).digest() for i in range(7)]
+
+	def test_merkle_root(self):
+		self.assertEqual(merkle_root([]), EMPTY_ROOT)
+		self.assertEqual(merkle_root(self.hashes[:1]), hash_leaf(self.hashes[0]))
+		self.assertEqual(merkle_root(self.hashes[:3]),
+			hash_node(hash_node(hash_leaf(self.hashes[0]), hash_leaf(self.hashes[1])), hash_leaf(self.hashes[2])))
+		# The order of the transactions matters
+		self.assertNotEqual(merkle_root(self.hashes), merkle_root(self.hashes[::-1]))
+
+	def test_merkle_proof(self):
+		for size in range(1, len(self.hashes) + 1):
+			root = merkle_root(self.hashes[:size])
+			for index in range(size):
+				proof = merkle_proof(self.hashes[:size], index)
+				self.assertTrue(verify_proof(self.hashes[index], proof, root))
+				self.assertTrue(verify_proof(self.hashes[index], proof, root.hex()))
+				# The proof of a transaction doesn't prove another one
+				self.assertFalse(verify_proof(self.hashes[(index + 1) % 7], proof, root))
+
+		with self.assertRaises(IndexError):
+			merkle_proof(self.hashes, 7)
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,85 @@
+import sys
+sys.path.append('../../')
+
+import hashlib
+import threading
+import unittest
+from modules.blockchain.mining import NonceSearch, ParallelMiner
+from modules.blockchain.transaction import Transaction
+from modules.blockchain.book import Book
+from fastecdsa.keys import import_key
+from fastecdsa.curve import secp256k1
+
+
+class TestNonceSearch(unittest.TestCase):
+
+	@classmethod
+	def setUpClass(cls):
+		# getting the private and public keys for the test
+		cls.private_key, cls.public_key = import_key('tests/blockchain/test_files/default_keyprv.pem', curve=secp256k1)
+
+	def setUp(self):
+		book_fortest = Book("Le Gène égoïste", "Richard Dawkins", "1976", "Non-fiction")
+		self.transactions = [
+			Transaction(self.public_key, self.public_key, book_fortest, self.private_key),
+			Transaction(self.public_key, self.public_key, book_fortest, self.private_key, 2)
+		]
+		self.last_hash = '96b1255447ec94f9df2e7ad8d8e7d8106bd9b26ebba7fd97d0f3fb423afc961e'
+
+	def full_hash(self, nonce):
+		guess = (str(list(map(str, self.transactions))) + self.last_hash + str(nonce)).encode()
+		return hashlib.sha256(guess).hexdigest()
+
+	def test_valid(self):
+		search = NonceSearch.from_transactions(self.transactions, self.last_hash)
+		for nonce in range(500):
+			self.assertEqual(search.valid(nonce), self.full_hash(nonce).startswith('42'))
+
+	def test_valid_odd_difficulty(self):
+		search = NonceSearch.from_transactions(self.transactions, self.last_hash, difficulty='4')
+		for nonce in range(100):
+			self.assertEqual(search.valid(nonce), self.full_hash(nonce).startswith('4'))
+
+	def test_search(self):
+		search = NonceSearch.from_transactions(self.transactions, self.last_hash)
+		nonce = search.search()
+		self.assertTrue(self.full_hash(nonce).startswith('42'))
+		self.assertFalse(any(self.full_hash(n).startswith('42') for n in range(nonce)))
+
+		# The search can be split in interleaved ranges
+		self.assertEqual(search.search(start=nonce % 4, step=4), nonce)
+		self.assertIsNone(search.search(start=0, stop=nonce))
+
+
+class TestParallelMiner(unittest.TestCase):
+
+	@classmethod
+	def setUpClass(cls):
+		cls.miner = ParallelMiner(processes=2, batch=256)
+		cls.last_hash = '96b1255447ec94f9df2e7ad8d8e7d8106bd9b26ebba7fd97d0f3fb423afc961e'
+
+	@classmethod
+	def tearDownClass(cls):
+		cls.miner.close()
+
+	def test_proof_of_work(self):
+		# The pool is reused between the rounds
+		for last_hash in (self.last_hash, self.last_hash[::-1]):
+			nonce = self.miner.proof_of_work([], last_hash)
+			self.assertTrue(NonceSearch.from_transactions([], last_hash).valid(nonce))
+
+	def test_cancel(self):
+		# An unreachable difficulty keeps the workers busy until the round is cancelled
+		self.miner.difficulty = 'ffffffffffff'
+		try:
+			threading.Timer(0.5, self.miner.cancel).start()
+			self.assertIsNone(self.miner.proof_of_work([], self.last_hash))
+		finally:
+			self.miner.difficulty = '42'
+
+		nonce = self.miner.proof_of_work([], self.last_hash)
+		self.assertTrue(NonceSearch.from_transactions([], self.last_hash).valid(nonce))
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,140 @@
+import sys
+sys.path.append('../../')
+
+import json
+import os
+import tempfile
+import unittest
+from modules.blockchain.blockchain import BlockChain
+from modules.blockchain.store import BlockStore
+from modules.blockchain.transaction import Transaction
+from modules.blockchain.book import Book
+from fastecdsa.keys import import_key
+from fastecdsa.curve import secp256k1
+
+
+class TestBlockStore(unittest.TestCase):
+
+	@classmethod
+	def setUpClass(cls):
+		# getting the private and public keys for the test
+		cls.private_key, cls.public_key = import_key('tests/blockchain/test_files/default_keyprv.pem', curve=secp256k1)
+
+	def setUp(self):
+		self.directory = tempfile.TemporaryDirectory()
+		self.path = self.directory.name
+
+		self.chain = BlockChain(debug=False)
+		book = Book("Le Gène égoïste", "Richard Dawkins", "1976", "Non-fiction")
+		self.chain.create_append_transaction(Transaction(self.public_key, self.public_key, book, self.private_key))
+		for miner in ('zeddo', 'maistro', 'zeddo', 'maistro'):
+			self.chain.mine_block(miner)
+
+	def tearDown(self):
+		self.directory.cleanup()
+
+	def test_append_read(self):
+		store = BlockStore(self.path, sync_every=2)
+		store.extend(self.chain.block_chain[:3])
+		for block in self.chain.block_chain[3:]:
+			store.append(block)
+
+		self.assertEqual(len(store), 5)
+		for height, block in enumerate(self.chain.block_chain):
+			self.assertEqual(json.loads(store.read(height)), block.to_json())
+			self.assertEqual(store.height_of(block.hash), height)
+			self.assertIn(block.hash, store)
+		self.assertEqual(store.get_block(1), self.chain.block_chain[1])
+		self.assertEqual(json.loads(store.chain_json()), json.loads(json.dumps(self.chain.to_json())))
+		store.close()
+
+		# The chain is restored when the store is opened again
+		store = BlockStore(self.path)
+		self.assertEqual(store.load_blocks(), self.chain.block_chain)
+		self.assertTrue(BlockChain.verify_blockchain(store.load_blocks(), flag_list=True))
+		store.close()
+
+	def test_segments(self):
+		# One block per segment
+		store = BlockStore(self.path, segment_size=1)
+		store.extend(self.chain.block_chain)
+		self.assertTrue(os.path.exists(os.path.join(self.path, 'blocks_00004.dat')))
+		self.assertEqual(store.load_blocks(), self.chain.block_chain)
+
+		store.truncate(2)
+		self.assertEqual(len(store), 2)
+		self.assertFalse(os.path.exists(os.path.join(self.path, 'blocks_00002.dat')))
+		self.assertIsNone(store.height_of(self.chain.block_chain[3].hash))
+		store.close()
+
+		store = BlockStore(self.path, segment_size=1)
+		self.assertEqual(store.load_blocks(), self.chain.block_chain[:2])
+		store.close()
+
+	def test_replace(self):
+		store = BlockStore(self.path)
+		store.extend(self.chain.block_chain[:4])
+
+		fork = self.chain.fork_chain()
+		fork.block_chain = fork.block_chain[:2]
+		fork.mine_block('maistro')
+		store.replace(fork.block_chain, 2)
+		store.append(self.chain.block_chain[4])
+		store.close()
+
+		store = BlockStore(self.path)
+		self.assertEqual(store.load_blocks(), fork.block_chain + [self.chain.block_chain[4]])
+		store.close()
+
+	def test_torn_write(self):
+		store = BlockStore(self.path)
+		store.extend(self.chain.block_chain)
+		store.close()
+
+		# The last block was not completely written
+		segment = os.path.join(self.path, 'blocks_00000.dat')
+		with open(segment, 'r+b') as f:
+			f.truncate(os.path.getsize(segment) - 10)
+
+		store = BlockStore(self.path)
+		self.assertEqual(len(store), 4)
+		store.append(self.chain.block_chain[4])
+		store.close()
+
+		store = BlockStore(self.path)
+		self.assertEqual(store.load_blocks(), self.chain.block_chain)
+		store.close()
+
+	def test_checkpoint(self):
+		store = BlockStore(self.path, segment_size=1)
+		self.assertEqual(store.checked_height(), 0)
+		store.extend(self.chain.block_chain[:3])
+		store.checkpoint()
+		store.extend(self.chain.block_chain[3:])
+		store.close()
+
+		# The blocks appended after the checkpoint are not covered
+		store = BlockStore(self.path, segment_size=1)
+		self.assertEqual(store.checked_height(), 3)
+		store.close()
+
+		# A record changed on disk, the checkpoint does not match anymore
+		segment = os.path.join(self.path, 'blocks_00001.dat')
+		with open(segment, 'r+b') as f:
+			data = f.read()
+			f.seek(0)
+			f.write(data.replace(b'zeddo', b'zedda'))
+		store = BlockStore(self.path, segment_size=1)
+		self.assertEqual(store.checked_height(), 0)
+
+		# Other blocks written after a cut before the checkpoint
+		store.checkpoint()
+		self.assertEqual(store.checked_height(), 5)
+		store.truncate(2)
+		store.extend(self.chain.block_chain[3:])
+		self.assertEqual(store.checked_height(), 0)
+		store.close()
+
+
+if __name__ == '__main__':
+	unittest.main()
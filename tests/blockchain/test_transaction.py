@@ -41,6 +41,9 @@ class TestTransaction(unittest.TestCase):
 			'book': None,
 			'signature': None
 		})
+	def test_json_to_transaction(self):
+		self.assertEqual(Transaction.json_to_transaction(self.transaction_1.to_json()), self.transaction_1)
+		self.assertEqual(Transaction.json_to_transaction(self.transaction_2.to_json()), self.transaction_2)
 
 if __name__ == '__main__':
 	unittest.main()
\ No newline at end of file
@@ -0,0 +1,117 @@
+import sys
+sys.path.append('../../')
+
+import threading
+import unittest
+from modules.blockchain.book import Book
+from modules.blockchain.cryp import Cryp
+from modules.blockchain.transaction import Transaction
+from modules.blockchain.verification import SignatureCache, SignatureVerifier
+from fastecdsa.keys import import_key, gen_keypair
+from fastecdsa.curve import secp256k1
+
+
+class TestSignatureVerifier(unittest.TestCase):
+
+	@classmethod
+	def setUpClass(cls):
+		# getting the private and public keys for the test
+		cls.private_key, cls.public_key = import_key('tests/blockchain/test_files/default_keyprv.pem', curve=secp256k1)
+		cls.other_private_key, cls.other_public_key = gen_keypair(secp256k1)
+
+		cls.items, cls.expected = [], []
+		for i in range(12):
+			data = f'Book {i}'
+			signature = Cryp.get_signature(data, cls.private_key)
+			if i % 3 == 0:
+				cls.items.append((cls.public_key, signature, data))
+				cls.expected.append(True)
+			elif i % 3 == 1:
+				# The json form of the public key is accepted
+				cls.items.append((Cryp.dump_pub(cls.public_key), signature, data + '!'))
+				cls.expected.append(False)
+			else:
+				cls.items.append((cls.other_public_key, signature, data))
+				cls.expected.append(False)
+
+		# Malformed signatures are refused without raising
+		cls.items.append((cls.public_key, 'not a signature', 'data'))
+		cls.expected.append(False)
+		cls.items.append((cls.public_key, None, 'data'))
+		cls.expected.append(False)
+
+	def test_verify_inline(self):
+		verifier = SignatureVerifier()
+		self.assertEqual(verifier.verify(self.items), self.expected)
+		self.assertEqual(verifier.verify([]), [])
+		self.assertIsNone(verifier._pool)
+
+	def test_verify_pool(self):
+		verifier = SignatureVerifier(processes=2, chunk_size=3, inline_threshold=0)
+		try:
+			self.assertEqual(verifier.verify(self.items), self.expected)
+			self.assertIsNotNone(verifier._pool)
+			# The pool is reused
+			self.assertEqual(verifier.verify(self.items[::-1]), self.expected[::-1])
+		finally:
+			verifier.close()
+
+	def test_pool_threads(self):
+		verifier = SignatureVerifier(processes=2)
+		pools = []
+		threads = [threading.Thread(target=lambda: pools.append(verifier._get_pool())) for _ in range(8)]
+		try:
+			for thread in threads:
+				thread.start()
+			for thread in threads:
+				thread.join()
+			# The threads share a single pool
+			self.assertEqual(len(set(map(id, pools))), 1)
+		finally:
+			verifier.close()
+		self.assertIsNone(verifier._pool)
+
+	def test_verify_transactions(self):
+		verifier = SignatureVerifier()
+		book = Book("Le Gène égoïste", "Richard Dawkins", "1976", "Non-fiction")
+		valid = Transaction(self.public_key, None, book, self.private_key)
+		forged = Transaction(self.public_key, None, book, self.other_private_key)
+		reward = Transaction(None, 'zeddo', None, transaction_type=2)
+
+		self.assertEqual(verifier.verify_transactions([valid, forged, reward]), [True, False, False])
+		self.assertEqual(verifier.cache.stats(), {'hits': 0, 'misses': 2, 'size': 1, 'maxsize': 100000})
+
+		# Only the valid signature is cached
+		self.assertEqual(verifier.verify_transactions([valid, forged]), [True, False])
+		self.assertEqual(verifier.cache.stats(), {'hits': 1, 'misses': 3, 'size': 1, 'maxsize': 100000})
+
+		# A modified transaction has another hash
+		valid.book = dict(valid.book, genre='Science')
+		self.assertEqual(verifier.verify_transactions([valid]), [False])
+
+
+class TestSignatureCache(unittest.TestCase):
+
+	def test_lru(self):
+		cache = SignatureCache(maxsize=2)
+		cache.add(('a', 1))
+		cache.add(('b', 2))
+		self.assertTrue(cache.check(('a', 1)))
+		# 'b' is the least recently used
+		cache.add(('c', 3))
+		self.assertFalse(cache.check(('b', 2)))
+		self.assertTrue(cache.check(('a', 1)))
+		self.assertTrue(cache.check(('c', 3)))
+		self.assertEqual(cache.stats(), {'hits': 3, 'misses': 1, 'size': 2, 'maxsize': 2})
+
+		cache.resize(1)
+		self.assertEqual(len(cache), 1)
+		self.assertTrue(cache.check(('c', 3)))
+
+		cache.resize(0)
+		cache.add(('d', 4))
+		self.assertEqual(len(cache), 0)
+
+
+if __name__ == '__main__':
+	unittest.main()
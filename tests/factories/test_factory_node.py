@@ -0,0 +1,142 @@
+import sys
+sys.path.append('../../')
+
+import tempfile
+import unittest
+from twisted.internet import defer
+
+from modules.blockchain.store import BlockStore
+from modules.factories.factory_node import P2PFactory
+from modules.metrics import REGISTRY
+from modules.protocols.protocol_node import REQUEST_TIMEOUT
+from modules.protocols.seen import message_id
+from modules.simulation import Network
+
+
+class TestP2PFactory(unittest.TestCase):
+
+	def setUp(self):
+		self.network = Network()
+		# No seed server, the connection never completes
+		self.factory = P2PFactory(5001, debug=False, verify_processes=1, clock=self.network,
+								  connector=lambda ip, port, protocol: defer.Deferred())
+
+	def test_restore_chain(self):
+		directory = tempfile.TemporaryDirectory()
+		self.addCleanup(directory.cleanup)
+		chain = self.factory.blockchain
+		for miner in ('zeddo', 'maistro', 'zeddo'):
+			chain.mine_block(miner)
+
+		# A store whose third record does not follow the second one is trusted up to the second one
+		store = BlockStore(directory.name)
+		store.extend(chain.block_chain[:2] + chain.block_chain[3:])
+		store.close()
+		factory = P2PFactory(5002, debug=False, datadir=directory.name, connector=lambda ip, port, protocol: defer.Deferred())
+		self.assertEqual(factory.blockchain.block_chain, chain.block_chain[:2])
+		self.assertEqual(len(factory.store), 2)
+		self.assertEqual(factory.catalog.height, 2)
+
+		# The valid records are all restored
+		factory.store.replace(chain.block_chain, 2)
+		factory.stopFactory()
+		factory = P2PFactory(5002, debug=False, datadir=directory.name, connector=lambda ip, port, protocol: defer.Deferred())
+		self.assertEqual(factory.blockchain.block_chain, chain.block_chain)
+		# The restored blocks are not checked again on the next start
+		self.assertEqual(factory.store.checked_height(), 4)
+		factory.stopFactory()
+
+	def test_request(self):
+		self.assertTrue(self.factory.request('a'))
+		# Already asked for to a peer
+		self.assertFalse(self.factory.request('a'))
+		self.assertTrue(self.factory.request('b'))
+
+		# Asked for again once the request timed out
+		self.network.run(until=REQUEST_TIMEOUT)
+		self.assertTrue(self.factory.request('a'))
+		self.assertFalse(self.factory.request('a'))
+
+	def test_verifier(self):
+		other = P2PFactory(5002, debug=False, verify_processes=2, signature_cache_size=10,
+						   connector=lambda ip, port, protocol: defer.Deferred())
+		# Each node has its own pool and signature cache
+		self.assertIsNot(self.factory.verifier, other.verifier)
+		self.assertEqual((self.factory.verifier.processes, self.factory.verifier.cache.maxsize), (1, 100000))
+		self.assertEqual((other.verifier.processes, other.verifier.cache.maxsize), (2, 10))
+		other.verifier._get_pool()
+		self.factory.stopFactory()
+		self.assertIsNotNone(other.verifier._pool)
+		other.stopFactory()
+		self.assertIsNone(other.verifier._pool)
+
+	def test_metrics(self):
+		other = P2PFactory(5002, debug=False, verify_processes=1, connector=lambda ip, port, protocol: defer.Deferred())
+		other.verifier.cache.misses = 3
+		# Each node exposes its own signature cache
+		exposition = REGISTRY.exposition()
+		self.assertIn(f'openbook_signature_cache_misses_total{{node="{self.factory.uuid}"}} 0', exposition)
+		self.assertIn(f'openbook_signature_cache_misses_total{{node="{other.uuid}"}} 3', exposition)
+		self.assertRaises(ValueError, other.register_metrics)
+		other.stopFactory()
+
+	def test_dispatch_tip(self):
+		sent = {}
+
+		class Peer:
+			def __init__(self, name):
+				self.name = name
+
+			def send_inv(self, blocks=(), transactions=(), inv_id=None):
+				sent[self.name] = (blocks, transactions, inv_id)
+
+		first, second = Peer('first'), Peer('second')
+		self.factory.known_peers = {'first': first, 'second': second}
+		self.factory.dispatch_tip(first)
+		tip = self.factory.blockchain.block_chain[-1]
+		# The node the block came from is not told about it
+		inv_id = message_id([[0, tip.hash]], ())
+		self.assertEqual(sent, {'second': ([[0, tip.hash]], (), inv_id)})
+		# The announcement coming back is a duplicate
+		self.assertTrue(self.factory.seen.check(inv_id))
+
+	def test_adopt_blocks(self):
+		local = self.factory.blockchain
+		local.mine_block('zeddo')
+		fork = local.fork_chain()
+		fork.mine_block('fork')
+		fork.mine_block('fork')
+		local.mine_block('zeddo')
+		main = local.block_chain[:]
+
+		# The branch of the same length is kept, then adopted once it has more work
+		self.assertIsNone(self.factory.adopt_blocks(fork.block_chain[2:3]))
+		self.assertEqual(self.factory.adopt_blocks(fork.block_chain[3:]), 2)
+		self.assertIs(self.factory.blockchain, local)
+		self.assertEqual(local.block_chain, fork.block_chain)
+		self.assertEqual(self.factory.catalog.height, len(fork.block_chain))
+		self.assertIs(local.block_chain[1], main[1])
+
+	def test_mine(self):
+		local = self.factory.blockchain
+		self.factory.defer_to_thread = lambda function, *args: defer.succeed(function(*args))
+		mined = []
+		self.factory.mine('zeddo').addCallback(mined.append)
+		self.assertEqual(local.block_chain[-1], mined[0])
+		self.assertEqual(self.factory.catalog.height, 2)
+
+		# The tip changed during the search, the block is dropped
+		def race(function, *args):
+			block = function(*args)
+			self.factory.adopt_blocks([local.fork_chain().mine_block('other')])
+			return defer.succeed(block)
+
+		self.factory.defer_to_thread = race
+		self.factory.mine('zeddo').addCallback(mined.append)
+		self.assertIsNone(mined[1])
+		self.assertEqual(local.number_blocks(), 3)
+		self.assertEqual(self.factory.catalog.height, 3)
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,80 @@
+import sys
+sys.path.append('../../')
+
+import json
+import unittest
+from modules.blockchain.blockchain import BlockChain
+from modules.blockchain.transaction import Transaction
+from modules.blockchain.book import Book
+from modules.protocols.codec import *
+from fastecdsa.keys import import_key
+from fastecdsa.curve import secp256k1
+
+
+class TestCodec(unittest.TestCase):
+
+	@classmethod
+	def setUpClass(cls):
+		# getting the private and public keys for the test
+		cls.private_key, cls.public_key = import_key('tests/blockchain/test_files/default_keyprv.pem', curve=secp256k1)
+
+	def test_values(self):
+		values = [None, True, False, 0, 1, -1, 208393, -2 ** 70, 2 ** 300, 0.5, '', 'mining', 'Le Gène égoïste',
+				  'ab01', 'AB01', 'abc', '0x1,0x2', '0x01,0x2', '0x1', [], [1, [2, None]], {}, {'a': {'b': [True]}}]
+		for value in values:
+			self.assertEqual(decode(encode(value)), value)
+			self.assertEqual(type(decode(encode(value))), type(value))
+
+		# The keys are strings, like in json
+		self.assertEqual(decode(encode({0: 'x'})), json.loads(json.dumps({0: 'x'})))
+		self.assertRaises(TypeError, encode, {'set': {1}})
+
+	def test_fixed_width_fields(self):
+		signature = '0x' + 'f' * 64 + ',0x1'
+		self.assertEqual(encode(signature)[0], T_PAIR)
+		self.assertEqual(len(encode(signature)), 65)
+		self.assertEqual(encode('00' * 32), bytes((T_HEX, 32)) + bytes(32))
+		self.assertEqual(encode('post_transaction'), bytes((T_WORD, WORDS.index('post_transaction'))))
+		# A pair that would not be rebuilt identically stays a string
+		self.assertEqual(encode('0x01,0x2')[0], T_STR)
+
+	def test_messages(self):
+		chain = BlockChain(debug=False)
+		book = Book("Le Gène égoïste", "Richard Dawkins", "1976", "Non-fiction")
+		chain.create_append_transaction(Transaction(self.public_key, self.public_key, book, self.private_key))
+		chain.mine_block('zeddo')
+
+		message = {'information_type': 'post_blockchain', 'blockchain': chain.to_json()}
+		binary = encode_message(message, 'binary')
+		self.assertEqual(decode_message(binary), json.loads(json.dumps(message)))
+		self.assertLess(len(binary), len(encode_message(message)) / 2)
+
+		# The blocks are rebuilt with the same hashes
+		received = BlockChain.json_to_blockchain(decode_message(binary)['blockchain'])
+		self.assertEqual(received, chain)
+		self.assertTrue(BlockChain.verify_blockchain(received))
+
+		self.assertEqual(decode_message(encode_message({'information_type': 'ping'})), {'information_type': 'ping'})
+
+	def test_invalid(self):
+		binary = encode({'information_type': 'ping'})
+		self.assertRaises(ValueError, decode, binary[:-1])
+		self.assertRaises(ValueError, decode, binary + b'\x00')
+		self.assertRaises(ValueError, decode, b'\xff')
+		# A list as a dict key, a truncated float, a deep nesting
+		self.assertRaises(ValueError, decode, bytes([9, 1, 8, 0, 0]))
+		self.assertRaises(ValueError, decode, bytes([4, 1, 2]))
+		self.assertRaises(ValueError, decode, bytes([8, 1]) * 100000)
+		self.assertRaises(ValueError, decode_message, b'{"a":' * 100000)
+		# A message is a dict
+		self.assertRaises(ValueError, decode_message, encode([1, 2]))
+		self.assertRaises(ValueError, decode_message, b'[1, 2]')
+
+	def test_negotiate(self):
+		self.assertEqual(negotiate(['json', 'binary']), 'binary')
+		self.assertEqual(negotiate(['json']), 'json')
+		self.assertEqual(negotiate(None), 'json')
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,48 @@
+import sys
+sys.path.append('../../')
+
+import json
+import unittest
+from modules.protocols import compression
+from modules.protocols.codec import encode_message
+from modules.protocols.compression import Compressor, decompress, negotiate
+
+
+class TestCompression(unittest.TestCase):
+
+	def setUp(self):
+		block = {'previous_hash': 'ab' * 32, 'index': 1, 'nonce': 42, 'transactions': [
+			{'type': 'mining', 'sender': 'the-chain', 'recipient': '0x1,0x2', 'book': None}]}
+		self.message = {'information_type': 'blockchain_blocks', 'blocks': [block] * 50}
+
+	def test_compress(self):
+		for codec in ('json', 'binary'):
+			payload = encode_message(self.message, codec)
+			compressed = Compressor('zlib').compress(payload)
+			self.assertLess(len(compressed), len(payload))
+			self.assertEqual(compressed[0], compression.ZLIB)
+			self.assertEqual(decompress(compressed), payload)
+
+	def test_threshold(self):
+		payload = json.dumps(self.message).encode()
+		# Small messages, messages that do not shrink and disabled compression are sent as they are
+		self.assertIs(Compressor('zlib', threshold=len(payload) + 1).compress(payload), payload)
+		self.assertIs(Compressor().compress(payload), payload)
+		self.assertEqual(Compressor('zlib', threshold=0).compress(b'{}'), b'{}')
+		self.assertEqual(decompress(payload), payload)
+		self.assertEqual(decompress(b''), b'')
+
+	def test_decompress_invalid(self):
+		compressed = Compressor('zlib').compress(json.dumps(self.message).encode())
+		self.assertRaises(ValueError, decompress, compressed[:-10] + b'\x00' * 10)
+		self.assertRaises(ValueError, decompress, compressed, max_size=100)
+
+	def test_negotiate(self):
+		self.assertEqual(negotiate(['zlib']), 'zlib')
+		self.assertEqual(negotiate(list(compression.COMPRESSIONS)), compression.COMPRESSIONS[0])
+		self.assertIsNone(negotiate(None))
+		self.assertIsNone(negotiate(['lzma']))
+
+
+if __name__ == '__main__':
+	unittest.main()
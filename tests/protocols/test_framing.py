@@ -0,0 +1,44 @@
+import sys
+sys.path.append('../../')
+
+import unittest
+from modules.protocols.framing import FrameDecoder, FrameTooLarge, encode_frame
+
+
+class TestFraming(unittest.TestCase):
+
+	def test_encode_frame(self):
+		self.assertEqual(encode_frame(b'{}'), b'\x00\x00\x00\x02{}')
+		self.assertEqual(encode_frame(b''), b'\x00\x00\x00\x00')
+
+	def test_feed(self):
+		decoder = FrameDecoder()
+		messages = [b'{"information_type": "ping"}', b'', b'x' * 100000]
+		stream = b''.join(encode_frame(message) for message in messages)
+		self.assertEqual(decoder.feed(stream), messages)
+		self.assertEqual(len(decoder), 0)
+
+	def test_split_frames(self):
+		# The frames are returned once all their bytes are received, whatever the segments
+		decoder = FrameDecoder()
+		messages = [b'first', b'second' * 1000, b'third']
+		stream = b''.join(encode_frame(message) for message in messages)
+
+		received = []
+		for i in range(0, len(stream), 7):
+			received.extend(decoder.feed(stream[i:i + 7]))
+		self.assertEqual(received, messages)
+
+		self.assertEqual(decoder.feed(encode_frame(b'fourth')[:3]), [])
+		self.assertEqual(len(decoder), 3)
+		self.assertEqual(decoder.feed(encode_frame(b'fourth')[3:]), [b'fourth'])
+
+	def test_max_frame_size(self):
+		decoder = FrameDecoder(max_frame_size=10)
+		self.assertEqual(decoder.feed(encode_frame(b'0123456789')), [b'0123456789'])
+		# The frame is refused as soon as its length is received
+		self.assertRaises(FrameTooLarge, decoder.feed, encode_frame(b'01234567890')[:4])
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,40 @@
+import sys
+sys.path.append('../../')
+
+import unittest
+from twisted.test import proto_helpers
+
+from modules.protocols.codec import decode_message, encode_message
+from modules.protocols.framing import FrameDecoder, encode_frame
+from modules.protocols.protocol_client import ClientProtocol
+
+
+class FailingProtocol(ClientProtocol):
+
+	router = ClientProtocol.router.extend({'fail': lambda protocol, message: 1 / 0}, name='test')
+
+
+class TestClientProtocol(unittest.TestCase):
+
+	def setUp(self):
+		self.protocol = FailingProtocol(debug=False)
+		self.transport = proto_helpers.StringTransport()
+		self.protocol.makeConnection(self.transport)
+
+	def test_debug(self):
+		self.assertFalse(self.protocol.debug)
+		self.assertTrue(ClientProtocol().debug)
+
+	def test_failing_handler(self):
+		frames = b''.join(encode_frame(encode_message({'information_type': information_type}))
+						  for information_type in ('fail', 'ping'))
+		# The message whose handler fails is dropped, the next one is still handled
+		with self.assertLogs('openbook.client', 'ERROR'):
+			self.protocol.dataReceived(frames)
+		self.assertEqual([decode_message(frame) for frame in FrameDecoder().feed(self.transport.value())],
+						 [{'information_type': 'pong'}])
+		self.assertFalse(self.transport.disconnecting)
+
+
+if __name__ == '__main__':
+	unittest.main()
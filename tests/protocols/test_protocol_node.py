@@ -0,0 +1,281 @@
+import sys
+sys.path.append('../../')
+
+import unittest
+from twisted.internet import defer
+from twisted.test import proto_helpers
+
+from modules.blockchain.blockchain import BlockChain
+from modules.factories.factory_node import P2PFactory
+from modules.protocols.codec import decode_message, encode_message
+from modules.protocols.compression import decompress
+from modules.protocols.framing import FrameDecoder, encode_frame
+from modules.protocols.protocol_node import REQUEST_TIMEOUT
+from modules.protocols.seen import message_id
+from modules.simulation import Network
+
+
+class ProtocolTestCase(unittest.TestCase):
+	"""A node connected to peers over string transports, the verifications run synchronously"""
+
+	def setUp(self):
+		self.network = Network()
+		self.factory = self.make_factory(5001)
+		self.protocol, self.transport = self.connect(self.factory, 'peer')
+
+	def make_factory(self, port):
+		return P2PFactory(port, debug=False, verify_processes=1, clock=self.network,
+						  connector=lambda ip, port, protocol: defer.Deferred(),
+						  defer_to_thread=lambda function, *args: defer.succeed(function(*args)))
+
+	@staticmethod
+	def connect(factory, nodeid):
+		protocol = factory.buildProtocol(None)
+		transport = proto_helpers.StringTransport()
+		protocol.makeConnection(transport)
+		protocol.remote_nodeid = nodeid
+		return protocol, transport
+
+	@staticmethod
+	def receive(protocol, message):
+		protocol.dataReceived(encode_frame(encode_message(message)))
+
+	@staticmethod
+	def sent(transport):
+		"""The messages written to the transport since the last call"""
+		frames = FrameDecoder().feed(transport.value())
+		transport.clear()
+		return [decode_message(decompress(frame)) for frame in frames]
+
+
+class TestP2Protocol(ProtocolTestCase):
+
+	def test_debug(self):
+		# The protocols use the debug setting of their factory
+		self.assertFalse(self.protocol.debug)
+
+	def test_verify_and_adopt(self):
+		calls = []
+		self.factory.defer_to_thread = lambda function, *args: calls.append((function, args)) or defer.succeed(function(*args))
+		genesis = self.factory.blockchain.block_chain[0]
+		block = self.factory.blockchain.fork_chain().mine_block('zeddo')
+		done = []
+		self.protocol.verify_and_adopt([block]).addCallback(done.append)
+
+		# The worker thread only gets the blocks and their parent, not the tree
+		self.assertEqual(calls, [(BlockChain.check_branch, ([genesis, block], True, self.factory.verifier))])
+		self.assertEqual(done, [(True, self.factory.blockchain)])
+		self.assertEqual(self.factory.blockchain.block_chain, [genesis, block])
+
+
+class TestInventory(ProtocolTestCase):
+
+	def test_inv(self):
+		peer = self.factory.blockchain.fork_chain()
+		for miner in ('zeddo', 'zeddo', 'zeddo'):
+			peer.mine_block(miner)
+		next_hash, tip_hash = peer.block_chain[1].hash, peer.block_chain[-1].hash
+
+		# The block following the local tip is asked for
+		self.receive(self.protocol, {'information_type': 'inv', 'blocks': [[1, next_hash]]})
+		self.assertEqual(self.sent(self.transport),
+						 [{'information_type': 'get_data', 'blocks': [[1, next_hash]], 'transactions': []}])
+		self.assertFalse(self.factory.request(next_hash))
+
+		# A block further away is reached through the headers, it is not recorded as requested
+		self.receive(self.protocol, {'information_type': 'inv', 'blocks': [[3, tip_hash]]})
+		self.assertEqual([message['information_type'] for message in self.sent(self.transport)], ['get_headers'])
+		self.assertTrue(self.factory.request(tip_hash))
+
+	def test_inv_retry(self):
+		other, other_transport = self.connect(self.factory, 'other')
+		self.factory.known_peers = {'peer': self.protocol, 'other': other}
+		peer = self.factory.blockchain.fork_chain()
+		block = peer.mine_block('zeddo')
+		inv = {'information_type': 'inv', 'id': message_id([[1, block.hash]], ()), 'blocks': [[1, block.hash]]}
+		get_data = {'information_type': 'get_data', 'blocks': [[1, block.hash]], 'transactions': []}
+
+		# The same announcement from a second peer is dropped, the block is only asked to the first one
+		self.receive(self.protocol, inv)
+		self.receive(other, inv)
+		self.assertEqual(self.sent(self.transport), [get_data])
+		self.assertEqual(self.sent(other_transport), [])
+		self.assertEqual(self.factory.dropped['inv'], 1)
+		self.assertIn(block.hash, other.known_inventory)
+
+		# The first peer does not deliver it, the second one is asked once the request timed out
+		self.network.run(until=REQUEST_TIMEOUT - 1)
+		self.assertEqual(self.sent(other_transport), [])
+		self.network.run(until=REQUEST_TIMEOUT)
+		self.assertEqual(self.sent(other_transport), [get_data])
+		self.assertEqual(self.sent(self.transport), [])
+
+		self.receive(other, {'information_type': 'block', 'block': block.to_json()})
+		self.assertEqual(self.factory.blockchain.block_chain[-1], block)
+		self.assertNotIn(block.hash, self.factory.sources)
+
+	def test_inv_delivered(self):
+		other, other_transport = self.connect(self.factory, 'other')
+		self.factory.known_peers = {'peer': self.protocol, 'other': other}
+		block = self.factory.blockchain.fork_chain().mine_block('zeddo')
+		inv = {'information_type': 'inv', 'id': message_id([[1, block.hash]], ()), 'blocks': [[1, block.hash]]}
+		self.receive(self.protocol, inv)
+		self.receive(other, inv)
+
+		# The block is received from the first peer, the second one is not asked for it
+		self.receive(self.protocol, {'information_type': 'block', 'block': block.to_json()})
+		self.network.run(until=2 * REQUEST_TIMEOUT)
+		self.assertEqual(self.sent(other_transport), [])
+		self.assertEqual(self.factory.sources, {})
+
+
+class TestHeaderSync(ProtocolTestCase):
+
+	def setUp(self):
+		ProtocolTestCase.setUp(self)
+		# local: genesis + 4 blocks, the peer shares the 2 first blocks and has 4 other ones
+		local = self.factory.blockchain
+		for miner in ('zeddo', 'maistro', 'zeddo', 'maistro'):
+			local.mine_block(miner)
+		self.other = self.make_factory(5002)
+		self.other.blockchain.block_chain = local.block_chain[:2]
+		for miner in ('fork', 'fork', 'fork', 'fork'):
+			self.other.blockchain.mine_block(miner)
+		self.peer, self.peer_transport = self.connect(self.other, 'node')
+
+	def pump(self):
+		# Deliver the messages of both transports until none is left, returns their types
+		types = []
+		while self.transport.value() or self.peer_transport.value():
+			for transport, protocol in ((self.transport, self.peer), (self.peer_transport, self.protocol)):
+				for message in self.sent(transport):
+					types.append(message['information_type'])
+					self.receive(protocol, message)
+		return types
+
+	def test_fork_point(self):
+		self.protocol.send_get_headers()
+		get_headers = self.sent(self.transport)[0]
+		# The locator lists the last blocks, the peer answers from the first block it does not share
+		self.assertEqual(get_headers['locator'][0], [4, self.factory.blockchain.block_chain[4].hash])
+		self.receive(self.peer, get_headers)
+		headers = self.sent(self.peer_transport)[0]
+		self.assertEqual((headers['start'], headers['height'], len(headers['headers'])), (2, 6, 4))
+
+		self.receive(self.protocol, headers)
+		self.assertEqual(self.sent(self.transport), [{'information_type': 'get_blocks', 'from': 2, 'to': 6}])
+		self.receive(self.peer, {'information_type': 'get_blocks', 'from': 2, 'to': 6})
+		self.assertEqual(self.pump(), ['blocks'])
+		self.assertEqual(self.factory.blockchain.block_chain, self.other.blockchain.block_chain)
+		self.assertIsNone(self.protocol.sync)
+
+	def test_bad_headers(self):
+		self.protocol.send_get_headers()
+		self.receive(self.peer, self.sent(self.transport)[0])
+		headers = self.sent(self.peer_transport)[0]
+		# A header that does not link to the one before it
+		headers['headers'][2]['previous_hash'] = headers['headers'][0]['previous_hash']
+		self.receive(self.protocol, headers)
+		self.assertEqual(self.sent(self.transport), [])
+		self.assertIsNone(self.protocol.sync)
+		self.assertEqual(self.factory.blockchain.number_blocks(), 5)
+
+		# Blocks that do not match the received headers are refused
+		self.protocol.send_get_headers()
+		self.assertEqual(self.pump(), ['get_headers', 'headers', 'get_blocks', 'blocks'])
+		self.assertEqual(self.factory.blockchain.block_chain, self.other.blockchain.block_chain)
+
+	def test_genesis_header(self):
+		# A peer whose chain does not share the genesis block sends the headers from it
+		other = self.make_factory(5003)
+		for miner in ('other',) * 6:
+			other.blockchain.mine_block(miner)
+		peer, peer_transport = self.connect(other, 'other')
+		self.protocol.send_get_headers()
+		self.receive(peer, self.sent(self.transport)[0])
+		headers = self.sent(peer_transport)[0]
+		self.assertEqual(headers['start'], 0)
+
+		# Its hash does not match its content
+		headers['headers'][0]['nonce'] += 1
+		self.receive(self.protocol, headers)
+		self.assertEqual(self.sent(self.transport), [])
+		self.assertIsNone(self.protocol.sync)
+
+	def test_unresponsive_peer(self):
+		self.protocol.send_get_headers()
+		self.receive(self.peer, self.sent(self.transport)[0])
+		self.receive(self.protocol, self.sent(self.peer_transport)[0])
+		self.assertEqual([message['information_type'] for message in self.sent(self.transport)], ['get_blocks'])
+
+		# The blocks never come, the synchronization is abandoned and the next announcement starts it again
+		self.network.run(until=REQUEST_TIMEOUT - 1)
+		self.assertIsNotNone(self.protocol.sync)
+		self.network.run(until=REQUEST_TIMEOUT)
+		self.assertIsNone(self.protocol.sync)
+		tip = self.other.blockchain.block_chain[-1]
+		self.receive(self.protocol, {'information_type': 'inv', 'blocks': [[5, tip.hash]]})
+		# The parent of the announced block is unknown, the headers are asked for
+		self.assertEqual(self.pump(), ['get_data', 'block', 'get_headers', 'headers', 'get_blocks', 'blocks'])
+		self.assertEqual(self.factory.blockchain.block_chain, self.other.blockchain.block_chain)
+
+		# A request for headers left unanswered does not block the next ones either
+		self.protocol.send_get_headers()
+		self.transport.clear()
+		self.receive(self.protocol, {'information_type': 'inv', 'blocks': [[7, tip.hash]]})
+		self.assertEqual(self.sent(self.transport), [])
+		self.network.run(until=2 * REQUEST_TIMEOUT + 1)
+		self.assertFalse(self.protocol._headers_requested)
+
+
+class TestStreaming(ProtocolTestCase):
+
+	def setUp(self):
+		ProtocolTestCase.setUp(self)
+		self.other = self.make_factory(5002)
+		for miner in ('zeddo', 'maistro', 'zeddo'):
+			self.other.blockchain.mine_block(miner)
+		self.sender, self.sender_transport = self.connect(self.other, 'node')
+
+	def pull(self):
+		# The transport asks for the messages until the transfers are over
+		while self.sender_transport.producer is not None:
+			self.sender_transport.producer.resumeProducing()
+
+	def test_stream(self):
+		done = []
+		self.sender.send_blockchain().addCallback(done.append)
+		# A chain asked for during the transfer is sent after it
+		self.assertIsNone(self.sender.send_blockchain())
+		self.pull()
+		self.assertEqual(done, [True])
+
+		messages = self.sent(self.sender_transport)
+		self.assertEqual([message['information_type'] for message in messages],
+						 ['blockchain_start', 'blockchain_blocks', 'blockchain_end'] * 2)
+		for message in messages[:3]:
+			self.receive(self.protocol, message)
+		self.assertEqual(self.factory.blockchain.block_chain, self.other.blockchain.block_chain)
+		self.assertIsNone(self.protocol.incoming)
+
+	def test_stream_count(self):
+		blocks = [block.to_json() for block in self.other.blockchain.block_chain]
+
+		# Fewer blocks than announced, the chain is incomplete
+		self.receive(self.protocol, {'information_type': 'blockchain_start', 'count': 5})
+		self.receive(self.protocol, {'information_type': 'blockchain_blocks', 'blocks': blocks[:3]})
+		self.receive(self.protocol, {'information_type': 'blockchain_end'})
+		self.assertEqual(self.factory.blockchain.number_blocks(), 1)
+
+		# More blocks than announced, the peer is dropped
+		self.receive(self.protocol, {'information_type': 'blockchain_start', 'count': 3})
+		self.receive(self.protocol, {'information_type': 'blockchain_blocks', 'blocks': blocks[:2]})
+		self.receive(self.protocol, {'information_type': 'blockchain_blocks', 'blocks': blocks[2:]})
+		self.assertIsNone(self.protocol.incoming)
+		self.assertTrue(self.transport.disconnecting)
+		self.receive(self.protocol, {'information_type': 'blockchain_end'})
+		self.assertEqual(self.factory.blockchain.number_blocks(), 1)
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,56 @@
+import sys
+sys.path.append('../../')
+
+import time
+import unittest
+from modules.protocols.router import Router
+
+
+class Protocol:
+
+	def __init__(self):
+		self.received = []
+
+	def handel_ping(self, ping):
+		self.received.append(ping)
+		return 'pong'
+
+
+class TestRouter(unittest.TestCase):
+
+	def test_dispatch(self):
+		router = Router({'ping': 'handel_ping', 'get_peers': lambda protocol, message: 'peers'})
+		protocol = Protocol()
+		self.assertEqual(router.dispatch(protocol, {'information_type': 'ping'}, 30), 'pong')
+		self.assertEqual(router.dispatch(protocol, {'information_type': 'get_peers'}, 40), 'peers')
+		self.assertIsNone(router.dispatch(protocol, {'information_type': 'post_bitcoins'}, 50))
+		self.assertIsNone(router.dispatch(protocol, {}, 10))
+		self.assertEqual(protocol.received, [{'information_type': 'ping'}])
+
+		stats = router.snapshot()
+		self.assertEqual(set(stats), {'ping', 'get_peers', 'unknown'})
+		self.assertEqual(stats['unknown']['count'], 2)
+		self.assertEqual(stats['ping']['bytes']['sum'], 30)
+		self.assertEqual(stats['ping']['latency']['count'], 1)
+
+	def test_extend(self):
+		router = Router({'ping': 'handel_ping', 'pong': 'handel_pong'}, budget=1)
+		extended = router.extend({'pong': lambda protocol, message: None, 'get_peers': 'send_peers'})
+		self.assertEqual(set(extended.routes), {'ping', 'pong', 'get_peers'})
+		self.assertEqual(router.routes['pong'], 'handel_pong')
+		self.assertEqual(extended.budget, 1)
+
+	def test_budget(self):
+		router = Router({'slow': lambda protocol, message: time.sleep(0.02), 'fast': lambda protocol, message: None},
+						budget=0.01)
+		with self.assertLogs('openbook.router', 'WARNING') as logs:
+			router.dispatch(Protocol(), {'information_type': 'slow'})
+			router.dispatch(Protocol(), {'information_type': 'fast'})
+		self.assertEqual(len(logs.records), 1)
+		self.assertIn('slow handler blocked the reactor', logs.output[0])
+		self.assertEqual(router.stats['slow'].slow, 1)
+		self.assertEqual(router.stats['fast'].slow, 0)
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,44 @@
+import sys
+sys.path.append('../../')
+
+import unittest
+from twisted.internet.task import Clock
+
+from modules.protocols.seen import SeenFilter, message_id
+
+
+class TestSeenFilter(unittest.TestCase):
+
+	def test_check(self):
+		seen = SeenFilter(Clock())
+		self.assertFalse(seen.check('a'))
+		self.assertTrue(seen.check('a'))
+		self.assertFalse(seen.check('b'))
+		seen.add('c')
+		self.assertTrue(seen.check('c'))
+		self.assertEqual(seen.stats(), {'hits': 2, 'size': 3})
+
+	def test_window(self):
+		clock = Clock()
+		seen = SeenFilter(clock, window=10, buckets=5)
+		seen.add('old')
+		clock.advance(4)
+		seen.add('new')
+		# Remembered for at least window * (buckets - 1) / buckets
+		clock.advance(4)
+		self.assertTrue(seen.check('old'))
+		clock.advance(2)
+		self.assertFalse(seen.check('old'))
+		self.assertTrue(seen.check('new'))
+		# Everything is forgotten after a long pause
+		clock.advance(100)
+		self.assertEqual(len(seen), 0)
+
+	def test_message_id(self):
+		self.assertEqual(message_id([[1, 'ab']], ()), message_id([[1, 'ab']], []))
+		self.assertNotEqual(message_id([[1, 'ab']], ()), message_id([[2, 'ab']], ()))
+		self.assertEqual(len(message_id('x')), 16)
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,70 @@
+import sys
+sys.path.append('../../')
+
+import unittest
+from twisted.test import proto_helpers
+
+from modules.blockchain.blockchain import BlockChain
+from modules.protocols.codec import decode_message
+from modules.protocols.framing import FrameDecoder
+from modules.protocols.streaming import ChainProducer
+
+
+class TestChainProducer(unittest.TestCase):
+
+	def setUp(self):
+		self.blockchain = BlockChain(debug=False)
+		for miner in ('zeddo', 'maistro', 'zeddo', 'maistro'):
+			self.blockchain.mine_block(miner)
+		self.transport = proto_helpers.StringTransport()
+		self.producer = ChainProducer(self.transport, self.blockchain.block_chain, chunk_size=2)
+		self.done = []
+		self.producer.start().addCallback(self.done.append)
+
+	def sent(self):
+		frames = FrameDecoder().feed(self.transport.value())
+		self.transport.clear()
+		return [decode_message(frame) for frame in frames]
+
+	def test_chunks(self):
+		self.assertIs(self.transport.producer, self.producer)
+		while not self.done:
+			self.producer.resumeProducing()
+
+		messages = self.sent()
+		self.assertEqual(messages[0], {'information_type': 'blockchain_start', 'count': 5})
+		self.assertEqual([len(message['blocks']) for message in messages[1:-1]], [2, 2, 1])
+		blocks = [block for message in messages[1:-1] for block in message['blocks']]
+		self.assertEqual(blocks, [block.to_json() for block in self.blockchain.block_chain])
+		self.assertEqual(messages[-1], {'information_type': 'blockchain_end'})
+		self.assertEqual(self.done, [True])
+		self.assertIsNone(self.transport.producer)
+
+	def test_pull(self):
+		# Nothing is written until the transport asks for it, then one message at a time
+		self.assertEqual(self.sent(), [])
+		self.producer.resumeProducing()
+		self.assertEqual([message['information_type'] for message in self.sent()], ['blockchain_start'])
+		self.producer.resumeProducing()
+		self.assertEqual([message['information_type'] for message in self.sent()], ['blockchain_blocks'])
+
+		# The chain changing during the transfer does not change the blocks sent
+		self.blockchain.mine_block('zeddo')
+		for _ in range(3):
+			self.producer.resumeProducing()
+		self.assertEqual([message['information_type'] for message in self.sent()],
+						 ['blockchain_blocks', 'blockchain_blocks', 'blockchain_end'])
+		self.assertEqual(self.done, [True])
+
+	def test_stop(self):
+		self.producer.resumeProducing()
+		self.producer.stopProducing()
+		self.assertEqual(self.done, [False])
+		self.assertIsNone(self.transport.producer)
+		# Stopped twice *(the connection is lost after the end)*
+		self.producer.stopProducing()
+		self.assertEqual(self.done, [False])
+
+
+if __name__ == '__main__':
+	unittest.main()
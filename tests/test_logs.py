@@ -0,0 +1,50 @@
+import sys
+sys.path.append('../')
+
+import io
+import logging
+import unittest
+from modules.logs import SamplingFilter, fields, get_logger, parse_sampling, setup_logging, stop_logging
+
+
+def record(info_type, level=logging.DEBUG):
+	values = fields(info_type=info_type) if info_type is not None else {}
+	return logging.makeLogRecord({'levelno': level, 'msg': 'received', **values})
+
+
+class TestLogs(unittest.TestCase):
+
+	def tearDown(self):
+		stop_logging()
+
+	def test_sampling(self):
+		sampling = SamplingFilter({'ping': 10, 'post_transaction': 1})
+		kept = [sampling.filter(record('ping')) for _ in range(100)]
+		self.assertEqual(sum(kept), 10)
+		self.assertTrue(all(sampling.filter(record('post_transaction')) for _ in range(10)))
+		self.assertTrue(all(sampling.filter(record(None)) for _ in range(10)))
+		# The warnings are never dropped
+		self.assertTrue(all(sampling.filter(record('ping', logging.WARNING)) for _ in range(10)))
+
+	def test_parse_sampling(self):
+		rates = parse_sampling(['ping=1', 'headers=5'])
+		self.assertEqual(rates['ping'], 1)
+		self.assertEqual(rates['headers'], 5)
+		self.assertEqual(rates['post_transaction'], 100)
+		self.assertRaises(ValueError, parse_sampling, ['ping'])
+
+	def test_setup_logging(self):
+		stream = io.StringIO()
+		log = get_logger('test')
+		setup_logging('INFO', sampling={}, stream=stream)
+		log.debug('hidden %s', 1)
+		log.info('received %s', 'blocks', extra=fields(peer='a1', size=28))
+		stop_logging()
+
+		lines = stream.getvalue().splitlines()
+		self.assertEqual(len(lines), 1)
+		self.assertTrue(lines[0].endswith('INFO openbook.test: received blocks peer=a1 size=28'))
+
+
+if __name__ == '__main__':
+	unittest.main()
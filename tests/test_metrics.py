@@ -0,0 +1,79 @@
+import sys
+sys.path.append('../')
+
+import unittest
+from modules.metrics import Histogram, Registry
+
+
+class TestHistogram(unittest.TestCase):
+
+	def test_observe(self):
+		histogram = Histogram((1, 10, 100))
+		for value in (0.5, 1, 5, 50, 500, 5000):
+			histogram.observe(value)
+		# A value equal to a bound is counted in its bucket
+		self.assertEqual(histogram.counts, [2, 1, 1, 2])
+		self.assertEqual(histogram.count, 6)
+		self.assertEqual(histogram.sum, 5556.5)
+		self.assertEqual(histogram.snapshot()['buckets'], {'1': 2, '10': 1, '100': 1, 'inf': 2})
+
+	def test_quantile(self):
+		histogram = Histogram((1, 10, 100))
+		self.assertIsNone(histogram.quantile(0.5))
+		for value in [0.5] * 90 + [50] * 9 + [500]:
+			histogram.observe(value)
+		self.assertEqual(histogram.quantile(0.5), 1)
+		self.assertEqual(histogram.quantile(0.99), 100)
+		self.assertEqual(histogram.quantile(1), float('inf'))
+
+
+class TestRegistry(unittest.TestCase):
+
+	def test_exposition(self):
+		registry = Registry()
+		registry.counter('blocks_total', 'Blocks').inc(3)
+		registry.gauge('height', 'Height', lambda: 41)
+		registry.counter('messages_total', 'Messages', protocol='node', type='ping').inc()
+		histogram = registry.histogram('handler_seconds', 'Handlers', buckets=(0.1, 1))
+		histogram.observe(0.05)
+		histogram.observe(3)
+
+		self.assertEqual(registry.exposition().splitlines(), [
+			'# HELP blocks_total Blocks',
+			'# TYPE blocks_total counter',
+			'blocks_total 3',
+			'# HELP handler_seconds Handlers',
+			'# TYPE handler_seconds histogram',
+			'handler_seconds_bucket{le="0.1"} 1',
+			'handler_seconds_bucket{le="1"} 1',
+			'handler_seconds_bucket{le="+Inf"} 2',
+			'handler_seconds_sum 3.05',
+			'handler_seconds_count 2',
+			'# HELP height Height',
+			'# TYPE height gauge',
+			'height 41',
+			'# HELP messages_total Messages',
+			'# TYPE messages_total counter',
+			'messages_total{protocol="node",type="ping"} 1',
+		])
+
+	def test_register_again(self):
+		registry = Registry()
+		counter = registry.counter('blocks_total', 'Blocks')
+		self.assertIsNot(registry.counter('blocks_total', 'Blocks', miner='a'), counter)
+		# The same name and labels are refused, the first metric is kept
+		self.assertRaises(ValueError, registry.counter, 'blocks_total', 'Blocks')
+		registry.gauge('height', 'Height', lambda: 1, node='a')
+		self.assertRaises(ValueError, registry.gauge, 'height', 'Height', lambda: 2, node='a')
+		self.assertEqual(registry.gauge('height', 'Height', lambda: 2, node='b').value, 2)
+		self.assertIn('height{node="a"} 1', registry.exposition())
+		self.assertRaises(ValueError, registry.gauge, 'blocks_total', 'Blocks')
+
+	def test_escape_labels(self):
+		registry = Registry()
+		registry.gauge('peers', 'Peers', lambda: 1, peer='a "b"\n')
+		self.assertIn('peers{peer="a \\"b\\"\\n"} 1', registry.exposition())
+
+
+if __name__ == '__main__':
+	unittest.main()
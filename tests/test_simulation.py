@@ -0,0 +1,121 @@
+import sys
+sys.path.append('../')
+
+import unittest
+from fastecdsa.keys import import_key
+from fastecdsa.curve import secp256k1
+from twisted.internet import error
+from twisted.internet.protocol import Protocol
+from twisted.internet.task import LoopingCall
+
+from modules.blockchain.book import Book
+from modules.blockchain.transaction import Transaction
+from modules.simulation import Network, Simulation, percentile
+
+
+class Recorder(Protocol):
+
+	def __init__(self):
+		self.received = []
+
+	def dataReceived(self, data):
+		self.received.append((self.transport.network.seconds(), data))
+
+
+class RecorderFactory:
+
+	def buildProtocol(self, addr):
+		self.protocol = Recorder()
+		return self.protocol
+
+
+class TestNetwork(unittest.TestCase):
+
+	def test_delivery(self):
+		network = Network(latency=0.1, bandwidth=1000)
+		factory = RecorderFactory()
+		network.listen('10.0.0.3', 80, factory)
+		client = Protocol()
+		connected = []
+		network.connect('10.0.0.4', '10.0.0.3', 80, client).addCallback(connected.append)
+		network.run()
+		self.assertEqual(connected, [client])
+		self.assertEqual(network.seconds(), 0.1)
+		self.assertEqual(client.transport.getHost().host, '10.0.0.4')
+
+		# The second write waits for the bytes of the first one
+		client.transport.write(b'a' * 100)
+		client.transport.write(b'b' * 100)
+		network.run()
+		self.assertEqual([round(when, 6) for when, _ in factory.protocol.received], [0.3, 0.4])
+		self.assertEqual(network.bytes, 200)
+
+	def test_connection_refused(self):
+		network = Network()
+		failures = []
+		network.connect('10.0.0.4', '10.0.0.3', 80, Protocol()).addErrback(failures.append)
+		network.run()
+		self.assertTrue(failures[0].check(error.ConnectionRefusedError))
+
+	def test_clock(self):
+		network = Network()
+		calls = []
+		loop = LoopingCall(lambda: calls.append(network.seconds()))
+		loop.clock = network
+		loop.start(10)
+		# Idle, the looping call is not waited for
+		self.assertEqual(network.run(), 0)
+		network.run(until=25)
+		self.assertEqual(calls, [0, 10, 20])
+		loop.stop()
+		self.assertEqual(network.getDelayedCalls(), [])
+
+
+class TestSimulation(unittest.TestCase):
+
+	@classmethod
+	def setUpClass(cls):
+		cls.simulation = Simulation(6)
+		cls.simulation.start()
+
+	def test_start(self):
+		self.assertEqual(len(self.simulation.seed.known_peers), 6)
+		for node in self.simulation.nodes:
+			self.assertTrue(node.known_peers)
+
+	def test_propagate_block(self):
+		report = self.simulation.propagate_block(node=2)
+		self.assertEqual(report['reached'], 6)
+		# Announced by inv, every node downloads the block once
+		self.assertEqual(report['messages']['block'], 5)
+		self.assertNotIn('blocks', report['messages'])
+		# The announcements relayed by several peers are only handled once
+		self.assertGreater(report['dropped'], 0)
+		self.assertGreater(report['p50'], 0)
+		self.assertGreater(report['bytes'], 0)
+		tips = {node.blockchain.block_chain[-1].hash for node in self.simulation.nodes}
+		self.assertEqual(len(tips), 1)
+
+	def test_send_transaction(self):
+		private_key, public_key = import_key('tests/blockchain/test_files/default_keyprv.pem', curve=secp256k1)
+		transaction = Transaction(public_key, public_key, Book('Title', 'Author', '1999', 'Genre'), private_key)
+		report = self.simulation.send_transaction(transaction, node=1)
+		self.assertEqual(report['reached'], 6)
+		for node in self.simulation.nodes:
+			self.assertIn(transaction, node.blockchain.open_transactions)
+		self.assertEqual(report['messages']['post_transaction'], 1)
+		self.assertEqual(report['messages']['transactions'], 5)
+
+
+class TestPercentile(unittest.TestCase):
+
+	def test_percentile(self):
+		values = list(range(1, 101))
+		self.assertEqual(percentile(values, 0.5), 50)
+		self.assertEqual(percentile(values, 0.99), 99)
+		self.assertEqual(percentile(values, 1), 100)
+		self.assertIsNone(percentile([], 0.5))
+
+
+if __name__ == '__main__':
+	unittest.main()